@@ -0,0 +1,64 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    Benchmarks for the calculations module: calculations.get_date() (which serves replies from the render cache) and
+    calculations.render_reply() (which always renders the reply from a new countdown snapshot), for every command of
+    every locale available in l10n.py. It also compares the normalisers in l10n.py against a typical Spanish tweet.
+"""
+
+from benchmarks.harness import measure
+
+
+def run(iterations):
+    """
+    Run the benchmarks for the calculations module.
+
+    :param iterations: Number of measured calls for each benchmark
+    :type iterations: int
+    :return: The results of every benchmark
+    :rtype: list[dict]
+    """
+
+    # Import the bot modules only after the offline environment has been prepared
+    from bot.app.controllers import calculations
+    from bot.app.views.l10n import locales, remove_tildes, fast_remove_tildes
+
+    # Measure every command of every locale
+    results = []
+    for locale in locales:
+        for command_key, command in locales[locale]['calculations']['commands'].items():
+            normalised_command = remove_tildes(word=command)
+
+            results.append(measure('calculations.get_date', calculations.get_date,
+                                   [(normalised_command, None, locale)], iterations=iterations, locale=locale,
+                                   command=command_key))
+
+            results.append(measure('calculations.render_reply',
+                                   lambda key, loc: calculations.render_reply(key, calculations.CountdownSnapshot(), loc),
+                                   [(command_key, locale)], iterations=iterations, locale=locale, command=command_key))
+
+    # Measure the normalisation of a whole tweet, as the keyword matcher does for every mention
+    text = '@bot_pinera ¿cuántos días y años faltan para el evento?'
+    for normaliser in (remove_tildes, fast_remove_tildes):
+        results.append(measure('l10n.{0}'.format(normaliser.__name__), normaliser, [(text,)], iterations=iterations))
+
+    return results
@@ -0,0 +1,74 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    Benchmarks for the Telegram bot deployed to Google App Engine: telegram_bot_gae.webhook_handler() processing
+    synthetic updates, with a stub bot that records the replies instead of sending them to Telegram servers.
+"""
+
+from benchmarks.harness import measure, StubTelegramBot
+
+
+def synthetic_update(text, update_id):
+    """
+    Create the JSON payload that Telegram servers would deliver to the webhook for a message.
+
+    :param text: Text of the message
+    :type text: str
+    :param update_id: ID number of the update
+    :type update_id: int
+    :return: The update payload
+    :rtype: dict
+    """
+    user = {'id': update_id, 'is_bot': False, 'first_name': 'user{0}'.format(update_id)}
+    return {'update_id': update_id,
+            'message': {'message_id': update_id, 'date': 1577836800, 'text': text, 'from': user,
+                        'chat': {'id': update_id, 'type': 'private'},
+                        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]}}
+
+
+def run(iterations):
+    """
+    Run the benchmarks for the Telegram bot.
+
+    :param iterations: Number of measured calls for each benchmark
+    :type iterations: int
+    :return: The results of every benchmark
+    :rtype: list[dict]
+    """
+
+    # Import the bot modules only after the offline environment has been prepared
+    import bot.app.config as config
+    from telegram import Update
+    from bot.app.controllers import telegram_bot_gae as tgm
+
+    # Create an update for every calculations command, using the Telegram spelling of each command
+    stub_bot = StubTelegramBot()
+    updates = [Update.de_json(synthetic_update(text='/{0}'.format(tgm.lang_tgm[command]), update_id=index + 1),
+                              bot=tgm.telegram_bot)
+               for index, command in enumerate(tgm.lang_commands)]
+
+    # Measure the handler and then stop the dispatcher thread started by the Telegram bot module
+    try:
+        return [measure('telegram_bot_gae.webhook_handler', lambda update: tgm.webhook_handler(stub_bot, update),
+                        [(update,) for update in updates], iterations=iterations, locale=config.bot_locale)]
+    finally:
+        tgm.tgm_dispatcher.stop()
@@ -0,0 +1,88 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    Benchmarks for the Twitter bot: twitter_bot.reply_tweet() replying to synthetic mentions through a stub API, so no
+    request is sent to Twitter servers.
+"""
+
+from types import SimpleNamespace
+from benchmarks.harness import measure, StubTwitterApi
+
+# Texts of the synthetic mentions. They include commands with and without tildes, several commands in the same tweet,
+# punctuation, and tweets without any command at all (which get the default reply)
+mention_texts = [
+    '@{bot} {command}',
+    '@{bot} ¿cuántos {command} faltan?',
+    '@{bot} Hola! quiero saber los {command} y la fecha. Gracias.',
+    '@{bot} {command} {command} {command}',
+    '@{bot} hola, ¿cómo estás?'
+]
+
+
+def synthetic_mentions(commands, bot_name):
+    """
+    Create a list of synthetic mentions, combining every text template with every command.
+
+    :param commands: Localised commands to include in the mentions
+    :type commands: list[str]
+    :param bot_name: The Twitter handle of the bot (without the '@' symbol)
+    :type bot_name: str
+    :return: Objects that look like the tweepy.Status objects used by the Twitter bot
+    :rtype: list[types.SimpleNamespace]
+    """
+    mentions = []
+    for text in mention_texts:
+        for command in commands:
+            tweet_id = len(mentions) + 1
+            user = SimpleNamespace(id=tweet_id, name='user{0}'.format(tweet_id),
+                                   screen_name='user{0}'.format(tweet_id), following=True)
+            mentions.append(SimpleNamespace(id=tweet_id, full_text=text.format(bot=bot_name, command=command),
+                                            user=user))
+
+    return mentions
+
+
+def run(iterations):
+    """
+    Run the benchmarks for the Twitter bot.
+
+    :param iterations: Number of measured calls for each benchmark
+    :type iterations: int
+    :return: The results of every benchmark
+    :rtype: list[dict]
+    """
+
+    # Import the bot modules only after the offline environment has been prepared
+    import bot.app.config as config
+    from bot.app.controllers import twitter_bot
+
+    # Replace the rate-limit ledger with one whose limits are never reached, as no call leaves this process
+    from bot.app.controllers import rate_limits
+    rate_limits.ledger = rate_limits.RateLimitLedger(limits={endpoint: (10**12, window) for endpoint, (limit, window)
+                                                             in rate_limits.default_limits.items()})
+
+    # Reply to every synthetic mention in turn
+    api = StubTwitterApi()
+    mentions = synthetic_mentions(commands=list(twitter_bot.lang_commands.values()), bot_name=config.twitter_bot_name)
+
+    return [measure('twitter_bot.reply_tweet', lambda tweet: twitter_bot.reply_tweet(api=api, tweet=tweet),
+                    [(mention,) for mention in mentions], iterations=iterations, locale=config.bot_locale)]
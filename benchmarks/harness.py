@@ -0,0 +1,192 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module holds the common tools used by every benchmark: it prepares an offline environment (fake secrets, an
+    in-memory replacement for the Datastore client, and the in-memory cursor store, so that neither Google Cloud nor
+    Telegram or Twitter servers are contacted), and it measures the throughput, latency and memory allocations of the
+    functions being benchmarked.
+"""
+
+import contextlib
+import gc
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+# Syntactically valid Telegram token, as the Telegram library checks its format when creating a bot instance
+fake_telegram_token = '123456789:AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA'
+
+# Number of calls that are traced to measure memory allocations. Tracing slows calls down, so it's done separately
+traced_calls = 200
+
+
+class MemoryDatastoreClient(object):
+    """
+    This class replaces the Google Cloud Datastore client with an in-memory dictionary, so that the Twitter bot can be
+    imported and benchmarked offline.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.entities = {}
+
+    def key(self, *path):
+        return path
+
+    def get(self, key):
+        return self.entities.get(key)
+
+    def put(self, entity):
+        self.entities[entity.key] = entity
+
+    def delete(self, key):
+        self.entities.pop(key, None)
+
+    def transaction(self):
+        return contextlib.nullcontext()
+
+
+def prepare_offline_environment():
+    """
+    Prepare the environment so that the bot modules can be imported without contacting any server. It must be called
+    before importing any module from the bot.
+
+    :return: No usable data is returned by this function
+    :rtype: None
+    """
+
+    # Use fake secrets, as the Telegram bot refuses empty tokens
+    import bot.app.secrets as secrets
+    if not secrets.telegram_token:
+        secrets.telegram_token = fake_telegram_token
+
+    # Replace the Datastore client with an in-memory one, and keep the cursors in memory too
+    from google.cloud import datastore
+    datastore.Client = MemoryDatastoreClient
+    import bot.app.config as config
+    config.cursor_store = 'memory'
+
+
+class StubTwitterApi(object):
+    """
+    This class replaces the Tweepy API object. It records the number of tweets it would have sent instead of sending
+    them.
+    """
+
+    def __init__(self):
+        self.statuses = 0
+
+    def update_status(self, status, **kwargs):
+        self.statuses += 1
+        return SimpleNamespace(id=self.statuses, text=status)
+
+
+class StubTelegramBot(object):
+    """
+    This class replaces the Telegram bot object. It records the number of messages it would have sent instead of
+    sending them.
+    """
+
+    def __init__(self):
+        self.messages = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.messages += 1
+
+    sendMessage = send_message
+
+
+def percentile(sorted_values, fraction):
+    """
+    Get a percentile from a list of values that is already sorted.
+
+    :param sorted_values: Values sorted in ascending order
+    :type sorted_values: list[int]
+    :param fraction: The percentile as a fraction (e.g. 0.99)
+    :type fraction: float
+    :return: The value at that percentile
+    :rtype: int
+    """
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def measure(name, function, arguments, iterations=2000, warmup=200, **labels):
+    """
+    Measure a function by calling it repeatedly with each set of arguments in turn. Latency is measured call by call,
+    and memory allocations are measured separately over a smaller number of traced calls.
+
+    :param name: Name of the benchmark
+    :type name: str
+    :param function: The function to benchmark
+    :type function: function
+    :param arguments: List of tuples of positional arguments. The calls cycle through them
+    :type arguments: list[tuple]
+    :param iterations: Number of measured calls
+    :type iterations: int
+    :param warmup: Number of calls made before measuring, to fill caches
+    :type warmup: int
+    :param labels: Additional labels to include in the result (e.g. locale='es-CL')
+    :type labels: str
+    :return: The benchmark result, ready to be exported as JSON
+    :rtype: dict
+    """
+
+    # Warm up
+    count = len(arguments)
+    for index in range(warmup):
+        function(*arguments[index % count])
+
+    # Measure the latency of every call, with the garbage collector disabled to reduce the noise
+    latencies = []
+    gc.disable()
+    try:
+        started = time.perf_counter_ns()
+        for index in range(iterations):
+            call_started = time.perf_counter_ns()
+            function(*arguments[index % count])
+            latencies.append(time.perf_counter_ns() - call_started)
+        elapsed = time.perf_counter_ns() - started
+    finally:
+        gc.enable()
+
+    # Measure memory allocations: the peak of memory allocated during each call and the memory still held after it
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for index in range(min(traced_calls, iterations)):
+            tracemalloc.clear_traces()
+            function(*arguments[index % count])
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak)
+            retained.append(current)
+    finally:
+        tracemalloc.stop()
+
+    # Summarise the results
+    latencies.sort()
+    result = {'name': name, 'iterations': iterations, 'ops_per_sec': iterations / (elapsed / 10 ** 9),
+              'p50_us': percentile(latencies, 0.5) / 1000, 'p99_us': percentile(latencies, 0.99) / 1000,
+              'alloc_peak_bytes_per_call': sum(peaks) / len(peaks),
+              'alloc_retained_bytes_per_call': sum(retained) / len(retained)}
+    result.update(labels)
+
+    return result
@@ -0,0 +1,86 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    Run the benchmarks for the reply hot paths of the bot and report the results as JSON, so that runs can be compared
+    to catch performance regressions before deploying. The benchmarks run offline: no request is sent to Google Cloud,
+    Telegram or Twitter servers.
+
+    Usage (from the root directory of the project):
+
+        python -m benchmarks.run [--iterations 2000] [--only calculations,twitter,telegram] [--output results.json]
+"""
+
+import sys
+import json
+import argparse
+import platform
+from datetime import datetime, timezone
+from benchmarks.harness import prepare_offline_environment
+
+# Available benchmark suites, linked to the modules that implement them
+suites = {
+    'calculations': 'benchmarks.bench_calculations',
+    'twitter': 'benchmarks.bench_twitter',
+    'telegram': 'benchmarks.bench_telegram'
+}
+
+
+def main(argv=None):
+    """
+    Parse the command line arguments, run the requested benchmark suites and report their results.
+
+    :param argv: Command line arguments. If omitted, they will be read from sys.argv
+    :type argv: list[str]
+    :return: Exit status
+    :rtype: int
+    """
+
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description='Benchmarks for the Event Info Bot reply hot paths')
+    parser.add_argument('--iterations', type=int, default=2000, help='measured calls for each benchmark')
+    parser.add_argument('--only', default=','.join(suites), help='comma-separated list of suites to run')
+    parser.add_argument('--output', help='file where the JSON results are written (default: standard output)')
+    args = parser.parse_args(argv)
+
+    # Prepare the offline environment before any bot module is imported
+    prepare_offline_environment()
+
+    # Run every requested suite
+    results = []
+    for suite in args.only.split(','):
+        module = __import__(suites[suite], fromlist=['run'])
+        results.extend(module.run(iterations=args.iterations))
+
+    # Report the results along with details of the environment where they were measured
+    report = json.dumps({'created': datetime.now(tz=timezone.utc).isoformat(), 'python': platform.python_version(),
+                         'platform': platform.platform(), 'results': results}, indent=4, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(report)
+    else:
+        print(report)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
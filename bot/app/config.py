@@ -43,7 +43,29 @@ debug = False
 serve_tgm = True  # Set to True if you want to enable the Telegram bot
 serve_twitter = True  # Set to True if you want to enable the Twitter bot
 twitter_bot_name = 'bot_pinera'  # Please note that it doesn't include the '@' symbol from the Twitter handle!
+telegram_bot_name = None  # Your Telegram bot username without the '@' symbol (None accepts any '@botname')
 twitter_interval = 10  # The interval (in minutes) between connections to the Twitter API server
+twitter_parallelism = 8  # The maximum number of mentions (from different users) processed at the same time
+twitter_checkpoint_interval = 50  # The number of mentions processed between every save of the cursor
+twitter_cursor_write_interval = 60  # The minimum time (in seconds) between writes of the cursor to the datastore
+twitter_cursor_ttl = 300  # The time (in seconds) the cursor is read from memory before it's reloaded from the datastore
+twitter_mention_lease_ttl = 120  # The time (in seconds) an instance may reply to mentions without renewing its lease
+datastore_transaction_retries = 3  # The number of times a datastore transaction is retried after a conflict
+twitter_ledger_size = 4096  # The number of the latest mentions whose actions (reply, like, follow) are kept exactly
+twitter_ledger_capacity = 20000  # The number of actions held by every Bloom filter that keeps the older mentions
+twitter_ledger_error_rate = 0.001  # The chance that the ledger mistakes an older mention for one already processed
+twitter_ledger_batch_size = 25  # The number of actions recorded between every write of the ledger to the database
+twitter_coalesce_window = 120  # The time (in seconds) within which mentions from the same user get a single reply
+twitter_max_mentions_per_run = 150  # The maximum number of mentions processed every time mentions are checked
+twitter_rate_limit_reserve = 0.2  # The fraction of every API rate limit kept for replies and reminders
+twitter_follow_state_ttl = 24  # The time (in hours) before the users followed are refreshed from Twitter servers
+twitter_follow_back_slice = 100  # The maximum number of followers followed back every time the 'follow back' job runs
+
+# Set here how the Twitter bot catches up with a long backlog of mentions (e.g. after an outage). When there are more
+# mentions waiting than the threshold, only the newest ones and those that are recent enough are answered
+twitter_catch_up_threshold = 300  # The number of mentions waiting that enables the catch-up mode
+twitter_catch_up_newest = 50  # The number of newest mentions that are always answered in catch-up mode
+twitter_catch_up_max_age = 60  # The age (in minutes) of the oldest mention that is answered anyway in catch-up mode
 
 # Set the 'debug' flag for Google App Engine debugger (normally it should be set to False)
 gae_debugger = False
@@ -72,8 +94,12 @@ bot_domain = secrets.bot_domain
 bot_tgm_url = 'telegram/hook/{0}'.format(secrets.telegram_token)
 bot_tgm_webhook_str = 'https://{0}:{1}/{2}'  # You shouldn't change this without understanding the code first!
 
-# Don't modify this unless you want to use a different provider. This variable identifies the public IP address
-local_public_ip_address = urllib.request.urlopen('https://ident.me').read().decode('utf8')
+# Don't modify this unless you want to use a different provider. This variable identifies the public IP address. If
+# the provider can't be reached (e.g. when running the benchmarks offline) the loopback address will be used instead
+try:
+    local_public_ip_address = urllib.request.urlopen('https://ident.me', timeout=10).read().decode('utf8')
+except OSError:
+    local_public_ip_address = '127.0.0.1'
 
 # This variables detect server settings that are important to set a webhook URL. You shouldn't change them!
 server_software = os.getenv('SERVER_SOFTWARE', '').lower()
@@ -90,3 +116,17 @@ local_certificate = '{0}/SSL-certs/bot-local-public.pem'.format(working_dir)
 local_private_key = '{0}/SSL-certs/bot-local-private_key.pem'.format(working_dir)
 remote_certificate = '{0}/SSL-certs/bot-remote-public.pem'.format(working_dir)
 remote_private_key = '{0}/SSL-certs/bot-remote-private_key.pem'.format(working_dir)
+
+# Set here whether the reminders are sent by a scheduler running within the bot instead of the CRON jobs in cron.yaml.
+# If you enable it, remove the reminder jobs from your cron.yaml file, or every reminder would be sent twice!
+use_scheduler = False
+scheduler_max_delay = 60  # The time (in seconds) a reminder can be late before it's skipped
+scheduler_lease_ttl = 120  # The time (in seconds) an instance leads the scheduler after sending a reminder (GAE only)
+scheduler_lock_file = '{0}/scheduler.lock'.format(working_dir)  # The file locked by the leader (generic servers only)
+
+# Set here where the Twitter cursor (i.e. the ID number of the last mention replied to) is stored: 'datastore' (Google
+# Cloud Datastore, required in Google App Engine), 'sqlite' (a local file, for generic servers) or 'memory' (it's lost
+# when the bot stops, so it's only meant for tests and benchmarks)
+cursor_store = 'datastore' if use_app_engine else 'sqlite'
+cursor_store_path = '{0}/cursors.sqlite3'.format(working_dir)  # The SQLite database file (only used by 'sqlite')
+twitter_mention_lock_file = '{0}/mentions.lock'.format(working_dir)  # Locked while replying (generic servers only)
@@ -24,12 +24,13 @@
     event date, and then formats the result as a human-readable string that is returned to the calling process.
 """
 
-import pytz
 import calendar
+import threading
 from bot.app.controllers.logger import *
 import bot.app.config as config
-from datetime import datetime
-from bot.app.views.l10n import locales, remove_tildes
+from bot.app.controllers import clock
+from datetime import datetime, timedelta
+from bot.app.views.l10n import locales, fast_remove_tildes
 
 # Start logger
 logger = logging.getLogger(__name__)
@@ -41,6 +42,26 @@ lang_commands = lang['commands']
 # Set event date
 leave_date = config.event_date
 
+# Store the event date as an integer number of nanoseconds since the POSIX epoch (UTC), so that countdown calculations
+# only need plain integer arithmetic rather than time zone-aware datetime objects
+ns_per_second = 10 ** 9
+event_epoch_ns = (calendar.timegm(leave_date.utctimetuple()) * 10 ** 6 + leave_date.microsecond) * 1000
+
+# List the keys of the localised month names in calendar order
+month_keys = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+              'November', 'December']
+
+# Length of every month in a common year. February is adjusted for leap years when it's read
+month_lengths = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Length (in seconds) of the units whose countdown value changes at regular intervals, as opposed to the calendar units
+# (years, months and relative days) that only change at midnight
+unit_lengths = {'seconds': 1, 'minutes': 60, 'hours': 3600, 'days': 24 * 3600}
+
+# Calendar day (in the server time zone) that was converted last, stored as a tuple holding its year, month, day, and
+# the epoch nanoseconds when that day starts and ends
+current_day = (0, 0, 0, 0, 0)
+
 
 def get_now():
     """
@@ -50,77 +71,240 @@ def get_now():
     :rtype: datetime
     """
 
-    # Get current time from server
-    server_localtime = datetime.now()
-
-    # Localise it according to the time zone set for this server
-    localised_now = config.server_timezone.localize(dt=server_localtime)
+    # Get current time from the clock in use, converted to the time zone set for this server. Converting it (rather
+    # than localising the naive server time) makes the result independent from the time zone the server clock is set to
+    localised_now = clock.now(tz=config.server_timezone)
 
     # Return timezone-aware datetime object
     return localised_now
 
 
-def get_delta():
+def get_delta(now=None):
     """
     Calculate the date and time difference between the date set for the event and the current time and date.
 
+    :param now: The date and time that should be used as current time. If omitted, it will be read from the system
+    :type now: datetime
     :return: Time difference between now and the event date
     :rtype: datetime.timedelta
     """
-    return leave_date - get_now()
+
+    # Read the system clock only if the caller didn't provide a time of its own
+    if now is None:
+        now = get_now()
+
+    return leave_date - now
 
 
-def years_left():
+def month_length(year, month):
     """
-    Calculates how many years are left to reach the event date. The result only reflects full years.
+    Get the number of days of a given month, accounting for leap years.
 
-    :return: Full years left to reach the event date
+    :param year: The year the month belongs to
+    :type year: int
+    :param month: The calendar number of the month (1 to 12)
+    :type month: int
+    :return: Number of days in that month
     :rtype: int
     """
 
-    raw_difference = months_left() // 12
+    # Add one day to February on leap years
+    if month == 2 and calendar.isleap(year):
+        return 29
 
-    return raw_difference
+    return month_lengths[month - 1]
 
 
-def year_fraction_left():
+def get_calendar_day(timestamp_ns):
+    """
+    Convert a moment in time to the calendar day it belongs to, in the time zone set for this server. As the calendar
+    day only changes at midnight, the last day converted is kept so that the time zone library is only used once a day
+    rather than on every request.
+
+    :param timestamp_ns: Nanoseconds since the POSIX epoch
+    :type timestamp_ns: int
+    :return: The year, month and day, and the epoch nanoseconds when that day starts and ends
+    :rtype: tuple[int]
+    """
+    global current_day
+
+    # Read the last day converted and reuse it if the requested moment belongs to it
+    day = current_day
+    if day[3] <= timestamp_ns < day[4]:
+        return day
+
+    # Otherwise convert the moment to the local date and find out when that day starts and ends. Localising the
+    # midnight of each day accounts for daylight saving changes
+    local_now = datetime.fromtimestamp(timestamp_ns // ns_per_second, tz=config.server_timezone)
+    start = datetime(local_now.year, local_now.month, local_now.day)
+    end = start + timedelta(days=1)
+    day = (local_now.year, local_now.month, local_now.day,
+           int(config.server_timezone.localize(dt=start).timestamp()) * ns_per_second,
+           int(config.server_timezone.localize(dt=end).timestamp()) * ns_per_second)
+
+    # Keep this day for the next requests
+    current_day = day
+
+    return day
+
+
+class CountdownSnapshot(object):
+    """
+    This class creates an immutable object that reads the clock only once and then derives from that single reading
+    every unit of the countdown (years, months, days, hours, minutes and seconds left to the event). Use it whenever a
+    reply needs more than one unit so that all of them are consistent with each other, even if the clock crosses a
+    second or day boundary while the reply is being composed. Every calculation uses integer nanoseconds since the
+    POSIX epoch, and only the calendar units need the current date, which is converted at most once a day.
+    """
+
+    __slots__ = ('timestamp_ns', 'remaining_ns', 'seconds', 'minutes', 'hours', 'days', 'relative_days', 'months',
+                 'year_fraction', 'years', 'edge_year', 'day_end_ns')
+
+    def __init__(self, timestamp_ns=None):
+        """
+        This method initialises an instance by reading the clock (unless a time is provided) and calculating every unit
+        of the countdown from that reading.
+
+        :param timestamp_ns: Nanoseconds since the POSIX epoch that should be used as current time. If omitted, it will
+        be read from the clock in use
+        :type timestamp_ns: int
+        """
+
+        # Read the system clock only once for all the units calculated below
+        if timestamp_ns is None:
+            timestamp_ns = clock.time_ns()
+
+        # Calculate the total amount of full seconds left, and then derive the other units from it
+        remaining_ns = event_epoch_ns - timestamp_ns
+        seconds = remaining_ns // ns_per_second
+
+        # Get the current calendar day to calculate the number of full months between the event month and the current
+        # one, and from it the total number of months and years left
+        year, month, day, _, day_end_ns = get_calendar_day(timestamp_ns=timestamp_ns)
+        year_fraction = (leave_date.month - month) % 12
+        months = (leave_date.year - year) * 12 + year_fraction
+
+        # Calculate the days left within a single month by adding the day of the event with the amount of days left
+        # till the end of this month
+        days_this_month = month_length(year=year, month=month)
+        relative_days = (leave_date.day + (days_this_month - day)) % days_this_month
+
+        # Store the results. As this object is immutable, bypass its own __setattr__ method
+        for name, value in (('timestamp_ns', timestamp_ns), ('remaining_ns', remaining_ns), ('seconds', seconds),
+                            ('minutes', seconds // 60), ('hours', seconds // 3600), ('days', seconds // (24 * 3600)),
+                            ('relative_days', relative_days), ('months', months), ('year_fraction', year_fraction),
+                            ('years', months // 12), ('edge_year', (leave_date.month == month) and (leave_date.day < day)),
+                            ('day_end_ns', day_end_ns)):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_values(cls, **values):
+        """
+        This method creates an instance from units that were already calculated elsewhere (e.g. by the batch
+        calculations in the countdown_batch.py module) rather than by reading the clock.
+
+        :param values: The value of every unit of the countdown, named after the attributes of this class
+        :type values: int or bool
+        :return: A countdown snapshot holding the values provided
+        :rtype: CountdownSnapshot
+        """
+
+        # Create an empty instance and store the values provided, bypassing its own __setattr__ method
+        snapshot = cls.__new__(cls)
+        for name in cls.__slots__:
+            object.__setattr__(snapshot, name, values[name])
+
+        return snapshot
+
+    @property
+    def now(self):
+        """
+        The moment this snapshot was taken, as a datetime object in the time zone set for this server.
+
+        :return: Time and date of the snapshot
+        :rtype: datetime
+        """
+        return datetime.fromtimestamp(self.timestamp_ns / ns_per_second, tz=config.server_timezone)
+
+    def expires_at(self, command_key):
+        """
+        This method calculates the moment when the value of a countdown unit will change, so that any reply rendered
+        from this snapshot can be reused until then. Seconds, minutes, hours and total days change whenever the time
+        left crosses a multiple of their length, the calendar units (years, months and summary) change at midnight
+        (or when the event date is met), whereas the event date never changes.
+
+        :param command_key: The internal key of the command whose expiry is requested (e.g. 'hours')
+        :type command_key: str
+        :return: Nanoseconds since the POSIX epoch when the value will change, or None if it never changes
+        :rtype: int or None
+        """
+
+        # The event date doesn't depend on the current time, so it never expires
+        if command_key == 'date':
+            return None
+
+        # Units of fixed length change as soon as the time left drops below the current value times the unit length
+        if command_key in unit_lengths:
+            return self.timestamp_ns + self.remaining_ns % (unit_lengths[command_key] * ns_per_second)
+
+        # Calendar units change at the next midnight in the time zone of the server, unless the event happens before
+        if self.remaining_ns > 0:
+            return min(self.day_end_ns, event_epoch_ns)
+
+        return self.day_end_ns
+
+    def __setattr__(self, name, value):
+        raise AttributeError('CountdownSnapshot objects are immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('CountdownSnapshot objects are immutable')
+
+    def __repr__(self):
+        return 'CountdownSnapshot(timestamp_ns={0}, seconds={1})'.format(self.timestamp_ns, self.seconds)
+
+
+def years_left(snapshot=None):
+    """
+    Calculates how many years are left to reach the event date. The result only reflects full years.
+
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
+    :return: Full years left to reach the event date
+    :rtype: int
+    """
+    return (snapshot or CountdownSnapshot()).years
+
+
+def year_fraction_left(snapshot=None):
     """
     Calculates the remaining fraction of the last year before reaching the event date. It doesn't take into account the
     amount of full years between the event date and now. It returns the number of full months between the event month
      and the current one (e.g. the event is on the 7th month and now it's the 3rd month of the year--> difference is 4
      full months). This calculation is necessary when displaying a 'summary' string that list years, months and days.
 
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
     :return: Number of full months between event month and current month
     :rtype: int
     """
-    now = get_now()
-    return (leave_date.month - now.month) % 12
+    return (snapshot or CountdownSnapshot()).year_fraction
 
 
-def months_left():
+def months_left(snapshot=None):
     """
     Calculates the number of total full months left between the event date and the current month. This function does
     take into account the amount of years left, converting them into months and adding them to the amount of months
     returned by the year_fraction_left() function.
 
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
     :return: Total full months between the event month and current month
     :rtype: int
     """
+    return (snapshot or CountdownSnapshot()).months
 
-    # Get years left
-    now = get_now()
-    raw_years_left = leave_date.year - now.year
-
-    # Check whether the amount of years left are full years or not. If not, discount one or the amount of months left
-    # reported will be off by 12 months
-    # year_fraction = year_fraction_left()
-    # if year_fraction != 0:
-    #     raw_years_left -= 1
 
-    return raw_years_left * 12 + year_fraction_left()
-
-
-def days_left(relative=False):
+def days_left(relative=False, snapshot=None):
     """
     Calculates the number of full days left between the event date and the current one. It accepts a 'relative'
     parameter that modifies the result to either return the total number of days (accounting for years and months left
@@ -130,308 +314,496 @@ def days_left(relative=False):
     :param relative: Indicates whether the result asked should only return days within a month or in total. This
     parameter is necessary when displaying a 'summary' string that list years, months and days.
     :type relative: bool
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
     :return: If the 'relative' parameter was True, return the days left between the target (event) day and today but
     only within the current calendar month. If False, return the total days left between the event day and today
     :rtype: int
     """
 
+    # Take a snapshot if the caller didn't provide one
+    snapshot = snapshot or CountdownSnapshot()
+
     # Check whether the user requested days difference 'relative' to the current month or in total
     if relative:
-        # Get current day from the system date
-        now = get_now()
-        today = now.day
-
-        # Get the number of days that this month have in total
-        days_this_month = calendar.monthlen(year=now.year, month=now.month)
-
-        # Calculate the days difference by adding the day of the event with the amount of days left till the end of
-        # this month
-        delta = (leave_date.day + (days_this_month - today)) % days_this_month
+        return snapshot.relative_days
     else:
-        # If the user only requested the total number of days, calculate it including years and months
-        delta = get_delta().days
-
-    return delta
+        return snapshot.days
 
 
-def hours_left():
+def hours_left(snapshot=None):
     """
     Calculate how many full hours are left from now till the hour set for the event.
 
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
     :return: Total hours from now till the event time
     :rtype: int
     """
-    return seconds_left() // 3600
+    return (snapshot or CountdownSnapshot()).hours
 
 
-def minutes_left():
+def minutes_left(snapshot=None):
     """
-    Calculate how many full hours are left from now till the hour set for the event.
+    Calculate how many full minutes are left from now till the minute set for the event.
 
-    :return:
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
+    :return: Total minutes from now till the event time
+    :rtype: int
     """
-    return seconds_left() // 60
+    return (snapshot or CountdownSnapshot()).minutes
 
 
-def seconds_left():
+def seconds_left(snapshot=None):
     """
     Calculate the total amount of seconds left from now to the date and time of the event.
 
+    :param snapshot: Countdown snapshot to read the result from. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
     :return: Total seconds left before the event occurs
     :rtype: int
     """
-    delta = get_delta()
-    return delta.days * 24 * 3600 + delta.seconds
+    return (snapshot or CountdownSnapshot()).seconds
 
 
-def get_date(data_request):
+def format_num(number, locale):
     """
-    Calculate the requested date and/or time difference requested by the user and then format the information as a
-    human-readable string.
-
-    :param data_request: The type of information requested
-    :type data_request: str
-    :return: The calculated time and/or date difference information
+    Function that format numbers to use the appropriate character for grouping thousands and separating decimal
+    digits, according to each locale. This is useful for non-English languages, such as Spanish, which don't follow
+    the same conventions than English. Hence, as Python calculates arithmetic operations using English conventions,
+    other languages require that the output string is modified.
+
+    :param number: Number string that requires formatting accordingly to the locale
+    :type number: str or int
+    :param locale: The locale whose rules should be applied (e.g. 'es-CL')
+    :type locale: str
+    :return: A numeral formatted according to the rules of each locale
     :rtype: str
     """
-    # Get the default string that will be used to format the reply
-    base_str = lang['base_string']
-    verb_suffix = lang['base_string_verb_suffix']
-    null_suffix = lang['base_string_verb_suffix_null']
 
-    # ### Beginning of internal functions ###
-    def format_num(number):
-        """
-        Function that format numbers to use the appropriate character for grouping thousands and separating decimal
-        digits, according to each locale. This is useful for non-English languages, such as Spanish, which don't follow
-        the same conventions than English. Hence, as Python calculates arithmetic operations using English conventions,
-        other languages require that the output string is modified.
-
-        :param number: Number string that requires formatting accordingly to the locale
-        :type number: str or int
-        :return: A numeral formatted according to the rules of each locale
-        :rtype: str
-        """
+    # Check if current locale is an English variation
+    if locale[0:1] == 'en':
+        return '{:,}'.format(number)
+    else:
+        thousands_sep = locales[locale]['calculations']['thousands_separator']
+        return '{:,}'.format(number).replace(',', thousands_sep)
 
-        # Check if current locale is an English variation
-        if config.bot_locale[0:1] == 'en':
-            return '{:,}'.format(number)
-        else:
-            thousands_sep = lang['thousands_separator']
-            return '{:,}'.format(number).replace(',', thousands_sep)
 
-    def format_seconds():
-        """
-        Ask the seconds_left() function for the number of seconds left to the event and format its results as a
-        human-readable string.
+def format_seconds(snapshot, locale):
+    """
+    Read the number of seconds left to the event from the countdown snapshot and format it as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: Human-readable information for the seconds left to the event
+    :rtype: tuple[str] or None
+    """
 
-        :return: Human-readable information for the seconds left to the event
-        :rtype: str
-        """
+    # Shorten locale path
+    lang = locales[locale]['calculations']
 
-        # Get the number of seconds left
-        seconds = format_num(seconds_left())
+    # Get the number of seconds left
+    seconds = format_num(snapshot.seconds, locale)
 
-        # Check whether the result is 0 or 1, and then return the appropriate string
-        if seconds == '1':
-            return lang['1_second'], null_suffix
-        elif seconds == '0':
-            return None
+    # Check whether the result is 0 or 1, and then return the appropriate string
+    if seconds == '1':
+        return lang['1_second'], lang['base_string_verb_suffix_null']
+    elif seconds == '0':
+        return None
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_seconds'].format(seconds), verb_suffix
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_seconds'].format(seconds), lang['base_string_verb_suffix']
 
-    def format_minutes():
-        """
-        Ask the minutes_left() function for the number of minutes left to the event and format its results as a
-        human-readable string.
 
-        :return: Human-readable information for the minutes left to the event
-        :rtype: str
-        """
+def format_minutes(snapshot, locale):
+    """
+    Read the number of minutes left to the event from the countdown snapshot and format it as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: Human-readable information for the minutes left to the event
+    :rtype: tuple[str]
+    """
 
-        # Get the number of minutes left
-        minutes = format_num(minutes_left())
+    # Shorten locale path
+    lang = locales[locale]['calculations']
 
-        # Check whether the result is 1, and then return the appropriate string
-        if minutes == '1':
-            return lang['1_minute'], null_suffix
+    # Get the number of minutes left
+    minutes = format_num(snapshot.minutes, locale)
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_minutes'].format(minutes), verb_suffix
+    # Check whether the result is 1, and then return the appropriate string
+    if minutes == '1':
+        return lang['1_minute'], lang['base_string_verb_suffix_null']
 
-    def format_hours():
-        """
-        Ask the hours_left() function for the number of hours left to the event and format its results as a
-        human-readable string.
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_minutes'].format(minutes), lang['base_string_verb_suffix']
 
-        :return: Human-readable information for the hours left to the event
-        :rtype: str
-        """
 
-        # Get the number of hours left
-        hours = format_num(hours_left())
+def format_hours(snapshot, locale):
+    """
+    Read the number of hours left to the event from the countdown snapshot and format it as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: Human-readable information for the hours left to the event
+    :rtype: tuple[str]
+    """
 
-        # Check whether the result is 1, and then return the appropriate string
-        if hours == '1':
-            return lang['1_hour'], null_suffix
+    # Shorten locale path
+    lang = locales[locale]['calculations']
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_hours'].format(hours), verb_suffix
+    # Get the number of hours left
+    hours = format_num(snapshot.hours, locale)
 
-    def format_days(relative=False):
-        """
-        Ask the days_left() function for the number of days left to the event and format its results as a
-        human-readable string.
-
-        :param relative: Indicates whether the result asked should only return days within a month or in total. This
-        parameter is necessary when displaying a 'summary' string that list years, months and days.
-        :type relative: bool
-        :return: Human-readable information for the days left to the event
-        :rtype: str
-        """
+    # Check whether the result is 1, and then return the appropriate string
+    if hours == '1':
+        return lang['1_hour'], lang['base_string_verb_suffix_null']
 
-        # Get the number of days left
-        days = format_num(days_left(relative))
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_hours'].format(hours), lang['base_string_verb_suffix']
 
-        # Check whether the result is 1, and then return the appropriate string
-        if days == '1':
-            return lang['1_day'], null_suffix
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_days'].format(days), verb_suffix
+def format_days(snapshot, locale, relative=False):
+    """
+    Read the number of days left to the event from the countdown snapshot and format it as a human-readable string.
 
-    def format_months(fraction=False, edge_month=False):
-        """
-        Ask the months_left() function for the number of months left to the event and format its results as a
-        human-readable string.
-
-        :param fraction: Indicates whether the result asked should only return months as a fraction of a year or in
-        total. This parameter is necessary when displaying a 'summary' string that list years, months and days
-        :type fraction: bool
-        :param edge_month: Whether the result must be subtracted one month or not
-        :type edge_month: bool
-        :return: Human-readable information for the days left to the event
-        :rtype: str
-        """
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :param relative: Indicates whether the result asked should only return days within a month or in total. This
+    parameter is necessary when displaying a 'summary' string that list years, months and days.
+    :type relative: bool
+    :return: Human-readable information for the days left to the event
+    :rtype: tuple[str]
+    """
 
-        # Get the number of months left, depending on whether the request is for total months or the fraction of a year.
-        # Adjust the result for edge month if required
-        if fraction:
-            if edge_month:
-                input_data = 11
-            else:
-                input_data = year_fraction_left()
+    # Shorten locale path
+    lang = locales[locale]['calculations']
 
-            months = format_num(input_data)
+    # Get the number of days left
+    days = format_num(days_left(relative=relative, snapshot=snapshot), locale)
 
-        else:
-            months = format_num(months_left())
+    # Check whether the result is 1, and then return the appropriate string
+    if days == '1':
+        return lang['1_day'], lang['base_string_verb_suffix_null']
 
-        # Check whether the result is 1, and then return the appropriate string
-        if months == '1':
-            return lang['1_month'], null_suffix
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_days'].format(days), lang['base_string_verb_suffix']
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_months'].format(months), verb_suffix
 
-    def format_years(edge_year=False):
-        """
-        Ask the years_left() function for the number of years left to the event and format its results as a
-        human-readable string.
+def format_months(snapshot, locale, fraction=False, edge_month=False):
+    """
+    Read the number of months left to the event from the countdown snapshot and format it as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :param fraction: Indicates whether the result asked should only return months as a fraction of a year or in
+    total. This parameter is necessary when displaying a 'summary' string that list years, months and days
+    :type fraction: bool
+    :param edge_month: Whether the result must be subtracted one month or not
+    :type edge_month: bool
+    :return: Human-readable information for the days left to the event
+    :rtype: tuple[str]
+    """
 
-        :param edge_year: Whether the result must be subtracted one year or not
-        :type edge_year: bool
-        :return: Human-readable information for the years left to the event
-        :rtype: str
-        """
+    # Shorten locale path
+    lang = locales[locale]['calculations']
 
-        # Get the number of years left. Adjust for edge year if required
-        if edge_year:
-            years = format_num(years_left() - 1)
+    # Get the number of months left, depending on whether the request is for total months or the fraction of a year.
+    # Adjust the result for edge month if required
+    if fraction:
+        if edge_month:
+            input_data = 11
         else:
-            years = format_num(years_left())
+            input_data = snapshot.year_fraction
+
+        months = format_num(input_data, locale)
+
+    else:
+        months = format_num(snapshot.months, locale)
+
+    # Check whether the result is 1, and then return the appropriate string
+    if months == '1':
+        return lang['1_month'], lang['base_string_verb_suffix_null']
+
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_months'].format(months), lang['base_string_verb_suffix']
+
+
+def format_years(snapshot, locale, edge_year=False):
+    """
+    Read the number of years left to the event from the countdown snapshot and format it as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :param edge_year: Whether the result must be subtracted one year or not
+    :type edge_year: bool
+    :return: Human-readable information for the years left to the event
+    :rtype: tuple[str]
+    """
+
+    # Shorten locale path
+    lang = locales[locale]['calculations']
+
+    # Get the number of years left. Adjust for edge year if required
+    if edge_year:
+        years = format_num(snapshot.years - 1, locale)
+    else:
+        years = format_num(snapshot.years, locale)
+
+    # Check whether the result is 1, and then return the appropriate string
+    if years == '1':
+        return lang['1_year'], lang['base_string_verb_suffix_null']
+
+    # If the number is greater than 1, return plural noun by default
+    return lang['x_years'].format(years), lang['base_string_verb_suffix']
+
+
+def format_ymd(snapshot, locale):
+    """
+    Ask the format_years(), format_months(), format_days() functions for the number of years, months and days left
+    to the event and format its results as a human-readable string that summarises the time left to the event.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: Human-readable summary information for the time left to the event
+    :rtype: tuple[str] or None
+    """
+
+    # Shorten locale path
+    lang = locales[locale]['calculations']
+
+    # Get the number of seconds left and use it to detect if the event date and time has already passed before
+    # returning any summary string
+    if snapshot.seconds < 1:
+        return None
+
+    # Check if event month and current month are the same one, and whether the current day is greater than the event
+    # If that happens, we are on the edge between years and the output must be adjusted by subtracting one month
+    # and one year. This will ensure displaying a human-friendly string
+    if snapshot.edge_year:
+        years = format_years(snapshot=snapshot, locale=locale, edge_year=True)[0]
+        months = format_months(snapshot=snapshot, locale=locale, fraction=True, edge_month=True)[0]
+    else:
+        years = format_years(snapshot=snapshot, locale=locale)[0]
+        months = format_months(snapshot=snapshot, locale=locale, fraction=True)[0]
+
+    # Get the number of years, months and days left
+    ymd = {'years': years, 'months': months, 'days': format_days(snapshot=snapshot, locale=locale, relative=True)[0]}
 
-        # Check whether the result is 1, and then return the appropriate string
-        if years == '1':
-            return lang['1_year'], null_suffix
+    # If the number of seconds is greater than 1, return the default string
+    return lang['ymd'].format(ymd['years'], ymd['months'], ymd['days']), lang['base_string_verb_suffix']
 
-        # If the number is greater than 1, return plural noun by default
-        return lang['x_years'].format(years), verb_suffix
 
-    def format_ymd():
+def format_date(snapshot, locale):
+    """
+    Get the event date and return it formatted as a human-readable string.
+
+    :param snapshot: Countdown snapshot that holds the calculations for the current time (not needed for the date)
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: Human-readable information for the event date
+    :rtype: str
+    """
+
+    # Shorten locale path
+    lang = locales[locale]['calculations']
+
+    # Return the date appropriately formatted
+    return lang['format_date_base_string'].format(
+        leave_date.day, lang['month_names'][month_keys[leave_date.month - 1]], leave_date.year, leave_date.hour,
+        leave_date.minute, leave_date.second)
+
+
+# Map of internal operations. Each command key is linked to the function that formats its reply, so that only the
+# requested operation is evaluated when a user asks for it
+operations_map = {
+    'date': format_date,
+    'summary': format_ymd,
+    'years': format_years,
+    'months': format_months,
+    'days': format_days,
+    'hours': format_hours,
+    'minutes': format_minutes,
+    'seconds': format_seconds
+}
+
+# Tables that link every normalised (i.e. without tildes) localised command to its internal command key, for every
+# available locale. They're built only once when this module is imported, so that requests don't need to normalise
+# every available command again
+command_tables = {locale: {fast_remove_tildes(word=locales[locale]['calculations']['commands'][command_key]):
+                           command_key for command_key in operations_map} for locale in locales}
+command_table = command_tables[config.bot_locale]
+
+
+class RenderCache(object):
+    """
+    This class creates a cache for the replies rendered by the get_date() function. As every countdown unit only
+    changes at certain boundaries (e.g. the hours left only change once an hour, and the event date never changes),
+    each reply is stored along with the moment it expires and reused by every request made before that moment. It also
+    counts the number of hits and misses, which is useful to check how effective the cache is.
+    """
+
+    def __init__(self):
+        """
+        This method initialises an empty cache, along with the lock that makes it safe to use from several threads.
         """
-        Ask the format_years(), format_months(), format_days() functions for the number of years, months and days left
-        to the event and format its results as a human-readable string that summarises the time left to the event.
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
 
-        :return: Human-readable summary information for the time left to the event
-        :rtype: str
+    def get(self, key, timestamp_ns):
         """
+        This method returns the reply cached for a given key, as long as it's still valid at the given moment.
+
+        :param key: The cache key, made of the locale and the internal command key (e.g. ('es-CL', 'hours'))
+        :type key: tuple[str]
+        :param timestamp_ns: Nanoseconds since the POSIX epoch of the moment when the reply is requested
+        :type timestamp_ns: int
+        :return: The cached reply, or None if there's no valid reply for that moment
+        :rtype: str or None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+
+            # Check whether the entry was rendered before the requested moment and it hasn't expired yet
+            if entry is not None and entry[1] <= timestamp_ns and (entry[2] is None or timestamp_ns < entry[2]):
+                self.hits += 1
+                return entry[0]
 
-        # Get the number of seconds left and use it to detect if the event date and time has already passed before
-        # returning any summary string
-        delta = get_delta()
-        if delta.seconds < 1:
+            self.misses += 1
             return None
 
-        # Check if event month and current month are the same one, and whether the current day is greater than the event
-        # If that happens, we are on the edge between years and the output must be adjusted by subtracting one month
-        # and one year. This will ensure displaying a human-friendly string
-        now = get_now()
-        if (leave_date.month == now.month) and (leave_date.day < now.day):
-            years = format_years(edge_year=True)[0]
-            months = format_months(fraction=True, edge_month=True)[0]
-        else:
-            years = format_years()[0]
-            months = format_months(fraction=True)[0]
+    def put(self, key, reply, valid_from, expires_at):
+        """
+        This method stores a rendered reply in the cache, overwriting any previous reply stored for the same key.
+
+        :param key: The cache key, made of the locale and the internal command key (e.g. ('es-CL', 'hours'))
+        :type key: tuple[str]
+        :param reply: The rendered reply
+        :type reply: str
+        :param valid_from: Nanoseconds since the POSIX epoch of the moment the reply was calculated for
+        :type valid_from: int
+        :param expires_at: Nanoseconds since the POSIX epoch when the reply stops being valid, or None if it never
+        expires
+        :type expires_at: int or None
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.entries[key] = (reply, valid_from, expires_at)
 
-        # Get the number of years, months and days left
-        ymd = {'years': years, 'months': months, 'days': format_days(relative=True)[0]}
+    def clear(self):
+        """
+        This method removes every reply stored in the cache and resets its counters.
 
-        # If the number of seconds is greater than 1, return the default string
-        return lang['ymd'].format(ymd['years'], ymd['months'], ymd['days']), verb_suffix
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
 
-    def format_date():
+    def stats(self):
         """
-        Get the event date and return it formatted as a human-readable string.
+        This method reports how effective the cache has been so far.
 
-        :return: Human-readable information for the event date
-        :rtype: str
+        :return: The number of hits, misses, and replies currently stored in the cache
+        :rtype: dict[int]
         """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+
+# Start a render cache shared by every request
+render_cache = RenderCache()
 
-        # Get the localised name for all months and assign each one to its calendar number
-        month_locales = lang['month_names']
-        month_names = {'1': month_locales['January'], '2': month_locales['February'], '3': month_locales['March'],
-                       '4': month_locales['April'], '5': month_locales['May'], '6': month_locales['June'],
-                       '7': month_locales['July'], '8': month_locales['August'], '9': month_locales['September'],
-                       '10': month_locales['October'], '11': month_locales['November'], '12': month_locales['December']}
-
-        # Return the date appropriately formatted
-        return lang['format_date_base_string'].format(
-            leave_date.day, month_names[str(leave_date.month)], leave_date.year, leave_date.hour, leave_date.minute,
-            leave_date.second)
-
-    # ### End of internal functions ###
-
-    # Map of internal operations
-    operations_map = {
-        remove_tildes(word=lang_commands['date']): format_date(),
-        remove_tildes(word=lang_commands['summary']): format_ymd(),
-        remove_tildes(word=lang_commands['years']): format_years(),
-        remove_tildes(word=lang_commands['months']): format_months(),
-        remove_tildes(word=lang_commands['days']): format_days(),
-        remove_tildes(word=lang_commands['hours']): format_hours(),
-        remove_tildes(word=lang_commands['minutes']): format_minutes(),
-        remove_tildes(word=lang_commands['seconds']): format_seconds()
-    }
-
-    # Execute operation requested
-    operation_result = operations_map[data_request]
+
+def render_reply(command_key, snapshot, locale):
+    """
+    Execute the operation linked to an internal command key and format the result as the final human-readable reply.
+
+    :param command_key: The internal key of the requested command (e.g. 'hours')
+    :type command_key: str
+    :param snapshot: Countdown snapshot to read the calculations from
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale that should be used to format the reply (e.g. 'es-CL')
+    :type locale: str
+    :return: The calculated time and/or date difference information
+    :rtype: str
+    """
+
+    # Shorten locale path
+    lang = locales[locale]['calculations']
+
+    # Execute only the operation requested
+    operation_result = operations_map[command_key](snapshot, locale)
 
     # Return formatted string
     if operation_result is None:
         return lang['event_date_met']
-    if data_request == lang_commands['date']:
+    if command_key == 'date':
         return operation_result
     else:
-        return base_str.format(operation_result[1], operation_result[0])
+        return lang['base_string'].format(operation_result[1], operation_result[0])
+
+
+def get_date(data_request, snapshot=None, locale=None):
+    """
+    Calculate the requested date and/or time difference requested by the user and then format the information as a
+    human-readable string. Replies are served from the render cache while the requested unit hasn't changed.
+
+    :param data_request: The type of information requested (a localised command, preferably already normalised)
+    :type data_request: str
+    :param snapshot: Countdown snapshot to read the calculations from. Provide the same snapshot when a reply combines
+    several units so that all of them are consistent. If omitted, a new one will be taken
+    :type snapshot: CountdownSnapshot
+    :param locale: The locale of the requested command and the reply. If omitted, the one set in config.py will be used
+    :type locale: str
+    :return: The calculated time and/or date difference information
+    :rtype: str
+    """
+
+    # Use the default locale if none was requested
+    if locale is None:
+        locale = config.bot_locale
+
+    # Find the internal command key linked to the requested operation. If the command wasn't found, it may have not
+    # been normalised yet, so normalise it and look it up again
+    command_key = command_tables[locale].get(data_request)
+    if command_key is None:
+        command_key = command_tables[locale][fast_remove_tildes(word=data_request.lower())]
+
+    # Check whether there's a cached reply that is still valid at the time of the request
+    cache_key = (locale, command_key)
+    reply = render_cache.get(key=cache_key, timestamp_ns=clock.time_ns() if snapshot is None else snapshot.timestamp_ns)
+    if reply is not None:
+        return reply
+
+    # Take a snapshot of the countdown if the caller didn't provide one
+    if snapshot is None:
+        snapshot = CountdownSnapshot()
+
+    # Render the reply and store it in the cache until its value changes
+    reply = render_reply(command_key=command_key, snapshot=snapshot, locale=locale)
+    render_cache.put(key=cache_key, reply=reply, valid_from=snapshot.timestamp_ns,
+                     expires_at=snapshot.expires_at(command_key=command_key))
+
+    return reply
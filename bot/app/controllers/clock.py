@@ -0,0 +1,278 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module provides the clock that every other module should use to read the current time or to wait, instead of
+    reading the system clock directly. By default it's the system clock, but it can be replaced by a frozen, offset or
+    accelerated clock, which makes it possible to test or simulate any moment of the countdown (e.g. the final seconds
+    before the event) without waiting for it to happen.
+"""
+
+import time
+import threading
+from datetime import datetime, timezone
+from bot.app.controllers.logger import *
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = 10 ** 9
+
+
+class SystemClock(object):
+    """
+    This class creates a clock that reads the time from the operating system. Other clocks inherit from it and only
+    need to override the time_ns(), monotonic_ns() and sleep() methods.
+    """
+
+    def time_ns(self):
+        """
+        Get the current time.
+
+        :return: Nanoseconds since the POSIX epoch
+        :rtype: int
+        """
+        return time.time_ns()
+
+    def monotonic_ns(self):
+        """
+        Get the value of a clock that never goes backwards, which is appropriate to measure intervals or to schedule
+        deadlines.
+
+        :return: Nanoseconds since an arbitrary reference point
+        :rtype: int
+        """
+        return time.monotonic_ns()
+
+    def sleep(self, seconds):
+        """
+        Wait for a number of seconds.
+
+        :param seconds: Number of seconds to wait
+        :type seconds: float
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def now(self, tz=timezone.utc):
+        """
+        Get the current time as a timezone-aware datetime object.
+
+        :param tz: The time zone of the result. It defaults to UTC
+        :type tz: datetime.tzinfo
+        :return: Current time and date
+        :rtype: datetime
+        """
+        return datetime.fromtimestamp(self.time_ns() / ns_per_second, tz=tz)
+
+
+class FrozenClock(SystemClock):
+    """
+    This class creates a clock that stands still at a given moment until it's explicitly moved. Waiting on this clock
+    returns immediately after moving it forward by the time requested.
+    """
+
+    def __init__(self, timestamp_ns):
+        """
+        This method initialises a clock frozen at a given moment.
+
+        :param timestamp_ns: Nanoseconds since the POSIX epoch when the clock is frozen
+        :type timestamp_ns: int
+        """
+        self.timestamp_ns = timestamp_ns
+        self.elapsed_ns = 0
+        self.lock = threading.Lock()
+
+    def time_ns(self):
+        with self.lock:
+            return self.timestamp_ns
+
+    def monotonic_ns(self):
+        with self.lock:
+            return self.elapsed_ns
+
+    def set(self, timestamp_ns):
+        """
+        Move the clock to a given moment.
+
+        :param timestamp_ns: Nanoseconds since the POSIX epoch where the clock should be moved to
+        :type timestamp_ns: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.elapsed_ns += max(timestamp_ns - self.timestamp_ns, 0)
+            self.timestamp_ns = timestamp_ns
+
+    def advance(self, seconds):
+        """
+        Move the clock forward by a number of seconds.
+
+        :param seconds: Number of seconds to move forward
+        :type seconds: float
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.timestamp_ns += int(seconds * ns_per_second)
+            self.elapsed_ns += int(seconds * ns_per_second)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.advance(seconds=seconds)
+
+
+class OffsetClock(SystemClock):
+    """
+    This class creates a clock that runs at the same pace as the system clock, but shifted by a fixed offset (e.g. to
+    pretend that it's ten minutes before the event date).
+    """
+
+    def __init__(self, offset_ns=0, timestamp_ns=None):
+        """
+        This method initialises a clock shifted from the system clock, either by a given offset or so that the current
+        time matches a given moment.
+
+        :param offset_ns: Nanoseconds to add to the system clock
+        :type offset_ns: int
+        :param timestamp_ns: Nanoseconds since the POSIX epoch that the clock should show right now. If provided, it
+        overrides the offset_ns parameter
+        :type timestamp_ns: int
+        """
+        if timestamp_ns is not None:
+            offset_ns = timestamp_ns - time.time_ns()
+        self.offset_ns = offset_ns
+
+    def time_ns(self):
+        return time.time_ns() + self.offset_ns
+
+
+class AcceleratedClock(SystemClock):
+    """
+    This class creates a clock that starts at a given moment and then runs faster than the system clock by a given
+    factor. Waiting on this clock only takes the fraction of real time that corresponds to its speed, which makes it
+    possible to replay a long period of time in a few seconds.
+    """
+
+    def __init__(self, speed, timestamp_ns=None):
+        """
+        This method initialises a clock that runs faster than the system clock.
+
+        :param speed: How many times faster than the system clock this clock runs (e.g. 3600 replays an hour in a
+        second)
+        :type speed: float
+        :param timestamp_ns: Nanoseconds since the POSIX epoch when this clock starts. If omitted, it will start at the
+        current time
+        :type timestamp_ns: int
+        """
+        self.speed = speed
+        self.origin_ns = time.time_ns() if timestamp_ns is None else timestamp_ns
+        self.real_origin_ns = time.monotonic_ns()
+
+    def monotonic_ns(self):
+        return int((time.monotonic_ns() - self.real_origin_ns) * self.speed)
+
+    def time_ns(self):
+        return self.origin_ns + self.monotonic_ns()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+
+# Start with the system clock
+current_clock = SystemClock()
+
+
+def get_clock():
+    """
+    Get the clock that is currently in use.
+
+    :return: The current clock
+    :rtype: SystemClock
+    """
+    return current_clock
+
+
+def set_clock(new_clock):
+    """
+    Replace the clock used by every module. Remember to restore the previous clock once you're done with it!
+
+    :param new_clock: The clock that should be used from now on. If None, the system clock will be restored
+    :type new_clock: SystemClock or None
+    :return: The clock that was in use before
+    :rtype: SystemClock
+    """
+    global current_clock
+
+    # Swap the clocks and return the previous one
+    previous_clock = current_clock
+    current_clock = new_clock if new_clock is not None else SystemClock()
+    logger.debug(msg='Clock set to: {0}'.format(type(current_clock).__name__))
+
+    return previous_clock
+
+
+def time_ns():
+    """
+    Get the current time from the clock in use.
+
+    :return: Nanoseconds since the POSIX epoch
+    :rtype: int
+    """
+    return current_clock.time_ns()
+
+
+def monotonic_ns():
+    """
+    Get the value of the monotonic clock in use.
+
+    :return: Nanoseconds since an arbitrary reference point
+    :rtype: int
+    """
+    return current_clock.monotonic_ns()
+
+
+def sleep(seconds):
+    """
+    Wait for a number of seconds according to the clock in use.
+
+    :param seconds: Number of seconds to wait
+    :type seconds: float
+    :return: No usable data is returned by this function
+    :rtype: None
+    """
+    current_clock.sleep(seconds)
+
+
+def now(tz=timezone.utc):
+    """
+    Get the current time from the clock in use as a timezone-aware datetime object.
+
+    :param tz: The time zone of the result. It defaults to UTC
+    :type tz: datetime.tzinfo
+    :return: Current time and date
+    :rtype: datetime
+    """
+    return current_clock.now(tz=tz)
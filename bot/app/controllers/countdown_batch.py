@@ -0,0 +1,258 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module calculates the countdown for many moments at once, using NumPy to vectorise the same integer arithmetic
+    the calculations module applies to a single moment. It's meant to preview a whole campaign of reminders (e.g. every
+    hourly reminder from now until the event date, as scheduled by the CRON jobs in cron.yaml) without calling
+    calculations.get_date() in a loop with a patched clock.
+
+    NumPy isn't installed with the bot, as this module is only used offline: install it from the
+    benchmarks/requirements.txt file.
+"""
+
+import numpy
+from datetime import datetime
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from bot.app.controllers import calculations
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = calculations.ns_per_second
+seconds_per_day = 24 * 3600
+leave_date = calculations.leave_date
+month_lengths = numpy.array(calculations.month_lengths, dtype=numpy.int64)
+
+# Columns of the countdown arrays that each command depends on. Replies are rendered once for every distinct
+# combination of these values, rather than once for every moment. The summary only reads the seconds left to tell
+# whether the event date has been met, so it depends on that flag rather than on the seconds themselves
+render_columns = {
+    'date': (),
+    'summary': ('event_met', 'edge_year', 'years', 'year_fraction', 'relative_days'),
+    'years': ('years',),
+    'months': ('months',),
+    'days': ('days',),
+    'hours': ('hours',),
+    'minutes': ('minutes',),
+    'seconds': ('seconds',)
+}
+
+
+def reminder_slots(interval=3600, start_ns=None, end_ns=None):
+    """
+    Generate the moments when a periodic reminder would be sent, from now (or any other moment) until the event date.
+
+    :param interval: The number of seconds between reminders. It defaults to one hour
+    :type interval: int
+    :param start_ns: Nanoseconds since the POSIX epoch of the first reminder. If omitted, it will be the current time
+    :type start_ns: int
+    :param end_ns: Nanoseconds since the POSIX epoch when reminders stop (excluded). If omitted, it will be the event
+    date
+    :type end_ns: int
+    :return: Nanoseconds since the POSIX epoch of every reminder
+    :rtype: numpy.ndarray
+    """
+
+    # Set default values for the beginning and end of the reminders
+    if start_ns is None:
+        start_ns = calculations.CountdownSnapshot().timestamp_ns
+    if end_ns is None:
+        end_ns = calculations.event_epoch_ns
+
+    return numpy.arange(start_ns, end_ns, interval * ns_per_second, dtype=numpy.int64)
+
+
+def utc_offset(timestamp):
+    """
+    Get the offset between UTC and the time zone set for this server at a given moment.
+
+    :param timestamp: Seconds since the POSIX epoch
+    :type timestamp: int
+    :return: The UTC offset in seconds
+    :rtype: int
+    """
+    return int(datetime.fromtimestamp(timestamp, tz=config.server_timezone).utcoffset().total_seconds())
+
+
+def get_utc_offsets(timestamps):
+    """
+    Get the offset between UTC and the time zone set for this server for many moments at once. Rather than asking the
+    time zone library about every moment, it's only asked once per day within the range of moments, and the exact
+    second of every daylight saving change is then found by bisection.
+
+    :param timestamps: Seconds since the POSIX epoch
+    :type timestamps: numpy.ndarray
+    :return: The UTC offset in seconds for every moment
+    :rtype: numpy.ndarray
+    """
+
+    # There's nothing to look up if there are no moments (e.g. once the event date has passed)
+    if timestamps.size == 0:
+        return numpy.zeros(timestamps.shape, dtype=numpy.int64)
+
+    # Sample the offset once a day, from the first moment until (at least) the last one
+    first, last = int(timestamps.min()), int(timestamps.max())
+    samples = list(range(first, last + seconds_per_day, seconds_per_day))
+    offsets = [utc_offset(timestamp=sample) for sample in samples]
+
+    # Start with the offset of the first moment, and then apply every change found between two consecutive samples
+    result = numpy.full(timestamps.shape, offsets[0], dtype=numpy.int64)
+    for index in range(1, len(samples)):
+        if offsets[index] != offsets[index - 1]:
+            # Find the first second that uses the new offset
+            low, high = samples[index - 1], samples[index]
+            while high - low > 1:
+                middle = (low + high) // 2
+                if utc_offset(timestamp=middle) == offsets[index - 1]:
+                    low = middle
+                else:
+                    high = middle
+
+            # Apply the new offset to every moment from that second onwards
+            result[timestamps >= high] = offsets[index]
+
+    return result
+
+
+def civil_from_days(days):
+    """
+    Convert a number of days since the POSIX epoch to the year, month and day of the (proleptic Gregorian) calendar,
+    using only integer arithmetic so that it can be applied to whole arrays.
+
+    :param days: Days since 1970-01-01
+    :type days: numpy.ndarray
+    :return: The year, month and day for every number of days
+    :rtype: tuple[numpy.ndarray]
+    """
+
+    # Shift the epoch to 0000-03-01, so that leap days are at the end of each year, and split it in 400-year eras
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+
+    # Convert the day of the (March-based) year to month and day
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = numpy.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+
+    return year, month, day
+
+
+def get_countdowns(timestamps_ns):
+    """
+    Calculate every unit of the countdown for many moments at once. The results are the same that a CountdownSnapshot
+    would hold for each one of those moments.
+
+    :param timestamps_ns: Nanoseconds since the POSIX epoch of every moment
+    :type timestamps_ns: numpy.ndarray or list[int]
+    :return: An array for each unit of the countdown, named after the attributes of the CountdownSnapshot class, and
+    whether the event date has been met
+    :rtype: dict[numpy.ndarray]
+    """
+
+    # Make sure we work with an array of 64-bit integers
+    timestamps_ns = numpy.asarray(timestamps_ns, dtype=numpy.int64)
+
+    # Calculate the total amount of full seconds left, and then derive the other units from it
+    remaining_ns = calculations.event_epoch_ns - timestamps_ns
+    seconds = remaining_ns // ns_per_second
+
+    # Convert every moment to its local calendar day
+    timestamps = timestamps_ns // ns_per_second
+    local_days = (timestamps + get_utc_offsets(timestamps=timestamps)) // seconds_per_day
+    year, month, day = civil_from_days(days=local_days)
+
+    # Calculate the number of full months between the event month and the current one, and from it the total number of
+    # months and years left
+    year_fraction = (leave_date.month - month) % 12
+    months = (leave_date.year - year) * 12 + year_fraction
+
+    # Calculate the days left within a single month, adding one day to February on leap years
+    leap_year = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days_this_month = month_lengths[month - 1] + ((month == 2) & leap_year)
+    relative_days = (leave_date.day + (days_this_month - day)) % days_this_month
+
+    # Find when every local day ends. The UTC offset of the next midnight may differ from the current one if there's a
+    # daylight saving change during the day, so it's read again for the estimated midnight
+    next_midnights = (local_days + 1) * seconds_per_day
+    day_ends = next_midnights - get_utc_offsets(timestamps=next_midnights - get_utc_offsets(timestamps=timestamps))
+
+    # Collect the results
+    return {'timestamp_ns': timestamps_ns, 'remaining_ns': remaining_ns, 'seconds': seconds, 'minutes': seconds // 60,
+            'hours': seconds // 3600, 'days': seconds // seconds_per_day, 'relative_days': relative_days,
+            'months': months, 'year_fraction': year_fraction, 'years': months // 12,
+            'edge_year': (leave_date.month == month) & (leave_date.day < day),
+            'day_end_ns': day_ends * ns_per_second, 'event_met': seconds < 1}
+
+
+def render_countdowns(command, countdowns, locale=None, template='{0}'):
+    """
+    Format the replies for a given command for every moment in a batch of countdowns. As many moments share the same
+    reply (e.g. all hourly reminders within a day share the number of days left), each distinct reply is only rendered
+    once.
+
+    :param command: The internal key of the command to render (e.g. 'hours')
+    :type command: str
+    :param countdowns: The countdowns returned by the get_countdowns() function
+    :type countdowns: dict[numpy.ndarray]
+    :param locale: The locale that should be used to format the replies. If omitted, the one set in config.py will be
+    used
+    :type locale: str
+    :param template: Text where each reply will be inserted, e.g. one of the Twitter reminder strings in l10n.py
+    :type template: str
+    :return: The text of the reply for every moment
+    :rtype: list[str]
+    """
+
+    # Use the default locale if none was requested
+    if locale is None:
+        locale = config.bot_locale
+
+    # There's nothing to render if there are no moments (e.g. once the event date has passed)
+    size = len(countdowns['timestamp_ns'])
+    if size == 0:
+        return []
+
+    # Find the distinct combinations of the values the command depends on
+    columns = render_columns[command]
+    if columns:
+        keys = numpy.stack([countdowns[column].astype(numpy.int64) for column in columns], axis=1)
+        _, first_rows, inverse = numpy.unique(keys, axis=0, return_index=True, return_inverse=True)
+    else:
+        first_rows, inverse = numpy.zeros(1, dtype=numpy.int64), numpy.zeros(size, dtype=numpy.int64)
+
+    # Render a single reply for each distinct combination, using the first moment that has it
+    names = calculations.CountdownSnapshot.__slots__
+    rows = zip(*[countdowns[name][first_rows].tolist() for name in names])
+    replies = []
+    for row in rows:
+        snapshot = calculations.CountdownSnapshot.from_values(**dict(zip(names, row)))
+        reply = calculations.render_reply(command_key=command, snapshot=snapshot, locale=locale)
+        replies.append(template.format(reply))
+
+    # Link every moment with its reply
+    return [replies[index] for index in inverse.reshape(-1).tolist()]
@@ -29,7 +29,7 @@
     using the Flask framework to capture requests and routing them to the bot modules.
 """
 from bot.app.controllers.logger import *
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import bot.app.secrets as secrets
 import bot.app.config as config
 from bot.app.views.l10n import locales
@@ -187,11 +187,18 @@ if config.serve_twitter:
 
     # Import the Twitter bot module only if bot is activated in the config file
     import bot.app.controllers.twitter_bot as tw_bot
+    from bot.app.controllers import rate_limits
+    from bot.app.controllers import ticker
+    from bot.app.controllers import scheduler
 
     # Authenticate your bot with Twitter servers and capture the API credentials to reuse them afterwards in
     # subsequent requests
     api = tw_bot.twitter_auth()
 
+    # Send the reminders from within the bot instead of the CRON jobs, if it was enabled in the config.py module
+    if config.use_scheduler:
+        scheduler.start_scheduler(api=api)
+
     # Set routes for Twitter requests
     @event_bot.route('/twitter/actions/{0}/whoami'.format(secrets.twitter_access_token), methods=['GET'])
     def twitter_whoami_router():
@@ -213,33 +220,67 @@ if config.serve_twitter:
     def get_rate_limit_status_router():
         """
         This route is specific for the Twitter bot. Use this route by visiting it with your web browser to read details
-        about the current consumption of API calls from your bot, as provided by Twitter servers. It only accepts HTTP
-        GET requests. Right now is enabled but it has no extra security measures implemented to avoid prying eyes from
-        your users (at least nothing beyond using your access token string in the URL, which only you should know).
-
-        :return: It displays details about your consumption of API calls for your bot, as informed by Twitter servers
+        about the current consumption of API calls from your bot, as tracked by its rate-limit ledger (so visiting it
+        doesn't use any API call). Add '?refresh=on' to the URL to synchronise the ledger with Twitter servers first. It
+        only accepts HTTP GET requests. Right now is enabled but it has no extra security measures implemented to avoid
+        prying eyes from your users (at least nothing beyond using your access token string in the URL, which only you
+        should know).
+
+        :return: It displays details about your consumption of API calls for your bot, and the actions deferred or
+        dropped because of rate limits
         :rtype: str
         """
 
+        # Synchronise the ledger with Twitter servers if requested
+        if request.args.get('refresh') == 'on':
+            rate_limits.ledger.seed(status=tw_bot.rate_limit_status(api=api))
+
         # Return details about your API calls for your bot to display them in the web browser
-        return jsonify(tw_bot.rate_limit_status(api=api))
+        return jsonify(rate_limits.ledger.status())
 
 
     @event_bot.route('/twitter/actions/{0}/follow-back'.format(secrets.twitter_access_token), methods=['GET'])
     def twitter_follow_back_router():
         """
-        This route is specific for the Twitter bot. Use this route by visiting it with your web browser to manually
-        make your bot follow every one of your followers back. It only accepts HTTP GET requests. Please note that
-        as this bot is configured to like and follow users back whenever it replies to the latest mentions, this method
-        is not really necessary and is only provided as a convenience feature in case of you may enable this bot for
-        administering an existing Twitter account where you were manually replying to mentions.
+        This route is specific for the Twitter bot. Use this route by visiting it with your web browser (or schedule it
+        in your cron.yaml file) to make your bot follow every one of your followers back. It only accepts HTTP GET
+        requests. Every visit runs a slice of the job, following a limited number of users within the rate limits, and
+        the next visit resumes it where it stopped, so it works even for accounts with lots of followers. Add
+        '?restart=on' to the URL to start the job over. Please note that as this bot is configured to like and follow
+        users back whenever it replies to the latest mentions, this method is not really necessary and is only
+        provided as a convenience feature in case of you may enable this bot for administering an existing Twitter
+        account where you were manually replying to mentions.
+
+        :return: An informative statement notifying you of the progress of the 'follow back' job
+        :rtype: str
+        """
 
-        :return: An informative statement notifying you that the 'follow back' procedure either succeeded or failed
+        # Run a slice of the job, starting over if requested
+        job = tw_bot.run_follow_back_job(api=api, restart=request.args.get('restart') == 'on')
+
+        # Return a message about the progress of the job
+        if job['status'] == 'done':
+            return lang_site_msg['follow_back_done'].format(job['followed'], job['scanned'])
+        else:
+            return lang_site_msg['follow_back_running'].format(job['followed_now'], job['followed'], job['scanned'])
+
+
+    @event_bot.route('/twitter/actions/{0}/follow-back/status'.format(secrets.twitter_access_token), methods=['GET'])
+    def twitter_follow_back_status_router():
+        """
+        This route is specific for the Twitter bot. Use this route by visiting it with your web browser to check the
+        progress of the 'follow back' job (i.e. its status, how many followers were checked and followed back, and when
+        it was started, last updated and finished) without running it. It only accepts HTTP GET requests.
+
+        :return: The progress of the 'follow back' job in JSON format
         :rtype: str
         """
 
-        # Return a success message
-        return tw_bot.follow_all_followers(api=api)
+        # Get the latest progress, as the job may have been run by another instance
+        tw_bot.follow_back_job.update_from_db()
+
+        # Return the progress of the job to display it in the web browser
+        return Response(tw_bot.follow_back_job.to_json(), mimetype='application/json')
 
 
     @event_bot.route('/twitter/actions/{0}/like-mention-tweets'.format(secrets.twitter_access_token), methods=['GET'])
@@ -259,9 +300,10 @@ if config.serve_twitter:
         # Get latest mentions
         tweets = tw_bot.check_mentions(api=api)
 
-        # Iterate over the list of mentions and 'like' those tweets
-        for item in tweets:
-            tw_bot.like_tweet(tweet=item)
+        # Iterate over the list of mentions (if there are any) and 'like' those tweets, unless they were already liked
+        for item in tweets['tweets'] or []:
+            tw_bot.like_tweet(tweet=item, ledger=tw_bot.tw_action_ledger)
+        tw_bot.tw_action_ledger.flush()
 
         # Return a success message to display in the web browser
         return lang_site_msg['job_done']
@@ -303,6 +345,8 @@ if config.serve_twitter:
         sorry about that) that visits this URL every few minutes. The default time lapse is every 10 minutes, which
         should be safe to ensure that you don't go over your quota of free Twitter API calls. Just make sure to set
         the same number of minutes for both the CRON job and the 'twitter_interval' variable in the config.py module.
+        If there are too many mentions waiting (e.g. after an outage), only the newest ones will be replied to. You can
+        also force that catch-up mode on or off by adding '?catch-up=on' or '?catch-up=off' to the URL.
 
         :return: An informative statement notifying you that the 'reply to mentions' procedure either processed some
         tweets or it had no work to do
@@ -312,54 +356,33 @@ if config.serve_twitter:
         # First grab the TwitterCursor instance activated in the twitter_bot module
         cursor = tw_bot.tw_cursor
 
-        # Then check if time difference between now and the last data update for the cursor is greater than twice the
-        # value of config.twitter_interval
-        if not cursor.is_it_recent():
-            # If the cursor data isn't recent, then reload that info from the database
-            cursor.update_from_db()
+        # Then reload the cursor data from the database, but only if the data held in memory isn't recent enough
+        cursor.refresh()
 
-        # Get the latest mentions
-        mentions = tw_bot.check_mentions(api=api, since_id=cursor.last_id)
+        # Check whether the catch-up mode was requested (e.g. '?catch-up=on'). By default it's enabled automatically
+        # when there are too many mentions waiting
+        catch_up = {'on': True, 'off': False}.get(request.args.get('catch-up'))
 
-        # Process every mention and then store the value of the 'tweet ID' for the latest mention processed
-        # First create a variable to hold the latest ID
-        last_reply_id = 0
-
-        # Check wheter the list of mentions is empty or not
-        if mentions['tweet_ids'] is not None:
-            # If the list wasn't empty, process every tweet
-            for unreplied_tweet in mentions['tweets']:
-                # Reply to the current tweet and store the data returned
-                last_reply = tw_bot.reply_tweet(api=api, tweet=unreplied_tweet)
-
-                # Collect the tweet ID from the reply variable above
-                last_reply_id = last_reply['tweet_id']
-
-                # Like this mention
-                tw_bot.like_tweet(tweet=unreplied_tweet)
-
-                # Follow author back
-                tw_bot.follow_user(tweet=unreplied_tweet)
+        # Process every mention newer than the cursor as they're retrieved (replying, liking, and following their
+        # authors back), saving the cursor after every batch of mentions. Count the actions deferred or dropped
+        # meanwhile because of rate limits
+        counters = rate_limits.ledger.counters()
+        result = tw_bot.reply_mentions(api=api, cursor=cursor, catch_up=catch_up)
+        rate_limited = rate_limits.ledger.counters_since(previous=counters)
 
+        # Check whether there were any mentions
+        if result['processed'] > 0:
             #  Grab the localised message for a 'job done' message
             site_msg = lang_site_msg['job_done']
         else:
-            # Otherwise, if the list of mentions was empty, simply grab the localised message for an 'I have no work
-            # to do' message
+            # Otherwise, if there were no mentions, simply grab the localised message for an 'I have no work to do'
+            # message
             site_msg = lang_site_msg['no_mentions']
 
-        # In Google App Engine there could be more than one instance of the bot running concurrently so we should
-        # compare if the tweet ID for the last mention that was processed by this bot instance is greater than the
-        # last_id recorded in the datastore
-        if last_reply_id > cursor.last_id:
-
-            # If it's greater, update the cursor last_id property and send cursor to datastore
-            cursor.set(obj_property='last_id', value=mentions['since_id'])
-            cursor.send_to_db()
-        else:
-
-            # If it's not greater, then another instance may have changed it so let's update the cursor's last_id anyway
-            cursor.update_from_db()
+        # Let you know about the actions deferred or dropped because of rate limits, if any
+        if len(rate_limited['deferred']) > 0 or len(rate_limited['dropped']) > 0:
+            site_msg = lang_site_msg['rate_limited'].format(site_msg, rate_limited['deferred'],
+                                                            rate_limited['dropped'])
 
         # Return the localised message set above in case this process was activated by a web browser visiting this URL
         return site_msg
@@ -469,16 +492,53 @@ if config.serve_twitter:
         simply creating a CRON job in your Linux/Unix server (haven't tested this program on any Windows server,
         sorry about that) that visits this URL at a certain minute.
 
-        :return: An informative statement notifying you that the method finished successfully
+        The reminders are sent every second over the final minute by a ticker running in the background, so this route
+        returns immediately. Visit the 'seconds-reminder/status' route to check their progress.
+
+        :return: An informative statement notifying you that the reminders started to be sent
         :rtype: str
         """
 
-        # Create a timer for the final 59 seconds
-        import time
+        # Start sending a reminder every second over the final minute
+        ticker.start_final_seconds(api=api)
 
-        for second in range(60):
-            tw_bot.reminder_tweet(api=api, command=lang_commands['seconds'])
-            time.sleep(1)
+        return lang_site_msg['ticker_started']
 
-        return lang_site_msg['job_done']
+
+    @event_bot.route('/twitter/actions/{0}/seconds-reminder/status'.format(secrets.twitter_access_token),
+                     methods=['GET'])
+    def final_seconds_status():
+        """
+        This route is specific for the Twitter bot. Use this route by visiting it with your web browser to check the
+        progress of the final seconds reminders sent by the ticker in this instance: how many reminders were sent,
+        deferred or missed, and how late they were sent (i.e. their jitter). It only accepts HTTP GET requests.
+
+        :return: The progress of the final seconds reminders in JSON format
+        :rtype: str
+        """
+
+        # Return an empty report if the ticker hasn't been started in this instance
+        if ticker.current_ticker is None:
+            return jsonify({})
+
+        return jsonify(ticker.current_ticker.status())
+
+
+    @event_bot.route('/twitter/actions/{0}/scheduler/status'.format(secrets.twitter_access_token), methods=['GET'])
+    def scheduler_status():
+        """
+        This route is specific for the Twitter bot. Use this route by visiting it with your web browser to check the
+        progress of the scheduler that sends the reminders from within the bot (if it was enabled in the config.py
+        module): whether this instance leads it, how many reminders were sent or skipped, how late they were sent (i.e.
+        their drift), and the next reminders due. It only accepts HTTP GET requests.
+
+        :return: The status of the scheduler in JSON format
+        :rtype: str
+        """
+
+        # Return an empty report if the scheduler hasn't been started in this instance
+        if scheduler.current_scheduler is None:
+            return jsonify({})
+
+        return jsonify(scheduler.current_scheduler.status())
 
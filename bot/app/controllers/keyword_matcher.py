@@ -0,0 +1,193 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module finds the command keywords written in a text (e.g. a tweet) in a single pass, no matter how many
+    keywords there are. It builds an Aho-Corasick automaton from the keywords of every locale available in l10n.py, so
+    that commands written in any language, including phrases of several words or keywords followed by punctuation marks
+    (e.g. 'días?'), are recognised and translated to their internal command key.
+"""
+
+from collections import deque
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from bot.app.views.l10n import locales, fast_remove_tildes
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+
+def normalise_text(text):
+    """
+    Normalise a text so that it can be compared against the keywords: convert all letters to lowercase and remove
+    tildes, as people tend to forget writing accents.
+
+    :param text: Text to normalise
+    :type text: str
+    :return: The normalised text
+    :rtype: str
+    """
+    return fast_remove_tildes(word=text.lower())
+
+
+def is_word_character(character, previous=False):
+    """
+    Check whether a character next to a keyword makes it part of a longer word, so that the keyword shouldn't be
+    recognised (e.g. 'dias' within 'diaspora', or within the username '@dias').
+
+    :param character: The character next to the keyword
+    :type character: str
+    :param previous: Whether the character precedes the keyword (instead of following it)
+    :type previous: bool
+    :return: True if the keyword is part of a longer word
+    :rtype: bool
+    """
+    return character.isalnum() or character == '_' or (previous and character == '@')
+
+
+class KeywordMatcher(object):
+    """
+    This class creates an Aho-Corasick automaton that finds every occurrence of a set of keywords within a text by
+    reading the text only once. Keywords are only recognised as whole words, i.e. when they're not preceded or followed
+    by a letter, a digit or an underscore. Keywords that are part of a username (i.e. preceded by '@') are ignored too.
+    """
+
+    def __init__(self, keywords):
+        """
+        This method builds the automaton for a set of keywords.
+
+        :param keywords: Dictionary that links every keyword to the value returned when it's found (e.g. the internal
+        command key). Keywords are normalised before building the automaton
+        :type keywords: dict[str]
+        """
+
+        # Create the root state. Every state has its transitions, its failure link, and the keywords that end in it
+        # (stored as tuples of keyword length and value)
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [[]]
+
+        # Add every keyword to the trie of states
+        for keyword, value in keywords.items():
+            normalised_keyword = normalise_text(text=keyword).strip()
+            if not normalised_keyword:
+                continue
+
+            state = 0
+            for character in normalised_keyword:
+                if character not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.failures.append(0)
+                    self.outputs.append([])
+                    self.transitions[state][character] = len(self.transitions) - 1
+                state = self.transitions[state][character]
+
+            # If two keywords are normalised to the same text, keep the first one
+            if self.outputs[state]:
+                logger.debug(msg='Keyword {0} is already linked to {1}'.format(keyword, self.outputs[state][0][1]))
+            else:
+                self.outputs[state].append((len(normalised_keyword), value))
+
+        # Link every state to the longest suffix of its text that is also a state, walking the trie breadth first so
+        # that shorter texts are always linked before longer ones. Each state also inherits the keywords of its link
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                failure = self.failures[state]
+                while failure and character not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                self.failures[next_state] = self.transitions[failure].get(character, 0)
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.failures[next_state]]
+
+    def find_all(self, text, normalised=False):
+        """
+        This method finds every keyword written as a whole word in a text.
+
+        :param text: The text where keywords should be searched for
+        :type text: str
+        :param normalised: Whether the text was already normalised with the normalise_text() function
+        :type normalised: bool
+        :return: The values linked to the keywords found, in the order they appear in the text
+        :rtype: list
+        """
+
+        # Normalise the text in the same way the keywords were normalised
+        if not normalised:
+            text = normalise_text(text=text)
+
+        # Read the text once, following transitions (or failure links when there's no transition)
+        found = []
+        state = 0
+        transitions = self.transitions
+        failures = self.failures
+        for position, character in enumerate(text):
+            while state and character not in transitions[state]:
+                state = failures[state]
+            state = transitions[state].get(character, 0)
+
+            # Collect every keyword that ends at this position, as long as it's a whole word
+            for length, value in self.outputs[state]:
+                start = position - length + 1
+                if (start == 0 or not is_word_character(text[start - 1], previous=True)) and \
+                        (position + 1 == len(text) or not is_word_character(text[position + 1])):
+                    found.append((start, value))
+
+        # Sort the keywords found by their position in the text
+        found.sort(key=lambda item: item[0])
+
+        return [value for _, value in found]
+
+    def find_commands(self, text, normalised=False):
+        """
+        This method finds every keyword in a text and returns the values linked to them, without duplicates.
+
+        :param text: The text where keywords should be searched for
+        :type text: str
+        :param normalised: Whether the text was already normalised with the normalise_text() function
+        :type normalised: bool
+        :return: The values linked to the keywords found, without duplicates and in the order they first appear
+        :rtype: list
+        """
+        return list(dict.fromkeys(self.find_all(text=text, normalised=normalised)))
+
+
+def build_commands_matcher():
+    """
+    Build a keyword matcher for the calculations commands of every locale available in l10n.py. Every localised command
+    is linked to its internal command key (e.g. both 'días' and 'days' are linked to 'days').
+
+    :return: The keyword matcher
+    :rtype: KeywordMatcher
+    """
+
+    # Collect the commands of every locale, starting with the one set in config.py so that it takes precedence
+    keywords = {}
+    for locale in [config.bot_locale] + [locale for locale in locales if locale != config.bot_locale]:
+        for command_key, command in locales[locale]['calculations']['commands'].items():
+            keywords.setdefault(command, command_key)
+
+    return KeywordMatcher(keywords=keywords)
+
+
+# Build the matcher for the calculations commands once, when this module is imported
+commands_matcher = build_commands_matcher()
@@ -0,0 +1,358 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module keeps a local ledger of the Twitter API rate limits, so that the Twitter bot knows in advance whether a
+    call would be rejected instead of waiting (and blocking the web server) until the limit resets. Every endpoint used
+    by the bot has a token bucket that holds the calls left in the current rate-limit window and is refilled when the
+    window resets. The buckets are seeded from the rate-limit status provided by Twitter servers and kept up to date
+    with the rate-limit headers of every response. Actions are either high priority (e.g. replies and reminders), which
+    may use every call left, or low priority (e.g. likes and follows), which leave a reserve for the former.
+"""
+
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from bot.app.controllers import clock
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = 10 ** 9
+high_priority = 'high'
+low_priority = 'low'
+
+# Set the default limits (calls per window, and window length in seconds) of every endpoint used by the bot, as
+# documented by Twitter for the Standard API. Twitter doesn't report the limits of the POST endpoints in its rate-limit
+# status, so these ones are used until the response headers tell otherwise
+default_limits = {
+    'statuses/mentions_timeline': (75, 15 * 60),
+    'statuses/update': (300, 3 * 60 * 60),
+    'favorites/create': (1000, 24 * 60 * 60),
+    'friendships/create': (400, 24 * 60 * 60),
+    'friendships/lookup': (15, 15 * 60),
+    'friends/ids': (15, 15 * 60),
+    'followers/ids': (15, 15 * 60)
+}
+
+
+class RateLimitExceeded(Exception):
+    """
+    This exception is raised when an action is deferred because the endpoint it needs has no calls left in the current
+    rate-limit window. The action should be retried after the window resets.
+    """
+
+    def __init__(self, endpoint, reset_ns):
+        """
+        This method stores the endpoint that was exhausted and the moment its window resets.
+
+        :param endpoint: The API endpoint (e.g. 'statuses/update')
+        :type endpoint: str
+        :param reset_ns: The moment the rate-limit window resets, in nanoseconds since the POSIX epoch
+        :type reset_ns: int
+        """
+        super().__init__('{0} is rate limited until {1}'.format(endpoint, reset_ns // ns_per_second))
+        self.endpoint = endpoint
+        self.reset_ns = reset_ns
+
+
+class TokenBucket(object):
+    """
+    This class creates a token bucket for a single endpoint. Twitter limits every endpoint to a number of calls in a
+    fixed window, so the bucket holds the calls left in the current window and is filled up again when it resets.
+    """
+
+    def __init__(self, limit, window, timestamp_ns=None):
+        """
+        This method creates a full bucket whose window starts at the moment provided.
+
+        :param limit: Number of calls allowed in every window
+        :type limit: int
+        :param window: Length of the window in seconds
+        :type window: int
+        :param timestamp_ns: The moment the window starts. If omitted, the current time will be used
+        :type timestamp_ns: int
+        """
+        if timestamp_ns is None:
+            timestamp_ns = clock.time_ns()
+
+        self.limit = limit
+        self.window_ns = window * ns_per_second
+        self.tokens = limit
+        self.reset_ns = timestamp_ns + self.window_ns
+
+    def refill(self, timestamp_ns):
+        """
+        Fill the bucket up again if its window has reset.
+
+        :param timestamp_ns: The current time, in nanoseconds since the POSIX epoch
+        :type timestamp_ns: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        if timestamp_ns >= self.reset_ns:
+            self.tokens = self.limit
+            self.reset_ns += ((timestamp_ns - self.reset_ns) // self.window_ns + 1) * self.window_ns
+
+    def acquire(self, count, reserve, timestamp_ns):
+        """
+        Take tokens from the bucket, if there are enough left without using the reserve.
+
+        :param count: Number of tokens (i.e. calls) needed
+        :type count: int
+        :param reserve: Number of tokens that must be left in the bucket
+        :type reserve: int
+        :param timestamp_ns: The current time, in nanoseconds since the POSIX epoch
+        :type timestamp_ns: int
+        :return: Whether the tokens were taken
+        :rtype: bool
+        """
+        self.refill(timestamp_ns=timestamp_ns)
+        if self.tokens - count < reserve:
+            return False
+
+        self.tokens -= count
+
+        return True
+
+    def update(self, limit, remaining, reset_ns):
+        """
+        Synchronise the bucket with the rate-limit data provided by Twitter servers.
+
+        :param limit: Number of calls allowed in every window
+        :type limit: int
+        :param remaining: Number of calls left in the current window
+        :type remaining: int
+        :param reset_ns: The moment the current window resets, in nanoseconds since the POSIX epoch
+        :type reset_ns: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        # Keep the lowest number of calls left if both refer to the same window, as other calls may be in progress
+        if reset_ns == self.reset_ns:
+            remaining = min(remaining, self.tokens)
+
+        self.limit = limit
+        self.tokens = remaining
+        self.reset_ns = reset_ns
+
+    def to_dict(self):
+        """
+        Get the current bucket data, in the same format used by Twitter servers.
+
+        :return: The calls allowed in every window, the calls left, and the moment the window resets (in seconds since
+        the POSIX epoch)
+        :rtype: dict[int]
+        """
+        return {'limit': self.limit, 'remaining': self.tokens, 'reset': self.reset_ns // ns_per_second}
+
+
+class RateLimitLedger(object):
+    """
+    This class creates a ledger that holds a token bucket for every endpoint used by the bot, and counts the actions
+    that were deferred or dropped because of rate limits. Its methods are thread safe, as mentions are processed
+    concurrently.
+    """
+
+    def __init__(self, limits=None):
+        """
+        This method creates a full bucket for every endpoint.
+
+        :param limits: Dictionary that links every endpoint to its limit and window length (in seconds). If omitted,
+        the default limits will be used
+        :type limits: dict[tuple[int]]
+        """
+        if limits is None:
+            limits = default_limits
+
+        self.lock = threading.Lock()
+        timestamp_ns = clock.time_ns()
+        self.buckets = {endpoint: TokenBucket(limit=limit, window=window, timestamp_ns=timestamp_ns)
+                        for endpoint, (limit, window) in limits.items()}
+        self.deferred = Counter()
+        self.dropped = Counter()
+
+    def seed(self, status):
+        """
+        Synchronise every bucket with the rate-limit status provided by Twitter servers (i.e. the data returned by
+        tweepy.API.rate_limit_status()). Endpoints missing from that status keep their current data.
+
+        :param status: The rate-limit status
+        :type status: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        resources = status.get('resources', {})
+        with self.lock:
+            for endpoint, bucket in self.buckets.items():
+                data = resources.get(endpoint.split('/')[0], {}).get('/{0}'.format(endpoint))
+                if data is not None:
+                    bucket.update(limit=int(data['limit']), remaining=int(data['remaining']),
+                                  reset_ns=int(data['reset']) * ns_per_second)
+
+    def update_from_response(self, response):
+        """
+        Synchronise the bucket of an endpoint with the rate-limit headers of a response from Twitter servers. The
+        endpoint is found from the URL of the request, so that responses to concurrent calls are never mixed up.
+
+        :param response: The last response received by the API object (i.e. tweepy.API.last_response)
+        :type response: requests.Response
+        :return: Whether the bucket was updated
+        :rtype: bool
+        """
+        # Ignore missing responses, responses to other endpoints, and responses without rate-limit headers
+        if response is None or getattr(response, 'url', None) is None:
+            return False
+        endpoint = urlparse(response.url).path.split('/', 2)[-1].rsplit('.json', 1)[0]
+        headers = response.headers
+        if endpoint not in self.buckets or 'x-rate-limit-remaining' not in headers:
+            return False
+
+        with self.lock:
+            bucket = self.buckets[endpoint]
+            bucket.update(limit=int(headers.get('x-rate-limit-limit', bucket.limit)),
+                          remaining=int(headers['x-rate-limit-remaining']),
+                          reset_ns=int(headers.get('x-rate-limit-reset', bucket.reset_ns // ns_per_second)) *
+                          ns_per_second)
+
+        return True
+
+    def exhaust(self, endpoint):
+        """
+        Empty the bucket of an endpoint until its window resets (e.g. after Twitter servers rejected a call because of
+        the rate limit).
+
+        :param endpoint: The API endpoint
+        :type endpoint: str
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.buckets[endpoint].tokens = 0
+
+    def acquire(self, endpoint, count=1, priority=high_priority):
+        """
+        Take the calls needed for an action from the bucket of its endpoint. High priority actions may use every call
+        left, whereas low priority ones must leave a reserve (i.e. the twitter_rate_limit_reserve fraction of the limit
+        set in the config.py module) for the former.
+
+        :param endpoint: The API endpoint
+        :type endpoint: str
+        :param count: Number of calls needed
+        :type count: int
+        :param priority: Priority of the action, either 'high' or 'low'
+        :type priority: str
+        :return: Whether the calls were taken
+        :rtype: bool
+        """
+        with self.lock:
+            bucket = self.buckets[endpoint]
+            reserve = 0 if priority == high_priority else int(bucket.limit * config.twitter_rate_limit_reserve)
+
+            return bucket.acquire(count=count, reserve=reserve, timestamp_ns=clock.time_ns())
+
+    def require(self, endpoint, count=1, priority=high_priority):
+        """
+        Take the calls needed for an action that must be deferred if they aren't available, counting it as deferred.
+
+        :param endpoint: The API endpoint
+        :type endpoint: str
+        :param count: Number of calls needed
+        :type count: int
+        :param priority: Priority of the action, either 'high' or 'low'
+        :type priority: str
+        :return: No usable data is returned by this method
+        :rtype: None
+        :raises RateLimitExceeded: If the calls aren't available
+        """
+        if not self.acquire(endpoint=endpoint, count=count, priority=priority):
+            with self.lock:
+                self.deferred[endpoint] += 1
+                reset_ns = self.buckets[endpoint].reset_ns
+
+            raise RateLimitExceeded(endpoint=endpoint, reset_ns=reset_ns)
+
+    def allow(self, endpoint, count=1, priority=low_priority):
+        """
+        Take the calls needed for an action that must be dropped if they aren't available, counting it as dropped.
+
+        :param endpoint: The API endpoint
+        :type endpoint: str
+        :param count: Number of calls needed
+        :type count: int
+        :param priority: Priority of the action, either 'high' or 'low'
+        :type priority: str
+        :return: Whether the action may go ahead
+        :rtype: bool
+        """
+        if self.acquire(endpoint=endpoint, count=count, priority=priority):
+            return True
+
+        with self.lock:
+            self.dropped[endpoint] += 1
+
+        return False
+
+    def counters(self):
+        """
+        Get a copy of the number of actions deferred and dropped so far for every endpoint.
+
+        :return: The actions deferred and dropped
+        :rtype: dict[collections.Counter]
+        """
+        with self.lock:
+            return {'deferred': Counter(self.deferred), 'dropped': Counter(self.dropped)}
+
+    def counters_since(self, previous):
+        """
+        Get the number of actions deferred and dropped for every endpoint since a previous copy of the counters.
+
+        :param previous: Copy of the counters returned by the counters() method
+        :type previous: dict[collections.Counter]
+        :return: The actions deferred and dropped since then
+        :rtype: dict[dict[int]]
+        """
+        current = self.counters()
+
+        return {name: dict(current[name] - previous[name]) for name in current}
+
+    def status(self):
+        """
+        Get the current data of every bucket and the actions deferred and dropped so far, without calling Twitter
+        servers.
+
+        :return: The rate-limit data of every endpoint
+        :rtype: dict[dict]
+        """
+        with self.lock:
+            timestamp_ns = clock.time_ns()
+            for bucket in self.buckets.values():
+                bucket.refill(timestamp_ns=timestamp_ns)
+
+            return {'resources': {endpoint: bucket.to_dict() for endpoint, bucket in self.buckets.items()},
+                    'deferred': dict(self.deferred), 'dropped': dict(self.dropped)}
+
+
+# Create the ledger shared by every module
+ledger = RateLimitLedger()
@@ -0,0 +1,159 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module composes the replies sent by the Twitter bot. Instead of sending one tweet for every unit requested in a
+    mention, it packs them into as few replies as fit the length limit of a tweet, which is measured the same way Twitter
+    does (i.e. weighting every character according to its script). It also keeps track of the replies sent during a run,
+    so that the same reply isn't sent twice to the same user (which Twitter would reject as a duplicate status anyway).
+"""
+
+import threading
+from bot.app.controllers.logger import *
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set the maximum weighted length of a tweet. Every character weighs 2, except those in the ranges below, which weigh 1
+# (i.e. most Latin, Greek and Cyrillic letters, and common punctuation). This is the same configuration used by Twitter
+max_tweet_length = 280
+light_ranges = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+reply_separator = '\n'
+
+
+def weighted_length(text):
+    """
+    Measure the length of a text as Twitter does, so that it can be compared against the length limit of a tweet.
+
+    :param text: The text to measure
+    :type text: str
+    :return: The weighted length of the text
+    :rtype: int
+    """
+
+    # Texts made only of light characters (the usual case) weigh their length
+    if max(text, default='\x00') <= '\u10ff':
+        return len(text)
+
+    # Otherwise, weigh every character
+    length = 0
+    for character in text:
+        code = ord(character)
+        length += 1 if any(start <= code <= end for start, end in light_ranges) else 2
+
+    return length
+
+
+def compose_replies(parts, limit=None):
+    """
+    Pack the parts of a reply (e.g. the calculations for every unit requested) into as few replies as possible, keeping
+    their order and without splitting any of them, so that every reply fits the length limit of a tweet.
+
+    :param parts: Parts of the reply, in the order they should be sent
+    :type parts: list[str]
+    :param limit: Maximum weighted length of every reply. If omitted, the length limit of a tweet will be used
+    :type limit: int
+    :return: The replies
+    :rtype: list[str]
+    """
+
+    # Use the length limit of a tweet if none was requested
+    if limit is None:
+        limit = max_tweet_length
+
+    replies = []
+    current = None
+    current_length = 0
+    separator_length = weighted_length(reply_separator)
+    for part in parts:
+        part_length = weighted_length(part)
+
+        # Add this part to the current reply if it still fits. Otherwise, start a new reply with it
+        if current is not None and current_length + separator_length + part_length <= limit:
+            current = reply_separator.join((current, part))
+            current_length += separator_length + part_length
+        else:
+            if current is not None:
+                replies.append(current)
+            current = part
+            current_length = part_length
+
+    if current is not None:
+        replies.append(current)
+
+    return replies
+
+
+class SentReplies(object):
+    """
+    This class keeps track of the replies sent to every user during a run (e.g. while replying to a batch of mentions),
+    so that the same reply isn't sent twice to the same user. It's thread safe, as mentions are processed concurrently.
+    """
+
+    def __init__(self):
+        """
+        This method creates an empty record of replies.
+        """
+        self.lock = threading.Lock()
+        self.sent = set()
+
+    def was_sent(self, user_id, reply):
+        """
+        Check whether a reply was already sent to a user.
+
+        :param user_id: The ID of the user who would receive the reply
+        :type user_id: int
+        :param reply: The text of the reply
+        :type reply: str
+        :return: Whether the reply was already sent to that user
+        :rtype: bool
+        """
+        with self.lock:
+            return (user_id, reply) in self.sent
+
+    def add(self, user_id, reply):
+        """
+        Record a reply that was just sent to a user, unless it was already sent to that user.
+
+        :param user_id: The ID of the user who received the reply
+        :type user_id: int
+        :param reply: The text of the reply
+        :type reply: str
+        :return: Whether the reply is new (i.e. it wasn't recorded yet)
+        :rtype: bool
+        """
+        key = (user_id, reply)
+        with self.lock:
+            if key in self.sent:
+                return False
+            self.sent.add(key)
+
+            return True
+
+    def __len__(self):
+        """
+        Get the number of replies recorded.
+
+        :return: The number of replies recorded
+        :rtype: int
+        """
+        with self.lock:
+            return len(self.sent)
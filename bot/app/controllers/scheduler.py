@@ -0,0 +1,298 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+    This module provides an optional scheduler that sends the reminders from within the bot process, as an alternative
+    to the CRON jobs in cron-example.yaml visiting the reminder routes. That saves the HTTP round trip (and, on Google
+    App Engine, the cold start and the Twitter authentication) for every reminder, which is most useful when the bot
+    runs on a generic server. The reminders are kept in a heap ordered by their next due moment, which is aligned with
+    the event date (e.g. the hourly reminder is due a whole number of hours before the event), and the scheduler waits
+    for them in short steps against the wall clock, so that it corrects any drift. If the bot runs in more than one
+    process or instance, a leader lease makes sure that only one of them sends every reminder: a file lock on a generic
+    server, or an entity with an expiry time in the datastore on Google App Engine.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timezone
+from bot.app.controllers.logger import *
+from bot.app.controllers import calculations
+from bot.app.controllers import clock
+from bot.app.models.leases import DatastoreLease, FileLease
+from bot.app.views.l10n import locales
+import bot.app.config as config
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = clock.ns_per_second
+lang_log_msgs = locales[config.bot_locale]['log_msgs']
+
+# Reminders sent by the scheduler, the same ones sent by the CRON jobs in cron-example.yaml. Each one lists the command
+# it tweets, the number of seconds between reminders, how many seconds before its boundary the reminders start (None
+# if they're sent all along), and how many seconds earlier than the event date that boundary is. Reminders are never
+# due at the boundary itself, so the offset spreads the daily reminders over the day and stops the five-minute
+# reminders where the one-minute ones start (i.e. 55 to 10 minutes before the event, and then 9 to 1 minutes before
+# it). The 'seconds' reminder starts the ticker that sends the final seconds reminders
+default_schedule = [
+    ('hours', 3600, None, 0),
+    ('days', 24 * 3600, None, 0),
+    ('summary', 24 * 3600, None, 12 * 3600),
+    ('months', 24 * 3600, None, 7 * 3600),
+    ('minutes', 5 * 60, 50 * 60, 5 * 60),
+    ('minutes', 60, 9 * 60, 0),
+    ('seconds', 60, 60, 0)
+]
+
+# The scheduler currently in use, as only one of them should run in every process
+current_scheduler = None
+scheduler_lock = threading.Lock()
+
+
+def default_lease():
+    """
+    Create the leader lease that fits the platform where the bot runs.
+
+    :return: A datastore lease on Google App Engine, or a file lease otherwise
+    :rtype: DatastoreLease or FileLease
+    """
+    if config.use_app_engine:
+        return DatastoreLease(kind='scheduler_lease', name='reminder_scheduler', ttl=config.scheduler_lease_ttl)
+    else:
+        return FileLease(path=config.scheduler_lock_file)
+
+
+def next_moment(reminder, after_ns):
+    """
+    Find the first moment after a given one when a reminder is due. Reminders are due a whole number of intervals
+    before their boundary (i.e. the event date minus their offset), within their window, and never at the boundary
+    itself or after it.
+
+    :param reminder: The reminder as a (command, interval, window, offset) tuple
+    :type reminder: tuple
+    :param after_ns: Nanoseconds since the POSIX epoch after which the reminder should be due
+    :type after_ns: int
+    :return: Nanoseconds since the POSIX epoch when the reminder is due, or None if it won't be due anymore
+    :rtype: int or None
+    """
+    command, interval, window, offset = reminder
+    interval_ns = interval * ns_per_second
+    boundary_ns = calculations.event_epoch_ns - offset * ns_per_second
+
+    # Find the greatest number of intervals before the boundary that is still after the given moment (i.e. the earliest
+    # moment due), but not before the window starts
+    intervals = (boundary_ns - after_ns - 1) // interval_ns
+    if window is not None:
+        intervals = min(intervals, window // interval)
+    if intervals < 1:
+        return None
+
+    return boundary_ns - intervals * interval_ns
+
+
+class ReminderScheduler(object):
+    """
+    This class creates a scheduler that sends the reminders from a background thread. It can also be run in the current
+    thread with a simulated clock (e.g. a FrozenClock from the clock.py module) to replay the reminders quickly.
+    """
+
+    def __init__(self, api, schedule=None, lease=None, max_delay=None, max_sleep=60):
+        """
+        This method initialises a scheduler that hasn't started yet.
+
+        :param api: The API object returned by the authentication function
+        :type api: tweepy.API
+        :param schedule: The list of reminders as (command, interval, window, offset) tuples. It defaults to the same
+        reminders sent by the CRON jobs in cron-example.yaml
+        :type schedule: list[tuple]
+        :param lease: The leader lease that every reminder needs to be sent. If omitted, the one that fits the platform
+        will be used
+        :type lease: DatastoreLease or FileLease
+        :param max_delay: Seconds a reminder can be late before it's skipped. If omitted, the value of the
+        scheduler_max_delay variable in the config.py module will be used
+        :type max_delay: float
+        :param max_sleep: Maximum seconds waited at once, after which the time left is measured again
+        :type max_sleep: float
+        """
+        self.api = api
+        self.schedule = default_schedule if schedule is None else schedule
+        self.lease = default_lease() if lease is None else lease
+        self.max_delay_ns = int((config.scheduler_max_delay if max_delay is None else max_delay) * ns_per_second)
+        self.max_sleep_ns = int(max_sleep * ns_per_second)
+        self.thread = None
+        self.stopped = threading.Event()
+
+        # The heap of (moment due, index in the schedule) tuples, and collectors for the progress of the scheduler
+        self.heap = []
+        self.leader = False
+        self.sent = 0
+        self.skipped = 0
+        self.not_leader = 0
+        self.drifts_ns = []
+
+    def send(self, command):
+        """
+        Send a reminder. The 'seconds' reminder starts the ticker that sends a reminder every second over the final
+        minute, whereas every other reminder is tweeted straight away.
+
+        :param command: The internal key of the command (e.g. 'hours')
+        :type command: str
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+
+        # Import the Twitter bot only when needed, as the rest of this module doesn't require it
+        from bot.app.controllers import twitter_bot
+        from bot.app.controllers import ticker
+
+        if command == 'seconds':
+            ticker.start_final_seconds(api=self.api)
+        else:
+            twitter_bot.reminder_tweet(api=self.api, command=calculations.lang_commands[command])
+
+    def run(self):
+        """
+        Send every reminder when it's due in the current thread, until there are no more reminders due or the scheduler
+        is stopped.
+
+        :return: The status of the scheduler
+        :rtype: dict
+        """
+
+        # Find when every reminder is due next
+        timestamp_ns = clock.time_ns()
+        for index, reminder in enumerate(self.schedule):
+            moment_ns = next_moment(reminder=reminder, after_ns=timestamp_ns)
+            if moment_ns is not None:
+                heapq.heappush(self.heap, (moment_ns, index))
+
+        while self.heap and not self.stopped.is_set():
+            # Wait for the earliest reminder in short steps, measuring the time left against the wall clock every time
+            moment_ns, index = self.heap[0]
+            wait_ns = moment_ns - clock.time_ns()
+            if wait_ns > 0:
+                clock.sleep(min(wait_ns, self.max_sleep_ns) / ns_per_second)
+                continue
+
+            # Send the reminder, unless it's too late or another process or instance is the leader
+            heapq.heappop(self.heap)
+            command = self.schedule[index][0]
+            drift_ns = -wait_ns
+            if drift_ns > self.max_delay_ns:
+                self.skipped += 1
+                logger.warning(msg=lang_log_msgs['reminder_skipped'].format(command, drift_ns / 10 ** 6))
+            else:
+                # If the lease can't be checked (e.g. because the datastore is briefly unavailable), leave this
+                # reminder to another leader and keep the scheduler running
+                try:
+                    self.leader = self.lease.acquire()
+                except Exception as error:
+                    logger.exception(msg=lang_log_msgs['exception_occurred'].format(error))
+                    self.leader = False
+                if self.leader:
+                    self.drifts_ns.append(drift_ns)
+                    try:
+                        self.send(command=command)
+                        self.sent += 1
+                    except Exception as error:
+                        logger.exception(msg=lang_log_msgs['exception_occurred'].format(error))
+                else:
+                    self.not_leader += 1
+
+            # Schedule the next time this reminder is due
+            moment_ns = next_moment(reminder=self.schedule[index], after_ns=moment_ns)
+            if moment_ns is not None:
+                heapq.heappush(self.heap, (moment_ns, index))
+
+        return self.status()
+
+    def start(self):
+        """
+        Start sending the reminders from a background thread and return immediately.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.thread = threading.Thread(target=self.run, name='reminder-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop sending reminders and release the leader lease. The scheduler stops once its current wait step ends.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.stopped.set()
+        self.lease.release()
+
+    def is_running(self):
+        """
+        Check whether the scheduler is sending reminders from a background thread.
+
+        :return: Whether the background thread is alive
+        :rtype: bool
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def status(self):
+        """
+        Get the progress of the scheduler, the drift achieved so far, and the next reminders due.
+
+        :return: Whether it runs and leads, the number of reminders sent, skipped because they were too late, and left
+        to the leader, the mean and maximum drift (in milliseconds), and the next reminders due
+        :rtype: dict
+        """
+        drifts_ns = list(self.drifts_ns)
+        if drifts_ns:
+            mean_drift_ms = sum(drifts_ns) / len(drifts_ns) / 10 ** 6
+            max_drift_ms = max(drifts_ns) / 10 ** 6
+        else:
+            mean_drift_ms = max_drift_ms = 0.0
+
+        upcoming = [{'command': self.schedule[index][0],
+                     'due': datetime.fromtimestamp(moment_ns / ns_per_second, tz=timezone.utc).isoformat()}
+                    for moment_ns, index in sorted(list(self.heap))]
+
+        return {'running': self.is_running(), 'leader': self.leader, 'sent': self.sent, 'skipped': self.skipped,
+                'not_leader': self.not_leader, 'mean_drift_ms': mean_drift_ms, 'max_drift_ms': max_drift_ms,
+                'upcoming': upcoming}
+
+
+def start_scheduler(api):
+    """
+    Start sending the reminders from a background scheduler, unless it's running already.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :return: The scheduler sending the reminders
+    :rtype: ReminderScheduler
+    """
+    global current_scheduler
+
+    with scheduler_lock:
+        if current_scheduler is None or not current_scheduler.is_running():
+            current_scheduler = ReminderScheduler(api=api)
+            current_scheduler.start()
+
+        return current_scheduler
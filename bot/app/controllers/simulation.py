@@ -0,0 +1,230 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module replays the countdown timeline with a simulated clock, so that the reminders the bot would send over
+    days, months or a whole year can be exercised in a few seconds. It's useful to benchmark the throughput of the
+    reminder pipeline and to measure how much the final seconds reminders drift from their intended schedule. No request
+    is sent to Twitter unless you provide an action (or an API object) that does it.
+"""
+
+import heapq
+from bot.app.controllers.logger import *
+from bot.app.controllers import calculations
+from bot.app.controllers import clock
+from bot.app.views.l10n import fast_remove_tildes
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = clock.ns_per_second
+lang_commands = calculations.lang_commands
+
+# Reminders sent by the CRON jobs in cron-example.yaml. Each one lists the command it tweets, the number of seconds
+# between reminders, (optionally) how many seconds before the event date the reminders start, and (optionally) how many
+# seconds before the event date the last one is sent. The minutes reminders are sent every five minutes from 55 to 10
+# minutes before the event, and then every minute from 9 to 1 minutes before it
+default_schedule = [
+    ('hours', 3600, None),
+    ('summary', 24 * 3600, None),
+    ('days', 24 * 3600, None),
+    ('months', 24 * 3600, None),
+    ('minutes', 5 * 60, 55 * 60, 10 * 60),
+    ('minutes', 60, 9 * 60, 60),
+    ('seconds', 1, 60)
+]
+
+
+def reminder_timeline(start_ns, end_ns, schedule=None):
+    """
+    Generate every reminder that would be sent between two moments, in chronological order.
+
+    :param start_ns: Nanoseconds since the POSIX epoch when the timeline starts
+    :type start_ns: int
+    :param end_ns: Nanoseconds since the POSIX epoch when the timeline ends (excluded)
+    :type end_ns: int
+    :param schedule: The list of reminders as (command, interval, window) or (command, interval, window, last) tuples.
+    It defaults to the CRON jobs in cron-example.yaml
+    :type schedule: list[tuple]
+    :return: A generator of (moment, command) tuples, where moment is in nanoseconds since the POSIX epoch
+    :rtype: generator
+    """
+
+    # Use the default schedule if none was provided
+    if schedule is None:
+        schedule = default_schedule
+
+    # Create a generator for each reminder in the schedule, starting either at the beginning of the timeline or at the
+    # beginning of its window before the event date, and ending either at the end of the timeline or after its last
+    # reminder
+    def reminder_moments(command, interval, window, last=None):
+        moment = start_ns if window is None else max(start_ns, calculations.event_epoch_ns - window * ns_per_second)
+        stop_ns = end_ns if last is None else min(end_ns, calculations.event_epoch_ns - last * ns_per_second + 1)
+        while moment < stop_ns:
+            yield moment, command
+            moment += interval * ns_per_second
+
+    # Merge all reminders in chronological order
+    return heapq.merge(*[reminder_moments(*reminder) for reminder in schedule])
+
+
+def render_action(command):
+    """
+    Default action for the simulation. It renders the reply for a command (as reminder_tweet() would do) without
+    sending it anywhere.
+
+    :param command: The internal key of the command (e.g. 'hours')
+    :type command: str
+    :return: The rendered reply
+    :rtype: str
+    """
+    return calculations.get_date(data_request=fast_remove_tildes(word=lang_commands[command]))
+
+
+def summarise_drifts(drifts_ns):
+    """
+    Summarise a list of drifts between the moment when an action should have happened and when it actually happened.
+
+    :param drifts_ns: Drifts in nanoseconds
+    :type drifts_ns: list[int]
+    :return: The mean and maximum drift, in milliseconds
+    :rtype: dict[float]
+    """
+
+    # Avoid dividing by zero if there were no actions at all
+    if not drifts_ns:
+        return {'mean_drift_ms': 0.0, 'max_drift_ms': 0.0}
+
+    return {'mean_drift_ms': sum(drifts_ns) / len(drifts_ns) / 10 ** 6, 'max_drift_ms': max(drifts_ns) / 10 ** 6}
+
+
+def run_simulation(start_ns=None, end_ns=None, speed=None, schedule=None, action=render_action):
+    """
+    Replay the countdown timeline between two moments and execute an action for every reminder. If a speed is provided
+    the timeline is replayed in (simulated) real time by an accelerated clock, which makes it possible to measure the
+    drift of every reminder. Otherwise, a frozen clock jumps from one reminder to the next one as fast as possible.
+
+    :param start_ns: Nanoseconds since the POSIX epoch when the timeline starts. If omitted, it will be the current time
+    :type start_ns: int
+    :param end_ns: Nanoseconds since the POSIX epoch when the timeline ends. If omitted, it will be the event date
+    :type end_ns: int
+    :param speed: How many times faster than real time the timeline is replayed, or None to replay it as fast as
+    possible
+    :type speed: float or None
+    :param schedule: The list of reminders as (command, interval, window) or (command, interval, window, last) tuples.
+    It defaults to the CRON jobs in cron-example.yaml
+    :type schedule: list[tuple]
+    :param action: The function called for every reminder. It receives the internal key of the command
+    :type action: function
+    :return: A report with the number of reminders, the time spent, the throughput and the drift
+    :rtype: dict
+    """
+
+    # Set the default beginning and end of the timeline
+    if start_ns is None:
+        start_ns = clock.time_ns()
+    if end_ns is None:
+        end_ns = calculations.event_epoch_ns
+
+    # Create the clock for the simulation and remember the real one
+    simulated_clock = clock.FrozenClock(timestamp_ns=start_ns) if speed is None else \
+        clock.AcceleratedClock(speed=speed, timestamp_ns=start_ns)
+    real_clock = clock.set_clock(new_clock=simulated_clock)
+
+    # Create collectors and start measuring the real time spent
+    drifts_ns = []
+    commands = {}
+    real_start_ns = real_clock.monotonic_ns()
+
+    try:
+        for moment, command in reminder_timeline(start_ns=start_ns, end_ns=end_ns, schedule=schedule):
+            # Wait until the reminder is due
+            if speed is None:
+                simulated_clock.set(timestamp_ns=moment)
+            else:
+                clock.sleep(seconds=(moment - clock.time_ns()) / ns_per_second)
+
+            # Record how late the reminder is and then execute the action
+            drifts_ns.append(clock.time_ns() - moment)
+            action(command)
+            commands[command] = commands.get(command, 0) + 1
+
+    finally:
+        # Always restore the real clock
+        clock.set_clock(new_clock=real_clock)
+
+    # Prepare the report
+    real_seconds = (real_clock.monotonic_ns() - real_start_ns) / ns_per_second
+    reminders = sum(commands.values())
+    report = {'simulated_seconds': (end_ns - start_ns) / ns_per_second, 'real_seconds': real_seconds,
+              'reminders': reminders, 'commands': commands,
+              'reminders_per_second': reminders / real_seconds if real_seconds > 0 else None}
+    report.update(summarise_drifts(drifts_ns=drifts_ns))
+
+    # Log the report and return it
+    logger.info(msg='Simulation report: {0}'.format(report))
+
+    return report
+
+
+def simulate_final_seconds(api, speed=10, count=60, interval=1):
+    """
+    Replay the final seconds reminders (as the 'seconds-reminder' route sends them) with an accelerated clock starting
+    one minute before the event date, and measure how much each reminder drifts from its intended schedule.
+
+    :param api: The API object used to send the reminders. Provide a stub object that implements update_status() to
+    avoid tweeting
+    :type api: tweepy.API
+    :param speed: How many times faster than real time the reminders are replayed
+    :type speed: float
+    :param count: The number of reminders that should be sent
+    :type count: int
+    :param interval: The number of seconds between reminders
+    :type interval: float
+    :return: A report with the number of reminders and their drift
+    :rtype: dict
+    """
+
+    # Import the ticker only when needed, as the Twitter bot is not required by the rest of this module
+    from bot.app.controllers import ticker
+
+    # Start an accelerated clock one minute before the event date
+    start_ns = calculations.event_epoch_ns - count * interval * ns_per_second
+    real_clock = clock.set_clock(new_clock=clock.AcceleratedClock(speed=speed, timestamp_ns=start_ns))
+
+    # Send the reminders with the ticker in this thread and then restore the real clock
+    final_seconds_ticker = ticker.FinalSecondsTicker(api=api, count=count, interval=interval)
+    try:
+        final_seconds_ticker.run()
+    finally:
+        clock.set_clock(new_clock=real_clock)
+
+    # The ticker measures how late every reminder was sent after its deadline
+    drifts_ns = final_seconds_ticker.jitters_ns
+    report = {'reminders': len(drifts_ns), 'speed': speed,
+              'final_drift_ms': drifts_ns[-1] / 10 ** 6 if drifts_ns else 0.0}
+    report.update(summarise_drifts(drifts_ns=drifts_ns))
+
+    # Log the report and return it
+    logger.info(msg='Final seconds simulation report: {0}'.format(report))
+
+    return report
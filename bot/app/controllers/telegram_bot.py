@@ -29,10 +29,10 @@
 from bot.app.controllers.logger import *
 import bot.app.config as config
 import bot.app.secrets as secrets
-from bot.app.controllers import calculations
-from app.views.l10n import locales, remove_tildes
+from bot.app.controllers import calculations, telegram_commands
+from app.views.l10n import locales
 from telegram.ext import Updater
-from telegram.ext import CommandHandler
+from telegram.ext import MessageHandler, Filters
 
 
 # Start logger
@@ -97,7 +97,7 @@ def start_handler(update, context):
     """
 
     # Send 'description' reply to user
-    context.bot.send_message(chat_id=update.message.chat_id, text=lang_tgm['start']['name'])
+    context.bot.send_message(chat_id=update.message.chat_id, text=lang_tgm['start']['reply'])
 
 
 def help_me_handler(bot_instance, update):  # ToDo: Check if this should be rewritten to use context instead
@@ -121,7 +121,7 @@ def help_me_handler(bot_instance, update):  # ToDo: Check if this should be rewr
     bot_instance.send_message(chat_id=chat_id, text=lang_tgm['help']['reply'])
 
 
-def webhook_handler(update, context):  # ToDo: Check if the 'context' parameter is actually necessary
+def webhook_handler(update, context, command_key=None):  # ToDo: Check if the 'context' parameter is actually necessary
     """
     This function handles all commands that request date/time calculations, detecting what information was requested by
     the user, getting data from the calculations module and then sending it back to the user as a chat message.
@@ -131,6 +131,8 @@ def webhook_handler(update, context):  # ToDo: Check if the 'context' parameter
     :type update: telegram.Update
     :param context: This is the context bot object that will communicate with Telegram servers
     :type context: context
+    :param command_key: The internal key of the command requested, if it has already been resolved (e.g. 'days')
+    :type command_key: str
     :return: No usable data is returned by this function
     :rtype: str
     """
@@ -144,18 +146,21 @@ def webhook_handler(update, context):  # ToDo: Check if the 'context' parameter
     logging.debug(msg=lang_log_msg['wh_user_req'].format(user_request))
 
     # As Telegram commands may be different due to their lack of support for non-English characters, we have to
-    # translate the command again to one that the calculations module is actually able to understand
-    # First remove the '/' sign from the text message
-    user_command = user_request.split(sep='/', maxsplit=1)[1]
+    # translate the command again to one that the calculations module is actually able to understand. Unless the
+    # command has already been resolved, look it up in the reverse index built at startup
+    if command_key is None:
+        command_key = telegram_commands.resolve_command(text=user_request)
 
-    # Get the dictionary key whose value matches the user command in the list of available commands
-    user_command_key = list(filter(lambda item_key: lang_tgm[item_key] == user_command, lang_commands))[0]
+    # Ignore messages that don't request any date/time calculation
+    if command_key not in telegram_commands.normalised_commands:
+        return 'OK'
 
-    # Normalise the text by removing tildes and converting all letters to lowercase
-    normalised_command = remove_tildes(word=lang_commands[user_command_key])
+    # Get the normalised command (i.e. without tildes and in lowercase) expected by the calculations module
+    normalised_command = telegram_commands.normalised_commands[command_key]
 
-    # Get the calculation info related to the user command to prepare a reply
-    reply = calculations.get_date(normalised_command)
+    # Get the calculation info related to the user command to prepare a reply, using a countdown snapshot taken at
+    # the time the command was processed
+    reply = calculations.get_date(normalised_command, snapshot=calculations.CountdownSnapshot())
 
     # Log debugging info for the reply
     logging.info(msg=lang_log_msg['wh_reply'].format(reply))
@@ -166,6 +171,37 @@ def webhook_handler(update, context):  # ToDo: Check if the 'context' parameter
     return 'OK'
 
 
+def command_handler(update, context):
+    """
+    This function handles every command sent to this bot, resolving it with a single lookup in the reverse index of
+    Telegram commands and then passing the update to the function that handles that specific command.
+
+    :param update: This is the Telegram update that contains the command and the message data received by the bot
+    (e.g. user who sent it, chat ID, etc.)
+    :type update: telegram.Update
+    :param context: This is the context bot object that will communicate with Telegram servers
+    :type context: context
+    :return: No usable data is returned by this function
+    :rtype: str
+    """
+
+    # Get the internal key of the command requested
+    command_key = telegram_commands.resolve_command(text=update.message.text)
+
+    # Send informative replies using their own handlers
+    if command_key == 'start':
+        start_handler(update, context)
+
+        return 'OK'
+    elif command_key == 'help':
+        help_me_handler(context.bot, update)
+
+        return 'OK'
+
+    # Any other command requests date/time calculations
+    return webhook_handler(update, context, command_key=command_key)
+
+
 def start_updater(domain, port, tgm_url, tgm_webhook, certificate=None, private_key=None, run_locally=True):
     """
     This function starts an internal server (linked to the updater object) that receives information from Telegram
@@ -230,34 +266,11 @@ def set_webhook_now(tgm_webhook, cert_file):
 
 # End of functions definitions #
 
-# Telegram only accepts English characters so check if any of the calculations commands for this locale have an
-# alternate spelling for Telegram and then copy all other commands to lang_tgm
-# common_commands = set(filter(lambda command: command not in lang_tgm, lang_commands))
-# for item in common_commands:  # ToDo: Fix this!!! It's different from the GAE version!
-#     lang_tgm[item] = lang_commands[item]
-
-# Define command handlers for every command and link them to handler functions
-start_handler = CommandHandler(lang_tgm['start']['name'], start_handler())
-help_handler = CommandHandler(lang_tgm['help']['name'], help_me_handler)
-date_handler = CommandHandler(lang_tgm['date'], webhook_handler)
-summary_handler = CommandHandler(lang_tgm['summary'], webhook_handler)
-years_handler = CommandHandler(lang_tgm['years'], webhook_handler)
-months_handler = CommandHandler(lang_tgm['months'], webhook_handler)
-days_handler = CommandHandler(lang_tgm['days'], webhook_handler)
-hours_handler = CommandHandler(lang_tgm['hours'], webhook_handler)
-minutes_handler = CommandHandler(lang_tgm['minutes'], webhook_handler)
-seconds_handler = CommandHandler(lang_tgm['seconds'], webhook_handler)
-
-# Register command handlers with the dispatcher service
-dispatcher.add_handler(start_handler)
-dispatcher.add_handler(help_handler)
-dispatcher.add_handler(date_handler)
-dispatcher.add_handler(summary_handler)
-dispatcher.add_handler(years_handler)
-dispatcher.add_handler(months_handler)
-dispatcher.add_handler(days_handler)
-dispatcher.add_handler(hours_handler)
-dispatcher.add_handler(minutes_handler)
-dispatcher.add_handler(seconds_handler)
-logging.info(msg=lang_log_msg['handlers_added'])
+# Define a single handler for every command, filtering messages with the regular expression built at startup so that
+# only known commands (including their '@botname' suffixed and case variants) reach it
+command_message_handler = MessageHandler(Filters.regex(telegram_commands.command_pattern), command_handler)
+
+# Register the command handler with the dispatcher service
+dispatcher.add_handler(command_message_handler)
+logging.info(msg=lang_log_msg['tgm_handlers_added'])
 
@@ -29,13 +29,12 @@
 from bot.app.controllers.logger import *
 from queue import Queue
 from threading import Thread
-from bot.app.views.l10n import locales, remove_tildes
+from bot.app.views.l10n import locales
 from telegram import Bot, Update, error
 import bot.app.config as config
 import bot.app.secrets as secrets
-from bot.app.controllers import calculations
-from bot.app.launcher import params, set_remote_params
-from telegram.ext import Dispatcher, CommandHandler
+from bot.app.controllers import calculations, telegram_commands
+from telegram.ext import Dispatcher, MessageHandler, Filters
 
 
 # Start logger
@@ -133,9 +132,12 @@ def set_webhook_handler():
     :rtype: True
     """
 
+    # Import the launcher only when needed, as it imports this module itself while starting the bots
+    from bot.app import launcher
+
     # Shorten variable names
-    webhook_url = params['tgm_webhook']
-    cert_file = params['cert_file']
+    webhook_url = launcher.params['tgm_webhook']
+    cert_file = launcher.params['cert_file']
 
     # Log useful info
     logger.info(msg='webhook_url is: {0}'.format(webhook_url))
@@ -150,7 +152,7 @@ def set_webhook_handler():
         logger.exception(msg=lang_log_msg['exception_occurred'].format(e))
 
         # Make sure the appropriate values have been set for the remote (GAE) runtime variables
-        set_remote_params(gae=True)
+        launcher.set_remote_params(gae=True)
 
         # Try setting the webhook again
         set_webhook_handler()
@@ -181,7 +183,7 @@ def webhook_updater(request_data):
     return 'OK'
 
 
-def webhook_handler(bot_instance, update):
+def webhook_handler(bot_instance, update, command_key=None):
     """
     This function handles all commands that request date/time calculations, detecting what information was requested by
     the user, getting data from the calculations module and then sending it back to the user as a chat message.
@@ -191,6 +193,8 @@ def webhook_handler(bot_instance, update):
     :param update: This is the Telegram update that contains the command and the message data received by the bot (e.g.
     user who sent it, chat ID, etc.)
     :type update: telegram.Update
+    :param command_key: The internal key of the command requested, if it has already been resolved (e.g. 'days')
+    :type command_key: str
     :return: No usable data is returned by this function
     :rtype: str
     """
@@ -204,18 +208,21 @@ def webhook_handler(bot_instance, update):
     logger.debug(msg=lang_log_msg['wh_user_req'].format(user_request))
 
     # As Telegram commands may be different due to their lack of support for non-English characters, we have to
-    # translate the command again to one that the calculations module is actually able to understand
-    # First remove the '/' sign from the text message
-    user_command = user_request.split(sep='/', maxsplit=1)[1]
+    # translate the command again to one that the calculations module is actually able to understand. Unless the
+    # command has already been resolved, look it up in the reverse index built at startup
+    if command_key is None:
+        command_key = telegram_commands.resolve_command(text=user_request)
 
-    # Get the dictionary key whose value matches the user command in the list of available commands
-    user_command_key = list(filter(lambda item_key: lang_tgm[item_key] == user_command, lang_commands))[0]
+    # Ignore messages that don't request any date/time calculation
+    if command_key not in telegram_commands.normalised_commands:
+        return 'OK'
 
-    # Normalise the text by removing tildes and converting all letters to lowercase
-    normalised_command = remove_tildes(word=lang_commands[user_command_key])
+    # Get the normalised command (i.e. without tildes and in lowercase) expected by the calculations module
+    normalised_command = telegram_commands.normalised_commands[command_key]
 
-    # Get the calculation info related to the user command to prepare a reply
-    reply = calculations.get_date(normalised_command)
+    # Get the calculation info related to the user command to prepare a reply, using a countdown snapshot taken at
+    # the time the command was processed
+    reply = calculations.get_date(normalised_command, snapshot=calculations.CountdownSnapshot())
 
     # Log debugging info for the reply
     logger.debug(msg=lang_log_msg['wh_reply'].format(reply))
@@ -226,6 +233,33 @@ def webhook_handler(bot_instance, update):
     return 'OK'
 
 
+def command_handler(bot_instance, update):
+    """
+    This function handles every command sent to this bot, resolving it with a single lookup in the reverse index of
+    Telegram commands and then passing the update to the function that handles that specific command.
+
+    :param bot_instance: This is the bot object previously initiated that will communicate with Telegram servers
+    :type bot_instance: telegram.Bot
+    :param update: This is the Telegram update that contains the command and the message data received by the bot (e.g.
+    user who sent it, chat ID, etc.)
+    :type update: telegram.Update
+    :return: No usable data is returned by this function
+    :rtype: str
+    """
+
+    # Get the internal key of the command requested
+    command_key = telegram_commands.resolve_command(text=update.message.text)
+
+    # Send informative replies using their own handlers
+    if command_key in info_handlers:
+        info_handlers[command_key](bot_instance, update)
+
+        return 'OK'
+
+    # Any other command requests date/time calculations
+    return webhook_handler(bot_instance, update, command_key=command_key)
+
+
 def check_token_details_handler():
     """
     This is a convenience function intended for easily checking whether this bot is able to correctly communicate with
@@ -242,29 +276,15 @@ def check_token_details_handler():
 
 # End of functions definitions #
 
-# Define handlers. ToDo: Try to turn this into one single command
-start_command_handler = CommandHandler(lang_tgm['start']['name'], start_handler)
-help_command_handler = CommandHandler(lang_tgm['help']['name'], help_me_handler)
-date_command_handler = CommandHandler(lang_tgm['date'], webhook_handler)
-summary_command_handler = CommandHandler(lang_tgm['summary'], webhook_handler)
-years_command_handler = CommandHandler(lang_tgm['years'], webhook_handler)
-months_command_handler = CommandHandler(lang_tgm['months'], webhook_handler)
-days_command_handler = CommandHandler(lang_tgm['days'], webhook_handler)
-hours_command_handler = CommandHandler(lang_tgm['hours'], webhook_handler)
-minutes_command_handler = CommandHandler(lang_tgm['minutes'], webhook_handler)
-seconds_command_handler = CommandHandler(lang_tgm['seconds'], webhook_handler)
-
-# Register command handlers with the dispatcher service
-tgm_dispatcher.add_handler(start_command_handler)
-tgm_dispatcher.add_handler(help_command_handler)
-tgm_dispatcher.add_handler(summary_command_handler)
-tgm_dispatcher.add_handler(years_command_handler)
-tgm_dispatcher.add_handler(months_command_handler)
-tgm_dispatcher.add_handler(days_command_handler)
-tgm_dispatcher.add_handler(hours_command_handler)
-tgm_dispatcher.add_handler(minutes_command_handler)
-tgm_dispatcher.add_handler(seconds_command_handler)
-tgm_dispatcher.add_handler(date_command_handler)
+# Link the informative commands to their handler functions. Every other command requests a calculation
+info_handlers = {'start': start_handler, 'help': help_me_handler}
+
+# Define a single handler for every command, filtering messages with the regular expression built at startup so that
+# only known commands (including their '@botname' suffixed and case variants) reach it
+command_message_handler = MessageHandler(Filters.regex(telegram_commands.command_pattern), command_handler)
+
+# Register the command handler with the dispatcher service
+tgm_dispatcher.add_handler(command_message_handler)
 logger.info(msg=lang_log_msg['tgm_handlers_added'])
 
 # Create and start a threaded process to process updates
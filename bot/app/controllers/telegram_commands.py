@@ -0,0 +1,147 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+    This module resolves the commands sent by Telegram users for both variants of the Telegram bot (telegram_bot.py and
+    telegram_bot_gae.py). It builds, once at startup, a reverse index that links every Telegram command name (and its
+    '@botname' suffixed form, which Telegram uses in group chats) to its internal command key, and a single regular
+    expression matching all of them, so that one message handler can replace a separate handler for every command.
+"""
+
+import re
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from bot.app.views.l10n import locales, fast_remove_tildes
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Shorten locale path
+lang = locales[config.bot_locale]
+lang_tgm = lang['Telegram']['commands']
+lang_commands = lang['calculations']['commands']
+
+# Internal keys of the commands that don't request date/time calculations
+info_commands = ('start', 'help')
+
+
+def get_command_names():
+    """
+    Get the Telegram command name for every internal command key. Telegram only accepts English characters in command
+    names, so the alternate spelling in the Telegram section of the locale is used when there's one, otherwise it falls
+    back to the calculations command.
+
+    :return: Dictionary that links every internal command key to its Telegram command name
+    :rtype: dict[str]
+    """
+
+    # Get the names of the informative commands first
+    command_names = {command_key: lang_tgm[command_key]['name'] for command_key in info_commands}
+
+    # Then add every calculations command, using its alternate spelling when available
+    for command_key, command in lang_commands.items():
+        command_names[command_key] = lang_tgm.get(command_key, command)
+
+    return command_names
+
+
+def build_command_index(bot_name=None):
+    """
+    Build the reverse index that links every Telegram command a user may send to its internal command key. Command
+    names are stored in lowercase, so that every case variant is resolved with a single lookup after converting the
+    command sent by the user to lowercase.
+
+    :param bot_name: The Telegram username of this bot (without the '@' symbol). When provided, commands suffixed with
+    it (e.g. '/dias@my_bot') are indexed too. Otherwise commands suffixed with any bot name are accepted
+    :type bot_name: str
+    :return: Dictionary that links every Telegram command (without the '/' sign) to its internal command key
+    :rtype: dict[str]
+    """
+
+    command_index = {}
+    for command_key, command_name in get_command_names().items():
+        command_index[command_name.lower()] = command_key
+
+        # Add the suffixed variant used in group chats where several bots may be listening
+        if bot_name:
+            command_index['{0}@{1}'.format(command_name, bot_name).lower()] = command_key
+
+    return command_index
+
+
+def build_command_pattern(command_index, bot_name=None):
+    """
+    Build a regular expression that only matches messages starting with one of the commands in the index, optionally
+    followed by arguments. The longest names come first so that a command isn't cut short by another one it starts
+    with.
+
+    :param command_index: Dictionary returned by build_command_index
+    :type command_index: dict[str]
+    :param bot_name: The Telegram username of this bot (without the '@' symbol)
+    :type bot_name: str
+    :return: The compiled regular expression. The 'command' group holds the command without the '/' sign
+    :rtype: re.Pattern
+    """
+
+    # Only accept the suffix of this bot when its name is known, otherwise accept any bot name
+    suffix = '@{0}'.format(re.escape(bot_name)) if bot_name else r'@\w+'
+
+    # Join the plain command names (the suffixed ones are covered by the optional suffix)
+    names = sorted((name for name in command_index if '@' not in name), key=len, reverse=True)
+    alternatives = '|'.join(re.escape(name) for name in names)
+
+    return re.compile(r'^/(?P<command>(?:{0})(?:{1})?)(?:\s|$)'.format(alternatives, suffix), flags=re.IGNORECASE)
+
+
+def resolve_command(text):
+    """
+    Get the internal command key for the command written at the beginning of a Telegram message.
+
+    :param text: The text of the message sent by the user (e.g. '/Dias@my_bot')
+    :type text: str
+    :return: The internal command key (e.g. 'days'), or None if the message doesn't start with a known command
+    :rtype: str
+    """
+
+    # Check whether the message starts with a known command
+    match = command_pattern.match(text or '')
+    if match is None:
+        return None
+
+    # Look the command up in the index, dropping the bot name if it wasn't indexed (i.e. it isn't known)
+    command = match.group('command').lower()
+    if command not in command_index:
+        command = command.split('@', 1)[0]
+
+    return command_index.get(command)
+
+
+# Link every internal command key of the calculations commands to the normalised command expected by the
+# calculations module
+normalised_commands = {command_key: fast_remove_tildes(word=command)
+                       for command_key, command in lang_commands.items()}
+
+# Build the reverse index and the regular expression once, when this module is imported
+command_index = build_command_index(bot_name=config.telegram_bot_name)
+command_pattern = build_command_pattern(command_index=command_index, bot_name=config.telegram_bot_name)
+
+# Log debugging info
+logger.debug(msg='\n\ncommand_index is: {0}'.format(command_index))
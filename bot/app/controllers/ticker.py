@@ -0,0 +1,238 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+    This module sends the final seconds reminders from a background thread, so that the request that starts them
+    returns immediately instead of holding a worker for over a minute. Every reminder is scheduled at an absolute
+    deadline of the monotonic clock (instead of sleeping a fixed interval after the previous one), so the time spent
+    sending a tweet doesn't delay the ones that follow, and the text of every reminder is composed one tick ahead, so
+    that sending it is the only work left when its deadline comes. The ticker also measures how late every reminder was
+    sent (i.e. its jitter). Please bear in mind that in Google App Engine the instance must stay alive for the whole
+    minute (e.g. by using basic or manual scaling), as the background thread is stopped if the instance is shut down.
+"""
+
+import threading
+from bot.app.controllers.logger import *
+from bot.app.controllers import calculations
+from bot.app.controllers import clock
+from bot.app.controllers import twitter_bot
+from bot.app.views.l10n import locales
+import bot.app.config as config
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# Set global variables
+ns_per_second = clock.ns_per_second
+lang_log_msgs = locales[config.bot_locale]['log_msgs']
+
+# The ticker currently in use, as only one of them should send the final seconds reminders at a time
+current_ticker = None
+ticker_lock = threading.Lock()
+
+
+class FinalSecondsTicker(object):
+    """
+    This class creates a ticker that sends a reminder tweet at regular intervals, aligned with the event date so that
+    every reminder shows a whole number of seconds left. It can be run in the current thread (e.g. by the simulation.py
+    module) or started in a background thread.
+    """
+
+    def __init__(self, api, count=60, interval=1, command=None):
+        """
+        This method initialises a ticker that hasn't started yet.
+
+        :param api: The API object returned by the authentication function
+        :type api: tweepy.API
+        :param count: The number of reminders that should be sent
+        :type count: int
+        :param interval: The number of seconds between reminders
+        :type interval: float
+        :param command: The command (localised for your language) of the reminders. It defaults to 'seconds'
+        :type command: str
+        """
+        self.api = api
+        self.count = count
+        self.interval_ns = int(interval * ns_per_second)
+        self.command = calculations.lang_commands['seconds'] if command is None else command
+        self.thread = None
+        self.stopped = threading.Event()
+
+        # Collectors for the progress of the ticker. The sending times are the wall-clock times when every reminder was
+        # sent, whereas the jitters are how late (in nanoseconds) every reminder was sent after its deadline
+        self.sent = 0
+        self.deferred = 0
+        self.missed = 0
+        self.sending_times = []
+        self.jitters_ns = []
+
+    def first_deadline(self, timestamp_ns):
+        """
+        Find how long to wait for the first reminder, so that every reminder is sent when a whole number of intervals
+        is left before the event date.
+
+        :param timestamp_ns: Nanoseconds since the POSIX epoch when the ticker starts
+        :type timestamp_ns: int
+        :return: Nanoseconds to wait before sending the first reminder
+        :rtype: int
+        """
+
+        # Don't wait at all if the event date has passed already
+        remaining_ns = calculations.event_epoch_ns - timestamp_ns
+        if remaining_ns <= 0:
+            return 0
+
+        return remaining_ns % self.interval_ns
+
+    def render(self, timestamp_ns):
+        """
+        Compose the text of the reminder that will be sent at a given moment.
+
+        :param timestamp_ns: Nanoseconds since the POSIX epoch when the reminder will be sent
+        :type timestamp_ns: int
+        :return: The text of the reminder
+        :rtype: str
+        """
+        return twitter_bot.reminder_text(command=self.command,
+                                         snapshot=calculations.CountdownSnapshot(timestamp_ns=timestamp_ns))
+
+    def run(self):
+        """
+        Send every reminder at its deadline in the current thread, and log a report once they were sent.
+
+        :return: The report of the ticker
+        :rtype: dict
+        """
+
+        # Read both clocks only once, and derive every deadline (and the moment each reminder shows) from them
+        now_wall_ns = clock.time_ns()
+        now_ns = clock.monotonic_ns()
+        wait_ns = self.first_deadline(timestamp_ns=now_wall_ns)
+        start_ns = now_ns + wait_ns
+        start_wall_ns = now_wall_ns + wait_ns
+
+        # Compose the first reminder in advance
+        text = self.render(timestamp_ns=start_wall_ns)
+
+        for tick in range(self.count):
+            if self.stopped.is_set():
+                break
+
+            # Wait until the deadline of this reminder
+            deadline_ns = start_ns + tick * self.interval_ns
+            clock.sleep((deadline_ns - clock.monotonic_ns()) / ns_per_second)
+
+            # Skip this reminder if it's so late that its text is outdated, and send it otherwise
+            jitter_ns = clock.monotonic_ns() - deadline_ns
+            if jitter_ns >= self.interval_ns:
+                self.missed += 1
+            else:
+                self.jitters_ns.append(jitter_ns)
+                self.sending_times.append(clock.time_ns())
+                try:
+                    if twitter_bot.reminder_tweet(api=self.api, command=self.command, text=text) is None:
+                        self.deferred += 1
+                    else:
+                        self.sent += 1
+                except Exception as error:
+                    logger.exception(msg=lang_log_msgs['exception_occurred'].format(error))
+
+            # Compose the next reminder while waiting for its deadline
+            if tick + 1 < self.count:
+                text = self.render(timestamp_ns=start_wall_ns + (tick + 1) * self.interval_ns)
+
+        # Log the report and return it
+        report = self.status()
+        logger.info(msg=lang_log_msgs['ticker_report'].format(report['sent'], report['deferred'], report['missed'],
+                                                              report['mean_jitter_ms'], report['max_jitter_ms']))
+
+        return report
+
+    def start(self):
+        """
+        Start sending the reminders from a background thread and return immediately.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.thread = threading.Thread(target=self.run, name='final-seconds-ticker', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop sending reminders. The reminder being sent (if any) is not interrupted.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.stopped.set()
+
+    def is_running(self):
+        """
+        Check whether the ticker is sending reminders from a background thread.
+
+        :return: Whether the background thread is alive
+        :rtype: bool
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def status(self):
+        """
+        Get the progress of the ticker, and the jitter achieved so far.
+
+        :return: The number of reminders sent, deferred because of the rate limit, and missed because they were too
+        late, as well as the mean and maximum jitter (in milliseconds)
+        :rtype: dict
+        """
+        jitters_ns = list(self.jitters_ns)
+        if jitters_ns:
+            mean_jitter_ms = sum(jitters_ns) / len(jitters_ns) / 10 ** 6
+            max_jitter_ms = max(jitters_ns) / 10 ** 6
+        else:
+            mean_jitter_ms = max_jitter_ms = 0.0
+
+        return {'running': self.is_running(), 'count': self.count, 'sent': self.sent, 'deferred': self.deferred,
+                'missed': self.missed, 'mean_jitter_ms': mean_jitter_ms, 'max_jitter_ms': max_jitter_ms}
+
+
+def start_final_seconds(api, count=60, interval=1):
+    """
+    Start sending the final seconds reminders in the background, unless they're being sent already (e.g. if the
+    route was triggered twice).
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param count: The number of reminders that should be sent
+    :type count: int
+    :param interval: The number of seconds between reminders
+    :type interval: float
+    :return: The ticker sending the reminders
+    :rtype: FinalSecondsTicker
+    """
+    global current_ticker
+
+    with ticker_lock:
+        if current_ticker is None or not current_ticker.is_running():
+            current_ticker = FinalSecondsTicker(api=api, count=count, interval=interval)
+            current_ticker.start()
+
+        return current_ticker
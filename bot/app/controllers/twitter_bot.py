@@ -28,8 +28,17 @@ from bot.app.controllers.logger import *
 import bot.app.config as config
 import bot.app.secrets as secrets
 from bot.app.controllers import calculations
+from bot.app.controllers import clock
+from bot.app.controllers import rate_limits
+from bot.app.controllers import reply_composer
 from bot.app.models import twitter as tw_model
-from bot.app.views.l10n import locales, remove_tildes
+from bot.app.models.leases import DatastoreLease, FileLease
+from bot.app.controllers.keyword_matcher import KeywordMatcher, commands_matcher
+from bot.app.views.l10n import locales, fast_remove_tildes
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import atexit
+import itertools
 import tweepy
 
 
@@ -49,8 +58,38 @@ lang_site_msgs = lang['site_msgs']
 lang_twitter = lang['Twitter']
 lang_commands = lang['calculations']['commands']
 
-# Instantiate a Twitter Cursor
+# Link every internal command key to the normalised localised command expected by the calculations module
+normalised_commands = {command_key: fast_remove_tildes(word=command)
+                       for command_key, command in lang_commands.items()}
+
+# Set the number of mentions requested in every page of the mentions timeline (200 is the maximum allowed by Twitter)
+mentions_page_size = 200
+
+# Set the Twitter epoch (in milliseconds since the Unix epoch), which is the starting point of the tweet ID numbers
+twitter_epoch_ms = 1288834974657
+
+# Set the maximum number of users whose friendships can be looked up in a single call
+friendships_lookup_size = 100
+
+# Set the error code returned by Twitter when the bot has reached the limit of users it can follow
+follow_limit_code = 161
+
+# Instantiate a Twitter Cursor, the record of users followed by your bot, and the ledger of actions taken on every
+# mention. They don't read their data from the
+# datastore until they're used for the first time, so that loading this module doesn't wait for the datastore
 tw_cursor = tw_model.TwitterCursor()
+atexit.register(tw_cursor.flush)
+tw_follow_state = tw_model.TwitterFollowState()
+tw_action_ledger = tw_model.TwitterActionLedger()
+atexit.register(tw_action_ledger.flush)
+follow_back_job = tw_model.TwitterFollowBackJob()
+
+# Make sure that only one instance replies to the mentions at a time: several instances of your app may run in Google
+# App Engine, whereas on a generic server every process runs in the same machine, so a file lock is enough
+if config.use_app_engine:
+    mention_lease = DatastoreLease(kind='tw_mention_lease', name='mentions', ttl=config.twitter_mention_lease_ttl)
+else:
+    mention_lease = FileLease(path=config.twitter_mention_lock_file)
 
 
 # Authenticate with Twitter servers
@@ -69,8 +108,9 @@ def twitter_auth():
     auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
     auth.set_access_token(access_token, access_token_secret)
 
-    # Create API object
-    api = tweepy.API(auth, wait_on_rate_limit=True, wait_on_rate_limit_notify=True)
+    # Create API object. It doesn't wait when a rate limit is hit, as that would block the web server: the rate-limit
+    # ledger is used instead to defer or drop the actions that would exceed a limit
+    api = tweepy.API(auth, wait_on_rate_limit=False)
 
     # Negotiate authentication with Twitter servers
     try:
@@ -82,6 +122,12 @@ def twitter_auth():
     # Log information message
     logger.info("API created")
 
+    # Seed the rate-limit ledger with the current rate-limit status
+    try:
+        rate_limits.ledger.seed(status=api.rate_limit_status())
+    except tweepy.TweepError as e:
+        logger.warning(msg=lang_log_msgs['exception_occurred'].format(e))
+
     # Return API object to caller
     return api
 
@@ -103,6 +149,19 @@ def whoami(api):
     return user.name
 
 
+def record_response(api):
+    """
+    This function updates the rate-limit ledger with the rate-limit headers of the last response received by the API
+    object, so that it keeps up with the calls made by other instances of your bot as well.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :return: Whether the ledger was updated
+    :rtype: bool
+    """
+    return rate_limits.ledger.update_from_response(response=getattr(api, 'last_response', None))
+
+
 def rate_limit_status(api):
     """
     Use this function to check whether your bot hasn't exceeded your quota of Twitter's API calls. It will present you
@@ -118,11 +177,172 @@ def rate_limit_status(api):
     return api.rate_limit_status()
 
 
-def check_mentions(api, since_id='1'):
+def snowflake_time_ns(tweet_id):
+    """
+    Get the moment when a tweet was posted from its ID number. Twitter IDs (known as 'snowflakes') hold the number of
+    milliseconds elapsed since the Twitter epoch in every bit but the lowest 22.
+
+    :param tweet_id: The tweet ID number
+    :type tweet_id: int
+    :return: The moment the tweet was posted, in nanoseconds since the Unix epoch
+    :rtype: int
+    """
+    return ((int(tweet_id) >> 22) + twitter_epoch_ms) * 10**6
+
+
+def snowflake_id(timestamp_ns):
+    """
+    Get the lowest tweet ID number that could have been assigned to a tweet posted at a given moment, so that every
+    tweet with a greater or equal ID was posted at that moment or later.
+
+    :param timestamp_ns: The moment, in nanoseconds since the Unix epoch
+    :type timestamp_ns: int
+    :return: The lowest tweet ID number for that moment
+    :rtype: int
+    """
+    return max(0, timestamp_ns // 10**6 - twitter_epoch_ms) << 22
+
+
+def mention_pages(api, since_id=1, page_size=None, newest=0):
+    """
+    This function walks the mentions timeline from the newest mention back to the one after since_id, but only keeps
+    the boundaries of every page (i.e. the ID numbers of their oldest and newest mentions) instead of the mentions
+    themselves, so that memory use stays flat no matter how many mentions are waiting. Those pages are requested
+    without user details to make this walk as light as possible. It also counts the mentions waiting (i.e. the
+    backlog) and can keep the ID numbers of the newest ones.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param since_id: The last tweet ID that should be used as a 'bookmark' of the last tweet that was replied to
+    :type since_id: int
+    :param page_size: Number of mentions in every page. If omitted, the maximum allowed by Twitter will be used
+    :type page_size: int
+    :param newest: Number of the newest mentions whose ID numbers should be kept
+    :type newest: int
+    :return: The boundaries of every page, newest page first, as tuples of (oldest ID, newest ID), the number of
+    mentions waiting, and the ID numbers of the newest mentions (newest first)
+    :rtype: dict[list[tuple[int]] or int or list[int]]
+    """
+
+    # Use the default page size if none was requested
+    if page_size is None:
+        page_size = mentions_page_size
+
+    # Request pages going back in time until there are no more mentions newer than since_id
+    bounds = []
+    backlog = 0
+    newest_ids = []
+    max_id = None
+    while True:
+        rate_limits.ledger.require(endpoint='statuses/mentions_timeline')
+        page = api.mentions_timeline(since_id=since_id, max_id=max_id, count=page_size, trim_user=True,
+                                     include_entities=False)
+        record_response(api=api)
+        if len(page) == 0:
+            break
+
+        # Keep the boundaries of this page and continue right before its oldest mention
+        page_ids = sorted((tweet.id for tweet in page), reverse=True)
+        bounds.append((page_ids[-1], page_ids[0]))
+        backlog += len(page_ids)
+        newest_ids.extend(page_ids[:max(0, newest - len(newest_ids))])
+        max_id = page_ids[-1] - 1
+
+    return {'pages': bounds, 'backlog': backlog, 'newest_ids': newest_ids}
+
+
+def catch_up_since_id(timeline, since_id, newest=None, max_age=None):
+    """
+    This function decides which mentions should be answered when the bot has to catch up with a long backlog (e.g.
+    after an outage): only the newest ones, or those that are recent enough, as older mentions are not worth answering
+    anymore. It returns the tweet ID that the cursor should skip to, so that every older mention is marked as skipped.
+
+    :param timeline: Dictionary returned by the mention_pages function
+    :type timeline: dict
+    :param since_id: The last tweet ID that was replied to
+    :type since_id: int
+    :param newest: Number of the newest mentions that are always answered. If omitted, the value of the
+    twitter_catch_up_newest variable in the config.py module will be used
+    :type newest: int
+    :param max_age: Age (in minutes) of the oldest mention that is answered anyway. If omitted, the value of the
+    twitter_catch_up_max_age variable in the config.py module will be used
+    :type max_age: int
+    :return: The tweet ID that the cursor should skip to
+    :rtype: int
+    """
+
+    # Use the default settings if none were requested
+    if newest is None:
+        newest = config.twitter_catch_up_newest
+    if max_age is None:
+        max_age = config.twitter_catch_up_max_age
+
+    # Find the lowest ID that a mention newer than the maximum age can have
+    lowest_id = snowflake_id(timestamp_ns=clock.time_ns() - max_age * 60 * 10**9)
+
+    # Find the oldest mention among the newest ones, and answer it too if it's older than that. If there are fewer
+    # mentions than that, every one of them is answered
+    if newest > 0:
+        newest_ids = timeline['newest_ids']
+        lowest_id = min(lowest_id, newest_ids[newest - 1] if len(newest_ids) >= newest else int(since_id) + 1)
+
+    # Skip every mention older than those that must be answered
+    return max(int(since_id), lowest_id - 1)
+
+
+def iter_mentions(api, since_id=1, page_size=None, pages=None):
+    """
+    This generator yields the tweets that mentioned your bot's username (Twitter handle) since the tweet ID number
+    provided, one page at a time and sorted by ID (i.e. oldest first), so that they can be processed as soon as they
+    arrive. As Twitter only serves the mentions timeline newest first, it first gets the boundaries of every page and
+    then requests those pages again in the opposite order. Tweets posted by your bot itself are skipped.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param since_id: The last tweet ID that should be used as a 'bookmark' of the last tweet that was replied to
+    :type since_id: str or int
+    :param page_size: Number of mentions in every page. If omitted, the maximum allowed by Twitter will be used
+    :type page_size: int
+    :param pages: Boundaries of the pages, as returned by the mention_pages function, if they've already been taken.
+    Otherwise, they'll be taken from Twitter servers
+    :type pages: list[tuple[int]]
+    :return: Every mention newer than since_id, oldest first
+    :rtype: collections.Iterable[tweepy.Status]
+    """
+
+    # The cursor may hold the ID as a string, but it must be compared as a number
+    since_id = int(since_id)
+
+    # Use the default page size if none was requested
+    if page_size is None:
+        page_size = mentions_page_size
+
+    # Get the boundaries of the pages if they weren't provided
+    if pages is None:
+        pages = mention_pages(api=api, since_id=since_id, page_size=page_size)['pages']
+
+    # Replay every page, oldest page first, requesting only the mentions within its boundaries. Skip the pages that
+    # are older than since_id, in case it was moved forward after taking them
+    for oldest_id, newest_id in reversed(pages):
+        if newest_id <= since_id:
+            continue
+        rate_limits.ledger.require(endpoint='statuses/mentions_timeline')
+        page = api.mentions_timeline(since_id=max(oldest_id - 1, since_id), max_id=newest_id, count=page_size,
+                                     tweet_mode='extended')
+        record_response(api=api)
+
+        for tweet in sorted(page, key=lambda status: status.id):
+            # Check that the tweets were not posted by your bot itself. If they are, skip them
+            if tweet.user.screen_name.lower() != config.twitter_bot_name.lower() and tweet.id > since_id:
+                yield tweet
+
+
+def check_mentions(api, since_id=1):
     """
     This function retrieves a list of the most recent tweets that mentioned your bot's username (Twitter handle) since
     the tweet ID number stored in the database. If there's no number stored in the database (i.e. this is a fresh
-    installation), then it will default to search from tweet ID number 1 onwards.
+    installation), then it will default to search from tweet ID number 1 onwards. Please note that it keeps every
+    mention in memory, so it's only meant for inspecting them: use iter_mentions() to process them.
 
     :param api: The API object returned by the authentication function
     :type api: tweepy.API
@@ -137,24 +357,22 @@ def check_mentions(api, since_id='1'):
     logger.info("Retrieving mentions")
 
     # First check if the data in tw_cursor is current. If this bot has just been loaded into memory then its last_id
-    # property will be equal to '1' and data must be retrieved from the database
-    if tw_cursor.get(obj_property='last_id') == '1':
-        tw_cursor.get_from_db()
+    # property will be equal to 1 and data must be retrieved from the database (unless it was just read)
+    if int(tw_cursor.get(obj_property='last_id')) == 1:
+        tw_cursor.refresh()
 
     # Create collectors and set starting values
     tweet_ids = []
     tweets_list = []
-    new_since_id = since_id
+    new_since_id = int(since_id)
 
-    # Retrieve list of tweets from server and iterate over its elements to collect ID numbers
-    for tweet in tweepy.Cursor(api.mentions_timeline, since_id=since_id, tweet_mode='extended').items():
-        # First check that the tweets were not posted by your bot itself. If they are, skip them
-        if (tweet.user.screen_name is not config.twitter_bot_name) and (tweet.id > since_id):
-            tweet_ids.append(tweet.id)
-            tweets_list.append(tweet)
+    # Retrieve the tweets from server and collect them along with their ID numbers
+    for tweet in iter_mentions(api=api, since_id=since_id):
+        tweet_ids.append(tweet.id)
+        tweets_list.append(tweet)
 
-            # Compare the ID number of this tweet with the one in 'new_since_id' and keep the highest number
-            new_since_id = max(since_id, tweet.id)
+        # Compare the ID number of this tweet with the one in 'new_since_id' and keep the highest number
+        new_since_id = max(new_since_id, tweet.id)
 
     # If the list of tweets retrieved was empty set variable values to None
     if len(tweets_list) == 0:
@@ -165,16 +383,31 @@ def check_mentions(api, since_id='1'):
     return {'tweet_ids': tweet_ids, 'tweets': tweets_list, 'since_id': new_since_id}
 
 
-def like_tweet(tweet):
+def like_tweet(tweet, ledger=None):
     """
     This function takes a single tweet object and 'like' it.
 
     :param tweet: Tweet object that should be liked
     :type tweet: tweepy.Status
+    :param ledger: Ledger of the actions taken on every mention. If provided, the tweet isn't liked again if it was
+    already liked
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
     :return: The tweet ID number
     :rtype: dict[str or int]
     """
 
+    # Don't like the tweet again if it was already liked (e.g. by a run that failed halfway)
+    if ledger is not None and ledger.is_done(action=ledger.like, tweet_id=tweet.id):
+        logger.debug(msg=lang_log_msgs['action_repeated'].format('favorites/create', tweet.id))
+
+        return {'tweet_id': tweet.id}
+
+    # Liking tweets is low priority, so drop it if it would use the calls left for more important actions
+    if not rate_limits.ledger.allow(endpoint='favorites/create'):
+        logger.info(lang_log_msgs['action_dropped'].format('favorites/create', tweet.id))
+
+        return {'tweet_id': tweet.id}
+
     # Try to 'like' tweet
     try:
         tweet.favorite()
@@ -185,64 +418,73 @@ def like_tweet(tweet):
     except tweepy.TweepError as e:
         # If fails, log a warning message
         logger.warning(lang_log_msgs['like_failed'].format(tweet.id, e.reason))
+    else:
+        # Record that the tweet was liked
+        if ledger is not None:
+            ledger.record(action=ledger.like, tweet_id=tweet.id)
+
+    # Update the rate-limit ledger
+    record_response(api=getattr(tweet, '_api', None))
 
     # Return the ID number of this tweet
     return {'tweet_id': tweet.id}
 
 
-def reply_tweet(api, tweet, keywords=lang_commands):
+def reply_tweet(api, tweet, keywords=None, sent_replies=None, related_tweets=(), ledger=None):
     """
     This function takes a given tweet and extracts the keywords for the information requested by your users. Then it
-    replies accordingly with the information returned by the calculations module.
+    replies accordingly with the information returned by the calculations module. If the same user sent other mentions
+    shortly before this one, the information requested in all of them can be combined into the reply to this tweet.
 
     :param api: The API object returned by the authentication function
     :type api: tweepy.API
     :param tweet: Tweet that must be replied
     :type tweet: tweepy.Status
-    :param keywords: List of commands keywords against which to compare the text written in the tweet. It defaults to
-    the commands detailed in the localisation file so this parameter should normally be omitted
+    :param keywords: Dictionary that links the internal command keys to their keywords (against which to compare the
+    text written in the tweet), like the commands detailed in the localisation file. It defaults to the commands of
+    every locale, which are compiled once when the bot starts, so this parameter should normally be omitted
     :type keywords: dict[str]
+    :param sent_replies: Record of the replies sent during the current run. If provided, replies that were already
+    sent to the same user won't be sent again
+    :type sent_replies: bot.app.controllers.reply_composer.SentReplies
+    :param related_tweets: Other mentions from the same user whose requests should be answered in this reply as well
+    :type related_tweets: collections.Iterable[tweepy.Status]
+    :param ledger: Ledger of the actions taken on every mention. If provided, the mentions already replied to (e.g. by
+    a run that failed halfway) aren't replied to again. They're only recorded once their whole thread of replies was
+    sent, and a thread deferred halfway through is resumed where it stopped
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
     :return: The tweet ID number
     :rtype: dict[str or int]
+    :raises tweepy.TweepError: If no reply could be sent because Twitter servers failed, so that the mention is retried
     """
 
-    # Log debugging information
-    logger.debug(msg='\n\ntweet.id is: {0}'.format(str(tweet.id)))
-    logger.debug(msg='\n\ntweet.text is: {0}'.format(str(tweet.full_text)))
-
-    # Split the tweet message into a list of words
-    raw_tweet_words = tweet.full_text.lower().split()
+    # Leave out the related mentions that were already replied to, and don't reply to this one again if it was too
+    if ledger is not None:
+        related_tweets = [item for item in related_tweets if not ledger.is_done(action=ledger.reply, tweet_id=item.id)]
+        if len(related_tweets) == 0 and ledger.is_done(action=ledger.reply, tweet_id=tweet.id):
+            logger.debug(msg=lang_log_msgs['action_repeated'].format('statuses/update', tweet.id))
 
-    # Splitted words may contain dots. Remove them to ensure commands are recognised!
-    tweet_words = [word.replace('.', '') for word in raw_tweet_words]
-
-    # Extract a list of all values for the elements in the 'keywords' dictionary
-    keywords_values = keywords.values()
-
-    # Log debugging information
-    logger.debug(msg='\n\nkeywords_values is: {0}'.format(list(keywords_values)))
-
-    # Make a list of lowercase and 'normalised' keywords (that don't include tildes) to later on compare against the
-    # words extracted from the text in the tweet
-    normalised_keywords = list(map(lambda keyword: remove_tildes(word=keyword.lower()), keywords_values))
+            return {'tweet_id': tweet.id}
 
     # Log debugging information
-    logger.debug(msg='\n\nnormalised_keywords is: {0}'.format(list(normalised_keywords)))
-
-    # Filter the list of words in the tweet comparing each lowercase and normalised word against the list of normalised
-    # command keywords. Then use a set to store all requested commands because sets don't allow for duplicates and we
-    # don't want to send duplicated replies to our users
-    commands = set(filter(lambda word: remove_tildes(word=word) in normalised_keywords, tweet_words))
+    logger.debug(msg='\n\ntweet.id is: {0}'.format(str(tweet.id)))
+    logger.debug(msg='\n\ntweet.text is: {0}'.format(str(tweet.full_text)))
 
-    # Log debugging information
-    logger.debug(msg='\n\ncommands was: {0}'.format(list(commands)))
+    # Use the precompiled commands matcher, unless the caller provided keywords of its own. The matcher links every
+    # keyword to its command key, so the dictionary provided is inverted
+    if keywords is None:
+        matcher = commands_matcher
+    else:
+        matcher = KeywordMatcher(keywords={keyword: command_key for command_key, keyword in keywords.items()})
 
-    # Normalise keywords by removing tildes in case people have poor spelling skills
-    # ToDo: Check if this is actually necessary! Maybe it should be moved up?
-    commands = set(map(lambda word: remove_tildes(word=word), commands))
+    # Find every command requested in the tweet (and in the related ones, oldest first) in a single pass over every
+    # text. The result doesn't include duplicates because we don't want to send duplicated replies to our users
+    command_keys = dict.fromkeys(command_key for item in itertools.chain(related_tweets, (tweet,))
+                                 for command_key in matcher.find_commands(text=item.full_text))
+    commands = [normalised_commands[command_key] for command_key in command_keys]
 
     # Log debugging information
-    logger.debug(msg='\n\ncommands is now: {0}'.format(commands))
+    logger.debug(msg='\n\ncommands is: {0}'.format(commands))
 
     # Check whether the list of commands is not empty after filtering it
     if len(commands) > 0:
@@ -252,41 +494,81 @@ def reply_tweet(api, tweet, keywords=lang_commands):
         logger.debug(msg='\n\ncommands[0] is: {0}'.format(list(commands)[0]))
         logger.debug(msg='\n\ntype(commands[0]) is: {0}'.format(type(list(commands)[0])))
 
-        # Iterate over the list of commands and get the information requested
-        for item in commands:
-
-            # Log debugging information
-            logger.info(lang_log_msgs['replying_tweet'].format(tweet.user.name))
-            logger.debug(msg='\n\nitem is: {0}'.format(item))
-            logger.debug(msg='\n\ntype(item) is: {0}'.format(type(item)))
+        # Take a single snapshot of the countdown so that every unit replied to this tweet is consistent
+        snapshot = calculations.CountdownSnapshot()
 
-            # Get the calculation for the requested information
-            reply = calculations.get_date(remove_tildes(word=item.lower()))
-
-            # Log debugging information
-            logger.debug(msg=lang_log_msgs['replied_with'].format(reply))
-
-            # Try to send the reply to our user
-            try:
-                api.update_status(status=reply, in_reply_to_status_id=tweet.id, auto_populate_reply_metadata=True)
-            except tweepy.TweepError as error:
-                # If the reply failed (e.g. too many characters) log a warning message
-                logger.warning(msg=lang_log_msgs['tweet_failed'].format(tweet.id, error.reason))
+        # Get the calculation for every command requested, and pack them into as few replies as fit in a tweet
+        replies = reply_composer.compose_replies(parts=[calculations.get_date(item, snapshot=snapshot)
+                                                        for item in commands])
     else:
         # If the filtered list of commands is empty, assign a generic reply explaining the user that the bot couldn't
         # understand what the user is requesting (i.e. there was no words in the tweet text that was recognised as a
         # valid command)
-        reply = lang['Twitter']['default_reply']
+        replies = [lang['Twitter']['default_reply']]
+
+    # Resume the thread of replies where a previous run left it, if the rest of it was deferred (e.g. because the rate
+    # limit was hit halfway through it), so that the replies already sent aren't sent again
+    first_reply, in_reply_to_status_id = 0, tweet.id
+    if ledger is not None:
+        first_reply, last_status_id = ledger.thread_progress(tweet_id=tweet.id)
+        if last_status_id is not None:
+            in_reply_to_status_id = last_status_id
+    pending = list(enumerate(replies))[first_reply:]
+
+    # Leave out the replies already sent to this user during the current run. They're only recorded once they're sent,
+    # so that a reply deferred because of the rate limit isn't left out of the replies to later mentions
+    if sent_replies is not None:
+        pending = [(index, reply) for index, reply in pending
+                   if not sent_replies.was_sent(user_id=tweet.user.id, reply=reply)]
+
+    # Take the calls needed to send every reply before sending any of them, so that the user doesn't get only some of
+    # the replies now and all of them again later. If there aren't enough calls left, the whole mention is deferred
+    rate_limits.ledger.require(endpoint='statuses/update', count=len(pending))
+
+    # Log informational message
+    logger.info(lang_log_msgs['replying_tweet'].format(tweet.user.name))
+
+    # Send every reply. If there's more than one, each of them replies to the previous one to keep them in a thread
+    replied = False
+    failure = None
+    for index, reply in pending:
 
         # Log debugging information
         logger.debug(msg=lang_log_msgs['replied_with'].format(reply))
 
-        # Try to send the generic response
+        # Try to send the reply to our user
         try:
-            api.update_status(status=reply, in_reply_to_status_id=tweet.id, auto_populate_reply_metadata=True)
+            status = api.update_status(status=reply, in_reply_to_status_id=in_reply_to_status_id,
+                                       auto_populate_reply_metadata=True)
+        except tweepy.RateLimitError:
+            # If the rate limit was hit anyway (e.g. because of another instance), empty the bucket and defer the rest.
+            # The thread is resumed from this reply in the next run
+            record_response(api=api)
+            rate_limits.ledger.exhaust(endpoint='statuses/update')
+            rate_limits.ledger.require(endpoint='statuses/update')
         except tweepy.TweepError as error:
             # If the reply failed (e.g. too many characters) log a warning message
             logger.warning(msg=lang_log_msgs['tweet_failed'].format(tweet.id, error.reason))
+            failure = error
+        else:
+            record_response(api=api)
+            in_reply_to_status_id = getattr(status, 'id', in_reply_to_status_id)
+            replied = True
+            if sent_replies is not None:
+                sent_replies.add(user_id=tweet.user.id, reply=reply)
+
+            # Keep how far the thread got, in case the rest of it is deferred
+            if ledger is not None:
+                ledger.record_thread(tweet_id=tweet.id, sent=index + 1, status_id=in_reply_to_status_id)
+
+    # If no reply could be sent because Twitter servers failed, leave the mentions unrecorded for the next run to retry
+    if not replied and failure is not None and getattr(failure.response, 'status_code', 0) >= 500:
+        raise failure
+
+    # Record the mentions as replied to once the whole thread was sent, as long as at least one reply got through (in
+    # this run or an earlier one), or every reply was already sent to this user during the current run
+    if replied or first_reply > 0 or len(pending) == 0:
+        record_replies(ledger=ledger, tweets=itertools.chain(related_tweets, (tweet,)))
 
     # Log informational message stating that the function was executed
     logger.info(lang_log_msgs['job_done'])
@@ -295,24 +577,35 @@ def reply_tweet(api, tweet, keywords=lang_commands):
     return {'tweet_id': tweet.id}
 
 
-def reminder_tweet(api, command):
+def record_replies(ledger, tweets):
     """
-    This function tweets a reminder to your users about either the number of hours, days, months, or the summary
-    information to keep them on their toes regarding the date of your event. It will source the text of these reminders
-    from the l10n.py (or l10n_production.py) module, so don't forget to customise the text there and to add some
-    hashtags in your message to make sure more people finds your tweets! ;-)
+    This function records in the ledger of actions that a group of mentions were replied to.
+
+    :param ledger: Ledger of the actions taken on every mention. If None, nothing is recorded
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
+    :param tweets: The mentions replied to
+    :type tweets: collections.Iterable[tweepy.Status]
+    :return: No usable data is returned by this function
+    :rtype: None
+    """
+    if ledger is not None:
+        for item in tweets:
+            ledger.record(action=ledger.reply, tweet_id=item.id)
 
-    :param api: The API object returned by the authentication function
-    :type api: tweepy.API
-    :param command: The command (localised for your language according to the l10n.py module!) to trigger the desired
-    reminder tweet. Possible commands are 'hours', 'days', 'months', or 'summary'
-    :type command: str
-    :return: A copy of the tweet object composed, in case you need it
-    :rtype: tweepy.Status
+
+def reminder_text(command, snapshot=None):
     """
+    This function composes the text of a reminder tweet for a given command, sourcing it from the l10n.py module.
 
-    # log debugging information
-    logger.debug(msg='\ncommand is: {0}'.format(str(command)))
+    :param command: The command (localised for your language according to the l10n.py module!) of the desired reminder.
+    Possible commands are 'hours', 'minutes', 'seconds', 'days', 'months', or 'summary'
+    :type command: str
+    :param snapshot: Countdown snapshot to read the calculations from (e.g. one taken at the moment when the reminder
+    will be sent). If omitted, a new one will be taken
+    :type snapshot: bot.app.controllers.calculations.CountdownSnapshot
+    :return: The text of the reminder tweet
+    :rtype: str
+    """
 
     # Get the localised base strings for the reminder text for all possible commands and store them
     reminder_strings = {
@@ -325,66 +618,642 @@ def reminder_tweet(api, command):
     }
 
     # Get the calculation message
-    calculation_msg = calculations.get_date(data_request=remove_tildes(word=command))
+    calculation_msg = calculations.get_date(data_request=fast_remove_tildes(word=command), snapshot=snapshot)
 
     # Concatenate the final string
-    tweet_text = reminder_strings[command].format(calculation_msg)
+    return reminder_strings[command].format(calculation_msg)
+
+
+def reminder_tweet(api, command, text=None):
+    """
+    This function tweets a reminder to your users about either the number of hours, days, months, or the summary
+    information to keep them on their toes regarding the date of your event. It will source the text of these reminders
+    from the l10n.py (or l10n_production.py) module, so don't forget to customise the text there and to add some
+    hashtags in your message to make sure more people finds your tweets! ;-)
 
-    # Send reminder tweet
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param command: The command (localised for your language according to the l10n.py module!) to trigger the desired
+    reminder tweet. Possible commands are 'hours', 'days', 'months', or 'summary'
+    :type command: str
+    :param text: The text of the reminder, if it was composed in advance. If omitted, it will be composed now
+    :type text: str
+    :return: A copy of the tweet object composed, in case you need it (None if it was deferred because of the rate
+    limit)
+    :rtype: tweepy.Status
+    """
+
+    # log debugging information
+    logger.debug(msg='\ncommand is: {0}'.format(str(command)))
+
+    # Compose the reminder text, unless it was composed in advance
+    tweet_text = reminder_text(command=command) if text is None else text
+
+    # Send reminder tweet, unless there are no calls left (in that case defer it, instead of waiting for the rate limit
+    # to reset, which would delay every reminder that follows)
+    try:
+        rate_limits.ledger.require(endpoint='statuses/update')
+    except rate_limits.RateLimitExceeded as e:
+        logger.warning(msg=lang_log_msgs['action_deferred'].format(e))
+
+        return None
     tweet = api.update_status(status=tweet_text)
+    record_response(api=api)
 
     # Return a copy of the composed tweet object
     return tweet
 
 
-def follow_user(tweet):
+def follow_user(tweet, ledger=None):
     """
     This function takes the tweet object provided and extracts the username of who wrote it. Then it makes your bot to
     follow that user.
 
     :param tweet: Tweet that must be replied
     :type tweet: tweepy.Status
+    :param ledger: Ledger of the actions taken on every mention. If provided, the author isn't followed again if it
+    was already followed back for this tweet
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
     :return: The username of who you just followed
     :rtype: dict[str]
     """
 
-    # First check whether you haven't followed that user before
-    if not tweet.user.following:
-        # If you haven't, follow that user
+    # Don't follow the author again if that was already done for this tweet (e.g. by a run that failed halfway)
+    if ledger is not None and ledger.is_done(action=ledger.follow, tweet_id=tweet.id):
+        logger.debug(msg=lang_log_msgs['action_repeated'].format('friendships/create', tweet.id))
+
+        return {'username': tweet.user.screen_name}
+
+    # First check whether you haven't followed that user before, according to the record of users followed (the
+    # 'following' flag of the tweet may be outdated, so it's only trusted when it's set)
+    if tweet.user.following:
+        tw_follow_state.add(user_id=tweet.user.id)
+    elif tweet.user.id not in tw_follow_state:
+        # Following users is low priority, so drop it if it would use the calls left for more important actions
+        if not rate_limits.ledger.allow(endpoint='friendships/create'):
+            logger.info(lang_log_msgs['action_dropped'].format('friendships/create', tweet.id))
+
+            return {'username': tweet.user.screen_name}
+
+        # If you haven't, follow that user and record it
         tweet.user.follow()
+        tw_follow_state.add(user_id=tweet.user.id)
 
         # Log informational message
         logger.info(lang_log_msgs['followed_user'].format(tweet.user.screen_name))
 
+        # Update the rate-limit ledger
+        record_response(api=getattr(tweet.user, '_api', None))
+
+    # Record that the author was followed back for this tweet
+    if ledger is not None:
+        ledger.record(action=ledger.follow, tweet_id=tweet.id)
+
     # Return the username of who you just followed
     return {'username': tweet.user.screen_name}
 
 
-def follow_all_followers(api):
+def process_mention(api, tweet, sent_replies=None, related_tweets=(), followed_authors=None, ledger=None):
     """
-    This function retrieves a list of all your followers from twitter servers and then follow everyone back at once.
-    This could come in handy if you just implemented this bot in an exiting Twitter account that you were managing
-    manually.
+    This function performs every action this bot takes on a single mention: it replies to the tweet, likes it, and
+    follows its author back. Other mentions from the same user can be coalesced with it, so that they're answered in a
+    single reply and liked as well.
 
     :param api: The API object returned by the authentication function
     :type api: tweepy.API
-    :return: An informational message stating that all your followers were followed
+    :param tweet: Tweet where your bot was mentioned
+    :type tweet: tweepy.Status
+    :param sent_replies: Record of the replies sent during the current run
+    :type sent_replies: bot.app.controllers.reply_composer.SentReplies
+    :param related_tweets: Older mentions from the same user that are coalesced with this one
+    :type related_tweets: list[tweepy.Status]
+    :param followed_authors: ID numbers of the users already followed back during the current run. If provided, the
+    author is only followed back once per run
+    :type followed_authors: set[int]
+    :param ledger: Ledger of the actions taken on every mention. If provided, the actions already taken on these
+    mentions aren't taken again
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
+    :return: The tweet ID number
+    :rtype: dict[str or int]
     """
-    # Get the account user information of this bot
-    user = api.me()
 
-    # Iterate over a list of all the bot followers
-    for follower in tweepy.Cursor(api.followers).items():
+    # Reply to the current tweet and the related ones at once
+    reply_tweet(api=api, tweet=tweet, sent_replies=sent_replies, related_tweets=related_tweets, ledger=ledger)
+
+    # Like every mention
+    for item in itertools.chain(related_tweets, (tweet,)):
+        like_tweet(tweet=item, ledger=ledger)
+
+    # Follow author back, unless that was done already during this run
+    if followed_authors is None or tweet.user.id not in followed_authors:
+        follow_user(tweet=tweet, ledger=ledger)
+        if followed_authors is not None:
+            followed_authors.add(tweet.user.id)
 
-        # Follow back this follower
-        follower.follow()
+    # Return the ID number of this tweet
+    return {'tweet_id': tweet.id}
+
+
+def coalesce_mentions(tweets, window=None):
+    """
+    This function splits a group of mentions written by the same user into windows of mentions posted within a short
+    time of the first one in the window, so that every window can be answered with a single reply.
+
+    :param tweets: Mentions written by the same user, sorted by their ID numbers
+    :type tweets: list[tweepy.Status]
+    :param window: Time (in seconds) after the first mention in a window during which later mentions are coalesced
+    with it. If omitted, the value of the twitter_coalesce_window variable in the config.py module will be used
+    :type window: int
+    :return: The windows of mentions, oldest first
+    :rtype: list[list[tweepy.Status]]
+    """
+
+    # Use the default window if none was requested
+    if window is None:
+        window = config.twitter_coalesce_window
+
+    # Start a new window whenever a mention was posted too long after the first one in the current window
+    windows = []
+    window_end_ns = None
+    for tweet in tweets:
+        posted_ns = snowflake_time_ns(tweet_id=tweet.id)
+        if window_end_ns is None or posted_ns > window_end_ns:
+            windows.append([])
+            window_end_ns = posted_ns + window * 10**9
+        windows[-1].append(tweet)
+
+    return windows
+
+
+def process_mention_group(api, tweets, sent_replies=None, followed_authors=None, ledger=None):
+    """
+    This function processes, one after another and oldest first, a group of mentions that must keep their order (i.e.
+    those written by the same user, so that the replies in each conversation are sent in the order they were
+    requested). Mentions posted within a short time of each other are coalesced and answered with a single reply to
+    the newest of them. If processing a mention fails, the rest of the group is left for the next run to keep that
+    order.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param tweets: Mentions in the group, sorted by their ID numbers
+    :type tweets: list[tweepy.Status]
+    :param sent_replies: Record of the replies sent during the current run
+    :type sent_replies: bot.app.controllers.reply_composer.SentReplies
+    :param followed_authors: ID numbers of the users already followed back during the current run
+    :type followed_authors: set[int]
+    :param ledger: Ledger of the actions taken on every mention
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
+    :return: The ID numbers of the mentions fully processed
+    :rtype: list[int]
+    """
 
-    # Get the localised success message
-    result = lang_log_msgs['followed_everyone'].format(user.name)
+    processed_ids = []
+    for window in coalesce_mentions(tweets=tweets):
+        try:
+            process_mention(api=api, tweet=window[-1], sent_replies=sent_replies, related_tweets=window[:-1],
+                            followed_authors=followed_authors, ledger=ledger)
+        except rate_limits.RateLimitExceeded as error:
+            # Leave these mentions and the rest of the group for a later run, when the rate limit has reset
+            logger.info(msg=lang_log_msgs['action_deferred'].format(error))
+            break
+        except Exception as error:
+            # Log the failure and stop processing this group
+            logger.exception(msg=lang_log_msgs['mention_failed'].format(window[-1].id, error))
+            break
 
-    # Log the result message
-    logger.info(msg=result)
+        processed_ids.extend(tweet.id for tweet in window)
 
-    # Return a copy of the results message
-    return result
+    return processed_ids
+
+
+def process_mentions(api, tweets, parallelism=None, sent_replies=None, followed_authors=None, ledger=None):
+    """
+    This function processes a list of mentions concurrently, using a bounded pool of threads, as most of the time is
+    spent waiting for the Twitter API to answer. Mentions written by the same user are processed in order by the same
+    thread, so that every author is followed back once and mentions sent in quick succession are answered with a single
+    reply. Then it finds the highest tweet ID up to which every mention has been fully processed, which is the value
+    that can be safely stored in the cursor: mentions newer than a failed one will be processed again in the next run,
+    but no mention is ever skipped.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param tweets: Mentions that must be processed
+    :type tweets: list[tweepy.Status]
+    :param parallelism: Maximum number of mentions processed at the same time. If omitted, the value of the
+    twitter_parallelism variable in the config.py module will be used
+    :type parallelism: int
+    :param sent_replies: Record of the replies sent during the current run. If omitted, a new one will be used
+    :type sent_replies: bot.app.controllers.reply_composer.SentReplies
+    :param followed_authors: ID numbers of the users already followed back during the current run. If omitted, a new
+    set will be used
+    :type followed_authors: set[int]
+    :param ledger: Ledger of the actions taken on every mention. If provided, the actions already taken (e.g. by a
+    run that failed halfway) aren't taken again
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
+    :return: The highest tweet ID up to which every mention was processed (None if the first one failed) and the number
+    of mentions processed
+    :rtype: dict[int or None]
+    """
+
+    # Use the default parallelism if none was requested
+    if parallelism is None:
+        parallelism = config.twitter_parallelism
+
+    # Record the replies sent to avoid sending the same one twice to the same user
+    if sent_replies is None:
+        sent_replies = reply_composer.SentReplies()
+
+    # Record the users followed back, to avoid following the same user more than once
+    if followed_authors is None:
+        followed_authors = set()
+
+    # If the record of users followed is outdated, ask Twitter servers about the authors missing from it at once, so
+    # that they aren't followed again
+    if not tw_follow_state.is_it_recent():
+        lookup_following(api=api, user_ids=[tweet.user.id for tweet in tweets if not tweet.user.following])
+
+    # Sort the mentions by ID (i.e. oldest first) and index them by author, keeping that order within every group
+    tweets = sorted(tweets, key=lambda tweet: tweet.id)
+    groups = OrderedDict()
+    for tweet in tweets:
+        groups.setdefault(tweet.user.id, []).append(tweet)
+
+    # Process every group in the pool of threads and collect the ID numbers of the mentions fully processed
+    processed_ids = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(groups)))) as executor:
+        for group_ids in executor.map(lambda group: process_mention_group(api=api, tweets=group,
+                                                                          sent_replies=sent_replies,
+                                                                          followed_authors=followed_authors,
+                                                                          ledger=ledger),
+                                      groups.values()):
+            processed_ids.update(group_ids)
+
+    # Find the highest ID that isn't preceded by any mention left unprocessed
+    last_id = None
+    for tweet in tweets:
+        if tweet.id not in processed_ids:
+            break
+        last_id = tweet.id
+
+    return {'last_id': last_id, 'processed': len(processed_ids)}
+
+
+def checkpoint_cursor(cursor, last_id):
+    """
+    This function saves in the cursor the ID of the last mention processed, but only if it's greater than the one held
+    by the cursor. The cursor writes it to the datastore behind the scenes, coalescing the changes saved in a row. In
+    Google App Engine there could be more than one instance of the bot running concurrently, so if it isn't greater
+    another instance may have changed it and the cursor is refreshed from the datastore instead (once its data isn't
+    recent enough).
+
+    :param cursor: The cursor that holds the ID of the last tweet that was replied to
+    :type cursor: bot.app.models.twitter.TwitterCursor
+    :param last_id: The ID of the last mention processed (i.e. every older mention was processed as well)
+    :type last_id: int or None
+    :return: Whether the cursor was advanced
+    :rtype: bool
+    """
+
+    if last_id is not None and last_id > int(cursor.last_id):
+        cursor.save(last_id=last_id)
+
+        return True
+
+    cursor.refresh()
+
+    return False
+
+
+def reply_mentions(api, cursor, checkpoint_interval=None, parallelism=None, max_mentions=None, catch_up=None,
+                   ledger=None):
+    """
+    This function processes every mention newer than the cursor as they're retrieved from Twitter servers, in batches
+    that are processed concurrently, and stores the cursor in the datastore after every batch. Therefore, if the
+    process is interrupted, the mentions already processed won't be replied to again. If a mention can't be
+    processed, it stops after that batch so that the mentions that follow it are processed in the next run. The
+    actions taken on every mention are recorded in a ledger, so they aren't taken again when the mentions of a batch
+    that failed halfway are processed again. It also
+    stops after processing a maximum number of mentions, leaving the rest for the next runs, so that a long backlog is
+    spread over several runs within the quota of Twitter API calls.
+
+    When the backlog is too long (e.g. after an outage), it switches to catch-up mode: only the newest mentions and
+    those that are recent enough are answered, and the cursor skips every older mention.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param cursor: The cursor that holds the ID of the last tweet that was replied to
+    :type cursor: bot.app.models.twitter.TwitterCursor
+    :param checkpoint_interval: Number of mentions processed between every time the cursor is stored. If omitted, the
+    value of the twitter_checkpoint_interval variable in the config.py module will be used
+    :type checkpoint_interval: int
+    :param parallelism: Maximum number of mentions processed at the same time
+    :type parallelism: int
+    :param max_mentions: Maximum number of mentions processed in this run. If omitted, the value of the
+    twitter_max_mentions_per_run variable in the config.py module will be used
+    :type max_mentions: int
+    :param catch_up: Whether to use the catch-up mode. If omitted, it will be used when the backlog is longer than the
+    value of the twitter_catch_up_threshold variable in the config.py module
+    :type catch_up: bool
+    :param ledger: Ledger of the actions taken on every mention. If omitted, the one used by this module will be used
+    :type ledger: bot.app.models.twitter.TwitterActionLedger
+    :return: The number of mentions waiting and processed, the ID of the last one processed, and the ID of the last
+    one skipped (None if no mention was skipped)
+    :rtype: dict[int or None]
+    """
+
+    # Use the default settings if none were requested
+    if checkpoint_interval is None:
+        checkpoint_interval = config.twitter_checkpoint_interval
+    if max_mentions is None:
+        max_mentions = config.twitter_max_mentions_per_run
+    if ledger is None:
+        ledger = tw_action_ledger
+
+    # Make sure that no other instance is replying to the mentions at the same time. Otherwise leave them to it
+    if not mention_lease.acquire(since_id=int(cursor.last_id)):
+        logger.info(msg=lang_log_msgs['mentions_leased'].format(cursor.last_id))
+
+        return {'backlog': 0, 'processed': 0, 'last_id': None, 'skipped_id': None}
+
+    # The last instance that replied to the mentions left the last tweet ID it processed in the lease, which may be
+    # newer than the one held by the cursor
+    if int(mention_lease.previous.get('last_id', 0)) > int(cursor.last_id):
+        cursor.set(obj_property='last_id', value=int(mention_lease.previous['last_id']))
+
+    # If another instance held the lease, it has recorded its actions in the ledger meanwhile
+    if mention_lease.previous.get('holder') != mention_lease.holder:
+        ledger.update_from_db()
+
+    # Measure the backlog, keeping the ID numbers of the newest mentions in case the catch-up mode is needed
+    since_id = int(cursor.last_id)
+    try:
+        timeline = mention_pages(api=api, since_id=since_id, newest=config.twitter_catch_up_newest)
+    except rate_limits.RateLimitExceeded as error:
+        # If the mentions can't be retrieved now, leave them for a later run
+        logger.info(msg=lang_log_msgs['action_deferred'].format(error))
+        mention_lease.release(last_id=since_id)
+
+        return {'backlog': 0, 'processed': 0, 'last_id': None, 'skipped_id': None}
+
+    # Decide whether to use the catch-up mode, and if so, mark the older mentions as skipped by moving the cursor
+    skipped_id = None
+    if catch_up is None:
+        catch_up = timeline['backlog'] > config.twitter_catch_up_threshold
+    if catch_up:
+        new_since_id = catch_up_since_id(timeline=timeline, since_id=since_id)
+        if new_since_id > since_id:
+            logger.info(msg=lang_log_msgs['mentions_skipped'].format(timeline['backlog'], new_since_id))
+            checkpoint_cursor(cursor=cursor, last_id=new_since_id)
+            since_id = skipped_id = new_since_id
+
+    processed = 0
+    last_id = None
+
+    # Record the replies sent and the users followed back during this run, to avoid sending the same reply twice to the
+    # same user or following the same user more than once
+    sent_replies = reply_composer.SentReplies()
+    followed_authors = set()
+
+    # Refresh the record of users followed if it's outdated
+    if not tw_follow_state.is_it_recent():
+        refresh_follow_state(api=api)
+
+    # Take the mentions in batches as they arrive, until there are no more left or the maximum has been reached
+    mentions = iter_mentions(api=api, since_id=since_id, pages=timeline['pages'])
+    while processed < max_mentions:
+        try:
+            batch = list(itertools.islice(mentions, min(checkpoint_interval, max_mentions - processed)))
+        except rate_limits.RateLimitExceeded as error:
+            # If the rest of the mentions can't be retrieved now, leave them for a later run
+            logger.info(msg=lang_log_msgs['action_deferred'].format(error))
+            break
+        if len(batch) == 0:
+            break
+
+        # Process this batch and store the cursor
+        result = process_mentions(api=api, tweets=batch, parallelism=parallelism, sent_replies=sent_replies,
+                                  followed_authors=followed_authors, ledger=ledger)
+        processed += result['processed']
+        if result['last_id'] is not None:
+            last_id = result['last_id']
+        ledger.flush()
+        checkpoint_cursor(cursor=cursor, last_id=result['last_id'])
+
+        # Stop if any mention in this batch was left unprocessed, or if the lease couldn't be renewed (e.g. because it
+        # expired and another instance took it over)
+        if result['last_id'] != batch[-1].id or not mention_lease.acquire(since_id=int(cursor.last_id)):
+            break
+
+    # Stop requesting mentions from Twitter servers, write the last changes of the cursor to the datastore, and leave
+    # the mentions to the next run
+    mentions.close()
+    ledger.flush()
+    cursor.flush()
+    mention_lease.release(last_id=int(cursor.last_id))
+
+    # Store the users followed back during this run
+    if tw_follow_state.modified:
+        tw_follow_state.send_to_db()
+
+    return {'backlog': timeline['backlog'], 'processed': processed, 'last_id': last_id, 'skipped_id': skipped_id}
+
+
+def refresh_follow_state(api, follow_state=None):
+    """
+    This function refreshes the record of users followed by your bot from Twitter servers, retrieving their ID numbers
+    in pages of up to 5000 users, and stores it in the datastore. If the rate limit is reached, the record is left as
+    it was.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param follow_state: The record of users followed by your bot. If omitted, the one used by this module will be used
+    :type follow_state: bot.app.models.twitter.TwitterFollowState
+    :return: Whether the record was refreshed
+    :rtype: bool
+    """
+
+    # Use the record of this module if none was provided
+    if follow_state is None:
+        follow_state = tw_follow_state
+
+    # Collect the ID numbers from every page
+    user_ids = set()
+    pages = tweepy.Cursor(api.friends_ids).pages()
+    while True:
+        if not rate_limits.ledger.allow(endpoint='friends/ids', priority=rate_limits.high_priority):
+            return False
+        try:
+            user_ids.update(next(pages))
+        except StopIteration:
+            break
+        finally:
+            record_response(api=api)
+
+    # Replace the record and store it
+    follow_state.replace(user_ids=user_ids)
+    follow_state.send_to_db()
+
+    return True
+
+
+def lookup_following(api, user_ids, follow_state=None):
+    """
+    This function checks whether your bot follows the users provided that are missing from the record of users
+    followed, asking Twitter servers about up to 100 users in every call, and adds those it follows to the record.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param user_ids: The ID numbers of the users to check
+    :type user_ids: collections.Iterable[int]
+    :param follow_state: The record of users followed by your bot. If omitted, the one used by this module will be used
+    :type follow_state: bot.app.models.twitter.TwitterFollowState
+    :return: The ID numbers of the users that your bot doesn't follow (or that couldn't be checked)
+    :rtype: list[int]
+    """
+
+    # Use the record of this module if none was provided
+    if follow_state is None:
+        follow_state = tw_follow_state
+
+    # Only look up the users missing from the record, in batches
+    unknown_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in follow_state]
+    not_following = []
+    for start in range(0, len(unknown_ids), friendships_lookup_size):
+        batch = unknown_ids[start:start + friendships_lookup_size]
+
+        # If the rate limit is reached, the rest of the users are considered as not followed
+        if not rate_limits.ledger.allow(endpoint='friendships/lookup'):
+            not_following.extend(unknown_ids[start:])
+            break
+
+        # Record the users followed, and collect the rest
+        relationships = api.lookup_friendships(user_ids=batch)
+        record_response(api=api)
+        following = {relationship.id for relationship in relationships if relationship.is_following}
+        for user_id in batch:
+            if user_id in following:
+                follow_state.add(user_id=user_id)
+            else:
+                not_following.append(user_id)
+
+    return not_following
+
+
+def run_follow_back_job(api, job=None, max_follows=None, restart=False):
+    """
+    This function runs a slice of the job that follows every one of your followers back. This could come in handy if
+    you just implemented this bot in an exiting Twitter account that you were managing manually. It walks the ID numbers
+    of your followers (in pages of up to 5000 users) and only follows those that your bot doesn't follow yet, according
+    to the record of users followed. If that record couldn't be refreshed, it asks Twitter servers about the users
+    missing from the record in batches before following them. Every slice follows a bounded number of users and stops
+    earlier if a rate limit or the limit of users followed is reached, storing the job progress in the datastore after
+    every page, so that the next slice resumes where this one stopped instead of starting over. Followers that Twitter
+    refuses to let the bot follow are skipped, so that they don't block the job.
+
+    :param api: The API object returned by the authentication function
+    :type api: tweepy.API
+    :param job: The progress of the job. If omitted, the one used by this module will be used
+    :type job: bot.app.models.twitter.TwitterFollowBackJob
+    :param max_follows: Maximum number of users followed in this slice. If omitted, the value of the
+    twitter_follow_back_slice variable in the config.py module will be used
+    :type max_follows: int
+    :param restart: Whether the job should start over from the first page of followers, even if it's still running
+    :type restart: bool
+    :return: The progress of the job, and the number of users followed in this slice
+    :rtype: dict
+    """
+
+    # Use the job of this module and the default slice size if none were provided
+    if job is None:
+        job = follow_back_job
+    if max_follows is None:
+        max_follows = config.twitter_follow_back_slice
+
+    # Get the latest progress, as another instance may have run the previous slice, and start the job if it isn't
+    # running already
+    job.update_from_db()
+    if restart or job.status != job.running:
+        job.start()
+
+    # Refresh the record of users followed, unless it's recent enough
+    refreshed = tw_follow_state.is_it_recent() or refresh_follow_state(api=api)
+
+    # Iterate over the pages of the bot followers' ID numbers, from where the previous slice stopped, until there are no
+    # more pages, the slice is complete or a rate limit is reached
+    followed = 0
+    rate_limited = False
+    while job.status == job.running and followed < max_follows and not rate_limited:
+        if not rate_limits.ledger.allow(endpoint='followers/ids', priority=rate_limits.high_priority):
+            break
+        page, cursors = api.followers_ids(cursor=job.next_cursor)
+        record_response(api=api)
+
+        # Newer followers are listed first, so if someone followed your bot since the page was last requested, the
+        # position may point a bit earlier in the page. That's harmless, as users already followed are skipped
+
+        # Check the followers left in this page in batches, so that users are only looked up when they may be followed
+        stopped = False
+        for start in range(job.page_offset, len(page), friendships_lookup_size):
+            batch = page[start:start + friendships_lookup_size]
+            if refreshed:
+                unknown_ids = {user_id for user_id in batch if user_id not in tw_follow_state}
+            else:
+                unknown_ids = set(lookup_following(api=api, user_ids=batch))
+
+            # Follow back every one of them, keeping the position of the next follower to check
+            for user_id in batch:
+                if user_id in unknown_ids:
+                    if followed >= max_follows:
+                        stopped = True
+                        break
+                    if not rate_limits.ledger.allow(endpoint='friendships/create'):
+                        stopped = rate_limited = True
+                        break
+                    try:
+                        api.create_friendship(user_id=user_id)
+                    except tweepy.RateLimitError:
+                        # If the rate limit was hit anyway (e.g. because of another instance), empty the bucket and
+                        # stop this slice, so that the next one follows this user
+                        record_response(api=api)
+                        rate_limits.ledger.exhaust(endpoint='friendships/create')
+                        stopped = rate_limited = True
+                        break
+                    except tweepy.TweepError as error:
+                        record_response(api=api)
+                        logger.warning(msg=lang_log_msgs['follow_failed'].format(user_id, error.reason))
+
+                        # If the bot can't follow anyone else, stop this slice like when the rate limit is reached, so
+                        # that the next one follows this user. Otherwise Twitter rejected this user (e.g. because of a
+                        # pending request to a protected account, or a blocked or suspended user), so skip it
+                        if error.api_code == follow_limit_code:
+                            stopped = rate_limited = True
+                            break
+                    else:
+                        record_response(api=api)
+                        tw_follow_state.add(user_id=user_id)
+                        followed += 1
+                        job.followed += 1
+                job.page_offset += 1
+                job.scanned += 1
+            if stopped:
+                break
+
+        # Move on to the next page once every follower in this one was checked
+        if not stopped:
+            job.advance(next_cursor=cursors[1])
+
+        # Store the job progress after every page
+        job.send_to_db()
+
+    # Store the record of users followed
+    if tw_follow_state.modified:
+        tw_follow_state.send_to_db()
+
+    # Log the progress of the job
+    if job.status == job.done:
+        logger.info(msg=lang_log_msgs['followed_everyone'].format(whoami(api=api)))
+    else:
+        logger.info(msg=lang_log_msgs['follow_back_progress'].format(followed, job.followed, job.scanned))
 
+    # Return a copy of the job progress
+    return dict(job.to_dict(), followed_now=followed)
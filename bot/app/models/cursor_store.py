@@ -0,0 +1,423 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+This module defines the storage backends for cursors (i.e. small records, such as the ID number of the last tweet that
+was replied to, that must survive a restart of your bot). Every backend can get a cursor, put it, and compare-and-set it
+atomically (i.e. store it only if it advances a given field), so that two instances of your bot can never move a cursor
+backwards. The Google Cloud Datastore backend is meant for Google App Engine, the SQLite backend keeps the cursors in a
+local file for generic servers, and the in-memory backend is meant for tests and benchmarks.
+"""
+
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from abc import ABC, abstractmethod
+from datetime import datetime
+import base64
+import json
+import sqlite3
+import threading
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# The backends already created, so that every cursor shares them
+stores = {}
+stores_lock = threading.Lock()
+
+
+class CursorStore(ABC):
+    """
+    This class defines the interface of every cursor storage backend. Cursors are dictionaries identified by a name.
+    """
+
+    @abstractmethod
+    def get(self, name):
+        """
+        Get a cursor.
+
+        :param name: The name of the cursor
+        :type name: str
+        :return: The cursor data, or None if it wasn't stored yet
+        :rtype: dict or None
+        """
+
+    @abstractmethod
+    def put(self, name, data):
+        """
+        Store a cursor, overwriting it if it was stored already.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+
+    @abstractmethod
+    def compare_and_set(self, name, data, field):
+        """
+        Store a cursor atomically, but only if the value of a given field is greater than the one stored (or if it
+        wasn't stored yet).
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :param field: The field compared (e.g. 'last_id')
+        :type field: str
+        :return: Whether the cursor was stored, and the cursor data stored afterwards
+        :rtype: tuple[bool, dict]
+        """
+
+
+class DatastoreCursorStore(CursorStore):
+    """
+    This class stores every cursor as an entity in Google Cloud Firestore (using Datastore compatibility), whose kind is
+    the name of the cursor, so the entities stored by former versions of your bot are still used.
+    """
+
+    def __init__(self):
+        """
+        This method initialises the backend. The datastore client is only created the first time a cursor is used.
+        """
+
+        # Import the datastore library only when needed, as the rest of the backends don't require it
+        from google.cloud import datastore
+        from bot.app.models.datastore_client import get_client
+        from bot.app.models.leases import run_in_transaction
+
+        self.datastore = datastore
+        self.get_client = get_client
+        self.run_in_transaction = run_in_transaction
+
+    @property
+    def db_client(self):
+        """
+        The datastore client shared by every model.
+
+        :return: The datastore client instance
+        :rtype: google.cloud.datastore.Client
+        """
+        return self.get_client()
+
+    def key(self, name):
+        """
+        Get the key of the entity that holds a cursor. It's a single default entity key, so that every cursor is always
+        assigned the same record (number 1).
+
+        :param name: The name of the cursor, which is used as the kind of the entity
+        :type name: str
+        :return: The datastore key
+        :rtype: google.cloud.datastore.Key
+        """
+        return self.db_client.key(name, 1)
+
+    def get(self, name):
+        """
+        Get a cursor from its entity.
+
+        :param name: The name of the cursor
+        :type name: str
+        :return: The cursor data, or None if it wasn't stored yet
+        :rtype: dict or None
+        """
+        db_data = self.db_client.get(key=self.key(name=name))
+
+        return dict(db_data) if db_data is not None else None
+
+    def put(self, name, data):
+        """
+        Store a cursor in its entity, overwriting it if it was stored already.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+
+        # Leave binary values out of the indexes, as they may exceed the size allowed
+        data_item = self.datastore.Entity(key=self.key(name=name),
+                                          exclude_from_indexes=tuple(item for item, value in data.items()
+                                                                     if isinstance(value, bytes)))
+        data_item.update(data)
+        self.db_client.put(entity=data_item)
+
+    def compare_and_set(self, name, data, field):
+        """
+        Store a cursor within a datastore transaction, which is retried if another instance changed it meanwhile, but
+        only if the value of a given field is greater than the one stored (or if it wasn't stored yet).
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :param field: The field compared (e.g. 'last_id')
+        :type field: str
+        :return: Whether the cursor was stored, and the cursor data stored afterwards
+        :rtype: tuple[bool, dict]
+        """
+
+        def advance():
+            stored = self.get(name=name)
+            if stored is not None and stored[field] >= data[field]:
+                return False, stored
+            self.put(name=name, data=data)
+
+            return True, dict(data)
+
+        return self.run_in_transaction(db_client=self.db_client, function=advance)
+
+
+class SQLiteCursorStore(CursorStore):
+    """
+    This class stores every cursor as a row of a table in a local SQLite database, encoded as JSON (with dates and times
+    encoded in ISO format, and bytes in base64). The database uses write-ahead logging, so writing a cursor is a fast
+    local operation that doesn't block readers, and compare-and-set runs in an immediate transaction, so it's atomic
+    even if several processes share the database file.
+    """
+
+    def __init__(self, path):
+        """
+        This method opens the database (creating it if it doesn't exist).
+
+        :param path: Path to the database file
+        :type path: str
+        """
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS cursors (name TEXT PRIMARY KEY, data TEXT NOT NULL)')
+
+    @staticmethod
+    def encode_value(value):
+        """
+        Encode the values that JSON doesn't support.
+
+        :param value: The value to be encoded
+        :type value: datetime or bytes
+        :return: A dictionary that identifies the type of the value, holding it as a string
+        :rtype: dict[str]
+        """
+        if isinstance(value, datetime):
+            return {'$datetime': value.isoformat()}
+        if isinstance(value, bytes):
+            return {'$bytes': base64.b64encode(value).decode('ascii')}
+        raise TypeError('Cannot encode {0} as JSON'.format(type(value).__name__))
+
+    @staticmethod
+    def decode_value(value):
+        """
+        Decode the values encoded by the encode_value() method. Every other JSON object is returned as it is.
+
+        :param value: A JSON object, as decoded by the json library
+        :type value: dict
+        :return: The value decoded
+        :rtype: datetime or bytes or dict
+        """
+        if '$datetime' in value:
+            return datetime.fromisoformat(value['$datetime'])
+        if '$bytes' in value:
+            return base64.b64decode(value['$bytes'])
+        return value
+
+    def read(self, name):
+        """
+        Read a cursor from the database, without locking it.
+
+        :param name: The name of the cursor
+        :type name: str
+        :return: The cursor data, or None if it wasn't stored yet
+        :rtype: dict or None
+        """
+        row = self.connection.execute('SELECT data FROM cursors WHERE name = ?', (name,)).fetchone()
+
+        return json.loads(row[0], object_hook=self.decode_value) if row is not None else None
+
+    def write(self, name, data):
+        """
+        Write a cursor to the database, without locking it.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.connection.execute('INSERT OR REPLACE INTO cursors (name, data) VALUES (?, ?)',
+                                (name, json.dumps(data, default=self.encode_value)))
+
+    def get(self, name):
+        """
+        Get a cursor from its row.
+
+        :param name: The name of the cursor
+        :type name: str
+        :return: The cursor data, or None if it wasn't stored yet
+        :rtype: dict or None
+        """
+        with self.lock:
+            return self.read(name=name)
+
+    def put(self, name, data):
+        """
+        Store a cursor in its row, overwriting it if it was stored already.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.write(name=name, data=data)
+
+    def compare_and_set(self, name, data, field):
+        """
+        Store a cursor within an immediate transaction, so that no other process can change it meanwhile, but only if
+        the value of a given field is greater than the one stored (or if it wasn't stored yet).
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :param field: The field compared (e.g. 'last_id')
+        :type field: str
+        :return: Whether the cursor was stored, and the cursor data stored afterwards
+        :rtype: tuple[bool, dict]
+        """
+        with self.lock:
+            # Lock the database for writing before reading the cursor, so no other process can change it meanwhile
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                stored = self.read(name=name)
+                if stored is not None and stored[field] >= data[field]:
+                    result = False, stored
+                else:
+                    self.write(name=name, data=data)
+                    result = True, dict(data)
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+
+            return result
+
+
+class MemoryCursorStore(CursorStore):
+    """
+    This class keeps every cursor in memory, so they're lost when your bot stops. It's meant for tests and benchmarks,
+    which shouldn't contact Google Cloud servers nor write any file.
+    """
+
+    def __init__(self):
+        """
+        This method initialises an empty backend.
+        """
+        self.lock = threading.Lock()
+        self.cursors = {}
+
+    def get(self, name):
+        """
+        Get a copy of a cursor.
+
+        :param name: The name of the cursor
+        :type name: str
+        :return: The cursor data, or None if it wasn't stored yet
+        :rtype: dict or None
+        """
+        with self.lock:
+            stored = self.cursors.get(name)
+
+            return dict(stored) if stored is not None else None
+
+    def put(self, name, data):
+        """
+        Store a copy of a cursor, overwriting it if it was stored already.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.cursors[name] = dict(data)
+
+    def compare_and_set(self, name, data, field):
+        """
+        Store a copy of a cursor, but only if the value of a given field is greater than the one stored (or if it
+        wasn't stored yet). It's atomic, as every cursor is locked while it's read or changed.
+
+        :param name: The name of the cursor
+        :type name: str
+        :param data: The cursor data
+        :type data: dict
+        :param field: The field compared (e.g. 'last_id')
+        :type field: str
+        :return: Whether the cursor was stored, and the cursor data stored afterwards
+        :rtype: tuple[bool, dict]
+        """
+        with self.lock:
+            stored = self.cursors.get(name)
+            if stored is not None and stored[field] >= data[field]:
+                return False, dict(stored)
+            self.cursors[name] = dict(data)
+
+            return True, dict(data)
+
+
+def get_store(backend=None):
+    """
+    Get the cursor storage backend, creating it the first time it's requested, so that every cursor shares it.
+
+    :param backend: The name of the backend: 'datastore', 'sqlite' or 'memory'. If omitted, the value of the
+    cursor_store variable in the config.py module will be used
+    :type backend: str
+    :return: The cursor storage backend
+    :rtype: CursorStore
+    """
+
+    # Use the default backend if none was requested
+    if backend is None:
+        backend = config.cursor_store
+
+    with stores_lock:
+        if backend not in stores:
+            if backend == 'datastore':
+                stores[backend] = DatastoreCursorStore()
+            elif backend == 'sqlite':
+                stores[backend] = SQLiteCursorStore(path=config.cursor_store_path)
+            elif backend == 'memory':
+                stores[backend] = MemoryCursorStore()
+            else:
+                raise ValueError('Unknown cursor store: {0}'.format(backend))
+            logger.info(msg='Started a new {0} cursor store'.format(backend))
+
+        return stores[backend]
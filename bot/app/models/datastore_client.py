@@ -0,0 +1,60 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+This module holds the Google Cloud Datastore client shared by every model of your bot. The client isn't created when
+your bot is loaded, but the first time the datastore is used, so that a new instance of your app in Google App Engine
+can serve its first requests (e.g. Telegram updates, which don't need the datastore) without waiting for it. Afterwards
+the same client, and therefore its connection to Google Cloud servers, is reused by every model and thread.
+"""
+
+from bot.app.controllers.logger import *
+import threading
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+# The client shared by every model, once it's created
+client = None
+client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the datastore client shared by every model, creating it the first time it's needed.
+
+    :return: The datastore client instance
+    :rtype: google.cloud.datastore.Client
+    """
+    global client
+
+    # Only take the lock while the client hasn't been created yet
+    if client is None:
+        with client_lock:
+            if client is None:
+                # Import the datastore library only when needed, as it takes a while to load
+                from google.cloud import datastore
+
+                logger.info(msg='Started the datastore client')
+                client = datastore.Client()
+
+    return client
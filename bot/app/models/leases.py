@@ -0,0 +1,281 @@
+#
+# Event Info Bot - Bot service software for Telegram and Twitter to provide user with
+#                  reminders of event date and info on request
+#
+# Copyright (C) 2019 Tiktaalik (Rodrigo Gambra-Middleton)
+#                    Address your enquiries to: info@tiktaalik.dev
+#
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""
+This module defines a database model for leases, which are records that only one instance of your app can hold at a
+time (e.g. to send the reminders, or to reply to the mentions), as well as a helper to run a read-compare-write
+operation in a datastore transaction. In Google App Engine there could be more than one instance of your app running
+concurrently, so these are the tools that make sure that they don't duplicate each other's work. On a generic server,
+where every process of your app runs in the same machine, a lock on a local file does the same job without contacting
+Google Cloud servers.
+"""
+
+from bot.app.controllers.logger import *
+import bot.app.config as config
+from bot.app.controllers import clock
+from bot.app.models.datastore_client import get_client
+import fcntl
+import json
+import os
+import socket
+import uuid
+
+# Start logger
+logger = logging.getLogger(__name__)
+
+
+def run_in_transaction(db_client, function, retries=None):
+    """
+    Run a function within a datastore transaction, and run it again if the transaction couldn't be committed because
+    another instance changed the same entities meanwhile. The function should read the entities it needs, compare them
+    and write the changes, as it will see the latest data every time it's run.
+
+    :param db_client: The datastore client instance
+    :type db_client: google.cloud.datastore.Client
+    :param function: The function to run, which takes no arguments
+    :type function: callable
+    :param retries: Number of times the transaction is retried. If omitted, the value of the
+    datastore_transaction_retries variable in the config.py module will be used
+    :type retries: int
+    :return: The value returned by the function
+    """
+
+    # Import the exception raised by the datastore library only when needed, as the file lease doesn't require it
+    from google.api_core.exceptions import Conflict
+
+    # Use the default number of retries if none was requested
+    if retries is None:
+        retries = config.datastore_transaction_retries
+
+    for attempt in range(retries + 1):
+        try:
+            with db_client.transaction():
+                return function()
+        except Conflict as error:
+            # Give up once every retry was used
+            logger.warning(msg='Datastore transaction conflict (attempt {0}): {1}'.format(attempt + 1, error))
+            if attempt == retries:
+                raise
+
+
+# Define a model class to store leases in Google Cloud Firestore (using Datastore compatibility)
+class DatastoreLease(object):
+    """
+    This class creates a lease held by an entity in the datastore that records its holder and when it expires, which
+    is suitable for several instances of your app in Google App Engine. The lease is acquired and renewed within a
+    transaction, so only one instance can hold it at a time. If the holder stops renewing it, another instance takes it
+    over once it expires. The entity can also keep some details about the work done by its holder (e.g. the last tweet
+    ID processed), which are read by the next instance that acquires it.
+    """
+
+    def __init__(self, kind, name, ttl):
+        """
+        This method initialises a lease that hasn't been acquired yet.
+
+        :param kind: Kind of the lease entity
+        :type kind: str
+        :param name: Name of the lease entity
+        :type name: str
+        :param ttl: Seconds the lease lasts after being acquired or renewed
+        :type ttl: float
+        """
+        self.kind = kind
+        self.name = name
+        self.ttl_ns = int(ttl * clock.ns_per_second)
+
+        # Identify this instance uniquely, even if several processes run in it. The details left by the previous
+        # holder are kept when the lease is acquired
+        self.holder = '{0}-{1}-{2}'.format(os.environ.get('GAE_INSTANCE', socket.gethostname()), os.getpid(),
+                                           uuid.uuid4().hex[:8])
+        self.previous = {}
+
+    @property
+    def db_client(self):
+        """
+        The datastore client shared by every model, which is only created the first time the lease is used.
+
+        :return: The datastore client instance
+        :rtype: google.cloud.datastore.Client
+        """
+        return get_client()
+
+    @property
+    def entity_key(self):
+        """
+        The key of the lease entity.
+
+        :return: The datastore key
+        :rtype: google.cloud.datastore.Key
+        """
+        return self.db_client.key(self.kind, self.name)
+
+    def acquire(self, **details):
+        """
+        Try to acquire (or renew) the lease without waiting for it.
+
+        :param details: Details about the work done by this instance that should be stored in the lease entity
+        :return: Whether this instance holds the lease
+        :rtype: bool
+        """
+
+        # Import the datastore library only when needed, as the file lease doesn't require it
+        from google.cloud import datastore
+
+        def take_lease():
+            timestamp_ns = clock.time_ns()
+
+            # Leave the lease alone if another instance holds it and it hasn't expired yet
+            db_data = self.db_client.get(key=self.entity_key)
+            if db_data is not None and db_data['holder'] != self.holder and db_data['expires_ns'] > timestamp_ns:
+                return False
+
+            # Otherwise take it (or renew it) for another period, keeping the details left by the previous holder
+            self.previous = dict(db_data) if db_data is not None else {}
+            data_item = datastore.Entity(key=self.entity_key)
+            data_item.update(self.previous)
+            data_item.update(details)
+            data_item.update({'holder': self.holder, 'expires_ns': timestamp_ns + self.ttl_ns})
+            self.db_client.put(entity=data_item)
+
+            return True
+
+        return run_in_transaction(db_client=self.db_client, function=take_lease)
+
+    def release(self, **details):
+        """
+        Release the lease, if it's held by this instance, so that another one can take it over straight away.
+
+        :param details: Details about the work done by this instance that should be left for the next holder. If
+        omitted, the lease entity is deleted
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+
+        # Import the datastore library only when needed, as the file lease doesn't require it
+        from google.cloud import datastore
+
+        def give_lease_up():
+            db_data = self.db_client.get(key=self.entity_key)
+            if db_data is None or db_data['holder'] != self.holder:
+                return
+
+            # Either leave an expired lease holding the details, or delete it altogether
+            if details:
+                data_item = datastore.Entity(key=self.entity_key)
+                data_item.update(db_data)
+                data_item.update(details)
+                data_item.update({'expires_ns': 0})
+                self.db_client.put(entity=data_item)
+            else:
+                self.db_client.delete(key=self.entity_key)
+
+        run_in_transaction(db_client=self.db_client, function=give_lease_up)
+
+
+class FileLease(object):
+    """
+    This class creates a lease held by an exclusive lock on a file, which is suitable for every process of your app
+    running in the same server. The lock is held until it's released or the process ends, so there's no need to renew
+    it. Like the datastore lease, the file can also keep some details about the work done by its holder (encoded as
+    JSON), which are read by the next process that acquires it.
+    """
+
+    def __init__(self, path):
+        """
+        This method initialises a lease that hasn't been acquired yet.
+
+        :param path: Path to the lock file, which is created if it doesn't exist
+        :type path: str
+        """
+        self.path = path
+        self.lock_file = None
+
+        # Identify this process uniquely. The details left by the previous holder are kept when the lease is acquired
+        self.holder = '{0}-{1}-{2}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        self.previous = {}
+
+    def read_details(self):
+        """
+        Read the details stored in the lock file, which must be held by this process.
+
+        :return: The details stored, or an empty dictionary if there are none
+        :rtype: dict
+        """
+        self.lock_file.seek(0)
+        try:
+            return json.loads(self.lock_file.read() or '{}')
+        except ValueError:
+            return {}
+
+    def write_details(self, details):
+        """
+        Replace the details stored in the lock file, which must be held by this process.
+
+        :param details: The details to be stored. If empty, the file is emptied
+        :type details: dict
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.lock_file.seek(0)
+        self.lock_file.truncate()
+        if details:
+            self.lock_file.write(json.dumps(details))
+        self.lock_file.flush()
+
+    def acquire(self, **details):
+        """
+        Try to acquire (or keep) the lease without waiting for it.
+
+        :param details: Details about the work done by this process that should be stored in the lock file
+        :return: Whether this process holds the lease
+        :rtype: bool
+        """
+        if self.lock_file is None:
+            lock_file = open(file=self.path, mode='a+')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+
+                return False
+            self.lock_file = lock_file
+
+        # Keep the details left by the previous holder, and store those of this process
+        self.previous = self.read_details()
+        self.write_details(details=dict(self.previous, **details, holder=self.holder))
+
+        return True
+
+    def release(self, **details):
+        """
+        Release the lease, if it's held by this process.
+
+        :param details: Details about the work done by this process that should be left for the next holder. If
+        omitted, the lock file is emptied
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        if self.lock_file is not None:
+            self.write_details(details=dict(self.read_details(), **details) if details else {})
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+            self.lock_file.close()
+            self.lock_file = None
@@ -24,64 +24,153 @@ This module defines a database model for a cursor, which is an object that holds
 tweet retrieved from Twitter servers, as well as the date and time when it was retrieved. This data is necessary to
 ensure your bot does not keep replying to old mentions more than once, which would obviously upset your users. This
 cursor will also be equipped with methods that get, set, update and modify its data, as well as to ensure that data is
-current.
+current. The cursor is kept in the storage backend set in the config.py module (see the cursor_store.py module). It
+also defines a model for the users followed by your bot, so that it doesn't need to ask Twitter servers
+whether it already follows someone, and a model for the progress of the job that follows every one of your followers
+back, so that it can be resumed where it stopped.
 """
 
 from bot.app.controllers.logger import *
 import bot.app.config as config
+from bot.app.controllers import clock
+from bot.app.models import cursor_store
 from datetime import datetime, timedelta, timezone
-from google.cloud import datastore
+from array import array
+from collections import OrderedDict
+import hashlib
+import itertools
 import json
+import math
+import threading
+import zlib
 
 # Start logger
 logger = logging.getLogger(__name__)
 
 
-# Define a model class to store data in Google Cloud Firestore (using Datastore compatibility)
+# Define a model class to store the cursor in the cursor storage backend
 class TwitterCursor(object):
     """
     This class creates an object that stores ID number of the last tweet retrieved from Twitter servers, as well as the
     date and time it was last modified. Its methods not only allow you to get, set, and update its data in the database,
     but also to import/export as a dictionary, export as JSON, as well as checking if the data is recent enough or you
-    should reload it from the database.
+    should reload it from the database. It also works as a write-behind cache: reads are served from memory until its
+    data gets too old, and the changes saved are written to the database at most once per interval (and when they're
+    flushed, e.g. at the end of every run or when the app shuts down). The data isn't read from the database until it's
+    used for the first time, so creating a cursor doesn't wait for the database.
     """
 
-    def __init__(self, last_id=1):
+    def __init__(self, last_id=1, store=None):
         """
-        This method initialises an instance by storing a tweet ID number and recording the date and time of its
-        creation. The ID number can be either provided at creation time or it will default to 1 (int) as it would be
-        the case if your bot has just been activated in a new account. In case that you enable this bot in an already
-        existent account you should visit the URL that only checks mentions to make sure of overwrite the default value
-        with the actual last tweet ID number!
+        This method initialises an instance that will read the cursor data from the database the first time it's used.
+        If there isn't any data stored there, it will take a tweet ID number and record the date and time it was set.
+        The ID number can be either provided at creation time or it will default to 1 (int) as it would be the case if
+        your bot has just been activated in a new account. In case that you enable this bot in an already existent
+        account you should visit the URL that only checks mentions to make sure of overwrite the default value with the
+        actual last tweet ID number!
 
         :param last_id: The tweet ID number that should be set as a cursor for future request to the Twitter API
         :type last_id: int
+        :param store: The storage backend where the cursor is kept. If omitted, the one set in the config.py module
+        will be used
+        :type store: bot.app.models.cursor_store.CursorStore
         """
 
         # Log informational message
         logger.info(msg='Started a new TwitterCursor instance')
 
-        # Start the datastore client instance
-        self.db_client = datastore.Client()
+        # Get the storage backend when it's used for the first time, as creating it may connect to the database
+        self.backend = store
 
-        # Log informational message
-        logger.info(msg='Started a new datastore client instance')
+        # Set a single default name so that the cursor is always assigned the same record because there's no need to
+        # store this datum more than once
+        self.name = 'tw_cursor_last_id'
 
-        # Set a single default entity key so that the entity is always assigned the same record (number 1) in datastore
-        # because there's no need to store this datum more than once
-        self.entity_key = self.db_client.key('tw_cursor_last_id', 1)
+        # Keep track of the changes that haven't been written to the database yet, and of the last time (from the
+        # monotonic clock) that the cursor data was read from or written to the database
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.synced_ns = None
+        self.written_ns = None
 
-        # Check first if there's any cursor data recorded in the datastore, in case that the bot is restarting
-        db_data = self.get_from_db()
+        # Keep the default tweet ID number until the cursor data is read from the database for the first time
+        self.default_id = last_id
+        self.values = {}
+        self.loaded = False
+        self.load_lock = threading.Lock()
 
-        # If data is absent from datastore, then set default values because this is the first time the bot has ran
-        if db_data is None:
-            self.last_id = last_id
-            self.creation_time = datetime.now(tz=timezone.utc)
-        else:
-            # Otherwise, set the cursor using the data from the datastore
-            self.last_id = db_data['last_id']
-            self.creation_time = db_data['creation_time']
+    @property
+    def store(self):
+        """
+        The storage backend where the cursor is kept, which is the one set in the config.py module unless another one
+        was provided at creation time.
+
+        :return: The storage backend
+        :rtype: bot.app.models.cursor_store.CursorStore
+        """
+        if self.backend is None:
+            self.backend = cursor_store.get_store()
+
+        return self.backend
+
+    @property
+    def last_id(self):
+        """
+        The ID number of the last tweet retrieved from Twitter servers, which is read from the database the first time
+        it's needed.
+
+        :return: The tweet ID number
+        :rtype: int
+        """
+        self.load()
+
+        return self.values['last_id']
+
+    @last_id.setter
+    def last_id(self, value):
+        self.load()
+        self.values['last_id'] = value
+
+    @property
+    def creation_time(self):
+        """
+        The date and time the cursor was last modified, which is read from the database the first time it's needed.
+
+        :return: The date and time
+        :rtype: datetime
+        """
+        self.load()
+
+        return self.values['creation_time']
+
+    @creation_time.setter
+    def creation_time(self, value):
+        self.load()
+        self.values['creation_time'] = value
+
+    def load(self):
+        """
+        This method reads the cursor data from the database, but only the first time it's called (e.g. when the cursor
+        is used for the first time), in case that the bot is restarting. If there isn't any data stored there, then
+        the default values are set because this is the first time the bot has ran.
+
+        :return: Whether the cursor data was read from the database
+        :rtype: bool
+        """
+
+        # Only take the lock while the data hasn't been read yet
+        if self.loaded:
+            return False
+
+        with self.load_lock:
+            if self.loaded:
+                return False
+
+            if self.update_from_db() is None:
+                self.values = {'last_id': self.default_id, 'creation_time': clock.now(tz=timezone.utc)}
+                self.loaded = True
+
+        return True
 
     def get(self, obj_property):
         """
@@ -195,36 +284,49 @@ class TwitterCursor(object):
         :return: A copy of the current cursor data that was sent to database
         """
 
-        # Create a new datastore entity
-        data_item = datastore.Entity(key=self.entity_key)
-
         # Get current cursor data
         cursor_data = self.to_dict()
 
         # Log debugging messages
-        logger.debug(msg='data_item entity is: {0}'.format(data_item))
         logger.debug(msg='cursor_data is: {0}'.format(cursor_data))
         logger.debug(msg='type(cursor_data) is: {0}'.format(type(cursor_data)))
 
-        # Populate datastore entity with current cursor data
-        data_item.update(cursor_data)
-
-        # Store datastore entity in the database
-        self.db_client.put(entity=data_item)
+        # Store the cursor data in the database
+        self.store.put(name=self.name, data=cursor_data)
 
         # Return a copy of current cursor data
-        return {'item_id': str(data_item.id), 'cursor_data': cursor_data}
+        return {'item_id': self.name, 'cursor_data': cursor_data}
+
+    def compare_and_set(self, last_id):
+        """
+        Store a new tweet ID number in the database atomically (e.g. within a datastore transaction, which is retried if
+        another instance changed the cursor meanwhile), but only if it's greater than the one stored there. Otherwise
+        another instance has already advanced the cursor further, so this cursor takes the data stored in the database
+        instead. That way two instances can never move it backwards.
+
+        :param last_id: The tweet ID number that should be set as a cursor
+        :type last_id: int
+        :return: Whether the cursor was stored in the database
+        :rtype: bool
+        """
+
+        # Compare the tweet ID number with the one stored in the database, and take the latter if it's not lower
+        cursor_data = dict(self.to_dict(), last_id=last_id)
+        stored, db_data = self.store.compare_and_set(name=self.name, data=cursor_data, field='last_id')
+        self.from_dict(dict_data=db_data)
+
+        return stored
 
     def get_from_db(self):
         """
-        Retrieve cursor data directly from the datastore and return it.
+        Retrieve cursor data directly from the database and return it.
 
         :return: Cursor data as it is stored in the database
         :rtype: dict
         """
 
         # Get cursor data from the database
-        db_data = self.db_client.get(key=self.entity_key)
+        db_data = self.store.get(name=self.name)
 
         # Log debugging information
         logger.debug(msg='Retrieved cursor data from db: {0}'.format(repr(db_data)))
@@ -240,16 +342,94 @@ class TwitterCursor(object):
         :return: If database is not empty, return cursor data. Otherwise return None
         :rtype: dict or None
         """
-        db_data = self.db_client.get(key=self.entity_key)
+        db_data = self.store.get(name=self.name)
         logger.info(msg='Retrieved cursor data from db: {0}'.format(repr(db_data)))
+        self.synced_ns = clock.monotonic_ns()
 
         if db_data is not None:
-            self.from_dict(dict_data=db_data)
+            # Replace the data at once, as it may be read by another thread meanwhile
+            self.values = {'last_id': db_data['last_id'], 'creation_time': db_data['creation_time']}
+            self.loaded = True
 
-            return {'last_id': self.last_id, 'creation_time': self.creation_time}
+            return dict(self.values)
         else:
             return None
 
+    def save(self, last_id, interval=None):
+        """
+        This method sets a new tweet ID number in the cursor and writes it to the database behind the scenes: only if
+        it wasn't written during the last interval, so that several changes in a row (e.g. one after every batch of
+        mentions) are coalesced into a single write. Otherwise the change is kept until the interval is over or the
+        cursor is flushed.
+
+        :param last_id: The tweet ID number that should be set as a cursor
+        :type last_id: int
+        :param interval: Minimum number of seconds between writes. If omitted, the value of the
+        twitter_cursor_write_interval variable in the config.py module will be used
+        :type interval: float
+        :return: Whether the cursor was written to the database
+        :rtype: bool
+        """
+
+        # Use the default interval if none was requested
+        if interval is None:
+            interval = config.twitter_cursor_write_interval
+
+        with self.lock:
+            self.last_id = last_id
+            self.dirty = True
+            overdue = self.written_ns is None or clock.monotonic_ns() - self.written_ns >= interval * 10**9
+
+        # Write the change now if the interval is over
+        return self.flush() if overdue else False
+
+    def flush(self):
+        """
+        This method writes to the database the changes that haven't been written yet, if any.
+
+        :return: Whether the cursor was written to the database
+        :rtype: bool
+        """
+        with self.lock:
+            if not self.dirty:
+                return False
+
+            self.compare_and_set(last_id=int(self.last_id))
+            self.dirty = False
+            self.written_ns = self.synced_ns = clock.monotonic_ns()
+
+            return True
+
+    def refresh(self, ttl=None):
+        """
+        This method reloads the cursor data from the database, but only if it was last read from or written to the
+        database longer ago than a given time, as the data held in memory is served otherwise. In Google App Engine
+        there could be more than one instance of the bot running, so the data shouldn't be served from memory for too
+        long. Any change that wasn't written yet is flushed instead, so that it isn't lost.
+
+        :param ttl: Number of seconds the cursor data is served from memory. If omitted, the value of the
+        twitter_cursor_ttl variable in the config.py module will be used
+        :type ttl: float
+        :return: Whether the cursor data was read from or written to the database
+        :rtype: bool
+        """
+
+        # Use the default time if none was requested
+        if ttl is None:
+            ttl = config.twitter_cursor_ttl
+
+        # Don't overwrite the changes that haven't been written yet, and read the data if it wasn't read yet
+        if self.flush() or self.load():
+            return True
+
+        # Serve the data from memory while it's recent enough
+        if clock.monotonic_ns() - self.synced_ns < ttl * 10**9:
+            return False
+
+        self.update_from_db()
+
+        return True
+
     def is_it_recent(self):
         """
         This method checks whether the current values of the cursor instance are reasonably recent (i.e. less than
@@ -261,8 +441,8 @@ class TwitterCursor(object):
         :rtype: bool
         """
 
-        # Get current date and time from the operating system
-        now = datetime.now(tz=timezone.utc)
+        # Get current date and time from the clock in use
+        now = clock.now(tz=timezone.utc)
 
         # Calculate the date and time difference between now and the data stored in the cursor
         delta = now - self.creation_time
@@ -275,3 +455,760 @@ class TwitterCursor(object):
             return False
         else:
             return True
+
+
+# Define a model class to store the users followed by your bot in the cursor storage backend
+class TwitterFollowState(object):
+    """
+    This class creates an object that stores the ID numbers of every user followed by your bot, as well as the date and
+    time they were last refreshed from Twitter servers. It's stored in the cursor storage backend alongside the
+    TwitterCursor, so that your bot doesn't need to ask Twitter servers whether it follows a user every time it may
+    follow someone back. The ID numbers are stored packed and compressed, as accounts may follow tens of thousands of
+    users.
+    """
+
+    def __init__(self, store=None):
+        """
+        This method initialises an instance that will read the data stored in the database, if there's any, the first
+        time it's used. Otherwise, it starts empty and it should be refreshed from Twitter servers.
+
+        :param store: The storage backend where the data is kept. If omitted, the one set in the config.py module will
+        be used
+        :type store: bot.app.models.cursor_store.CursorStore
+        """
+
+        # Get the storage backend when it's used for the first time, and set a single default name for the data, as
+        # there's no need to store it more than once
+        self.backend = store
+        self.name = 'tw_follow_state'
+
+        # Set default values until the data recorded in the database is read. The 'modified' flag tells whether there
+        # are changes that haven't been stored yet
+        self.user_ids = set()
+        self.refreshed_time = None
+        self.modified = False
+        self.loaded = False
+
+    @property
+    def store(self):
+        """
+        The storage backend where the data is kept.
+
+        :return: The storage backend
+        :rtype: bot.app.models.cursor_store.CursorStore
+        """
+        if self.backend is None:
+            self.backend = cursor_store.get_store()
+
+        return self.backend
+
+    def load(self):
+        """
+        This method reads the data stored in the database, but only the first time it's called.
+
+        :return: Whether the data was read from the database
+        :rtype: bool
+        """
+        if self.loaded:
+            return False
+
+        self.update_from_db()
+        self.loaded = True
+
+        return True
+
+    def __contains__(self, user_id):
+        """
+        Check whether your bot follows a user, according to the data held by this instance.
+
+        :param user_id: The ID number of the user
+        :type user_id: int
+        :return: Whether your bot follows the user
+        :rtype: bool
+        """
+        self.load()
+
+        return user_id in self.user_ids
+
+    def add(self, user_id):
+        """
+        Record that your bot follows a user.
+
+        :param user_id: The ID number of the user
+        :type user_id: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.load()
+
+        if user_id not in self.user_ids:
+            self.user_ids.add(user_id)
+            self.modified = True
+
+    def replace(self, user_ids):
+        """
+        Replace every user followed by your bot with a new list, freshly retrieved from Twitter servers, and record the
+        date and time it was refreshed.
+
+        :param user_ids: The ID numbers of every user followed by your bot
+        :type user_ids: collections.Iterable[int]
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.user_ids = set(user_ids)
+        self.refreshed_time = clock.now(tz=timezone.utc)
+        self.modified = True
+        self.loaded = True
+
+    def to_dict(self):
+        """
+        Get the current data and return it as a dictionary, with the ID numbers packed and compressed as they're stored
+        in the database.
+
+        :return: Follow state data as a dictionary
+        :rtype: dict
+        """
+        packed_ids = array('Q', sorted(self.user_ids))
+
+        return {'refreshed_time': self.refreshed_time, 'user_ids': zlib.compress(packed_ids.tobytes())}
+
+    def from_dict(self, dict_data):
+        """
+        Import the data from a dictionary, as it's stored in the database, and overwrite current values.
+
+        :param dict_data: Dictionary containing follow state data
+        :type dict_data: dict
+        :return: True
+        :rtype: bool
+        """
+        packed_ids = array('Q')
+        packed_ids.frombytes(zlib.decompress(dict_data['user_ids']))
+        self.user_ids = set(packed_ids)
+        self.refreshed_time = dict_data['refreshed_time']
+        self.modified = False
+
+        return True
+
+    def send_to_db(self):
+        """
+        Store current data into the database.
+
+        :return: The number of users followed that were stored
+        :rtype: int
+        """
+
+        # Store the data in the database
+        self.store.put(name=self.name, data=self.to_dict())
+        self.modified = False
+
+        return len(self.user_ids)
+
+    def update_from_db(self):
+        """
+        This method retrieves the data stored in the database and update current values with those in the database.
+
+        :return: If database is not empty, the number of users followed. Otherwise return None
+        :rtype: int or None
+        """
+        db_data = self.store.get(name=self.name)
+
+        self.loaded = True
+
+        if db_data is not None:
+            self.from_dict(dict_data=db_data)
+
+            return len(self.user_ids)
+        else:
+            return None
+
+    def is_it_recent(self):
+        """
+        This method checks whether the users followed have been refreshed from Twitter servers recently (i.e. less than
+        the twitter_follow_state_ttl setting in the config.py module), as your account may follow or unfollow users
+        without your bot knowing about it.
+
+        :return: Confirmation of whether this instance holds recent data or not
+        :rtype: bool
+        """
+        self.load()
+
+        if self.refreshed_time is None:
+            return False
+
+        return clock.now(tz=timezone.utc) - self.refreshed_time <= timedelta(hours=config.twitter_follow_state_ttl)
+
+
+# Define a model class to store the progress of the 'follow back' job in the cursor storage backend
+class TwitterFollowBackJob(object):
+    """
+    This class creates an object that stores the progress of the job that follows every one of your followers back:
+    the pagination cursor of the page of followers being processed, the position within that page, and how many
+    followers have been checked and followed so far. As it's stored in the database, the job can be run a slice at a
+    time (e.g. on every visit to a URL or on a schedule) and resumed from where it stopped, even if a request timed out
+    or another instance of your app in GAE ran the previous slice.
+    """
+
+    # The states a job can be in
+    idle = 'idle'
+    running = 'running'
+    done = 'done'
+
+    def __init__(self, store=None):
+        """
+        This method initialises an idle job. The data stored in the database, if there's any, should be read (with
+        the update_from_db method) before the job is run or displayed, as another instance may have run it meanwhile.
+
+        :param store: The storage backend where the job is kept. If omitted, the one set in the config.py module will
+        be used
+        :type store: bot.app.models.cursor_store.CursorStore
+        """
+
+        # Get the storage backend when it's used for the first time, and set a single default name for the job, as
+        # there's only one job at a time
+        self.backend = store
+        self.name = 'tw_follow_back_job'
+
+        # Set default values
+        self.status = self.idle
+        self.next_cursor = -1
+        self.page_offset = 0
+        self.scanned = 0
+        self.followed = 0
+        self.started_time = None
+        self.updated_time = None
+        self.finished_time = None
+
+    @property
+    def store(self):
+        """
+        The storage backend where the job is kept.
+
+        :return: The storage backend
+        :rtype: bot.app.models.cursor_store.CursorStore
+        """
+        if self.backend is None:
+            self.backend = cursor_store.get_store()
+
+        return self.backend
+
+    def start(self):
+        """
+        Start the job over from the first page of followers, clearing its progress.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.status = self.running
+        self.next_cursor = -1
+        self.page_offset = 0
+        self.scanned = 0
+        self.followed = 0
+        self.started_time = clock.now(tz=timezone.utc)
+        self.updated_time = self.started_time
+        self.finished_time = None
+
+    def advance(self, next_cursor):
+        """
+        Move the job on to the next page of followers, or finish it if there are no more pages (i.e. the next cursor
+        is 0).
+
+        :param next_cursor: The pagination cursor of the next page, as returned by Twitter servers
+        :type next_cursor: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        self.next_cursor = next_cursor
+        self.page_offset = 0
+
+        if next_cursor == 0:
+            self.status = self.done
+            self.finished_time = clock.now(tz=timezone.utc)
+
+    def to_dict(self):
+        """
+        Get the current job data and return it as a dictionary.
+
+        :return: Job data as a dictionary
+        :rtype: dict
+        """
+        return {'status': self.status, 'next_cursor': self.next_cursor, 'page_offset': self.page_offset,
+                'scanned': self.scanned, 'followed': self.followed, 'started_time': self.started_time,
+                'updated_time': self.updated_time, 'finished_time': self.finished_time}
+
+    def from_dict(self, dict_data):
+        """
+        Import data from a dictionary and overwrite current values for any property.
+
+        :param dict_data: Dictionary containing job data
+        :type dict_data: dict
+        :return: True
+        :rtype: bool
+        """
+
+        # Iterate over the dictionary data and set new values
+        for item in dict_data:
+            setattr(self, item, dict_data[item])
+
+        return True
+
+    def to_json(self, indented=True):
+        """
+        This method gets the current job data and return it in JSON format, so that the progress of the job can be
+        displayed in your web browser.
+
+        :param indented: Whether the JSON data returned should be indented for pretty-printing
+        :type indented: bool
+        :return: Current job data in JSON format
+        :rtype: str
+        """
+
+        # Set the date and time values as data types that can be exported in JSON format
+        structure = self.to_dict()
+        for item in ('started_time', 'updated_time', 'finished_time'):
+            if structure[item] is not None:
+                structure[item] = structure[item].isoformat()
+
+        # Check whether data should be indented or not and return it
+        if indented:
+            return json.dumps(structure, indent=4, sort_keys=True)
+        else:
+            return json.dumps(structure, sort_keys=True)
+
+    def send_to_db(self):
+        """
+        Record the date and time of this update and store current job data into the database.
+
+        :return: A copy of the current job data that was sent to database
+        :rtype: dict
+        """
+        self.updated_time = clock.now(tz=timezone.utc)
+
+        # Store current job data in the database
+        job_data = self.to_dict()
+        self.store.put(name=self.name, data=job_data)
+
+        return job_data
+
+    def update_from_db(self):
+        """
+        This method retrieves the job data stored in the database and update current values with those in the
+        database.
+
+        :return: If database is not empty, return job data. Otherwise return None
+        :rtype: dict or None
+        """
+        db_data = self.store.get(name=self.name)
+
+        if db_data is not None:
+            self.from_dict(dict_data=db_data)
+
+            return self.to_dict()
+        else:
+            return None
+
+
+class BloomFilter(object):
+    """
+    This class creates a Bloom filter: a compact set of numbers that can tell whether a number was added to it or not,
+    though there's a small chance that it mistakes a number that wasn't added for one that was (but never the other way
+    around). Its size depends on how many numbers it should hold and on that chance, not on the numbers themselves.
+    """
+
+    def __init__(self, capacity, error_rate):
+        """
+        This method initialises an empty filter.
+
+        :param capacity: The number of numbers the filter should hold
+        :type capacity: int
+        :param error_rate: The chance of mistaking a number that wasn't added for one that was, once the filter is full
+        :type error_rate: float
+        """
+
+        # Find the optimal number of bits and hash functions for that capacity and chance
+        self.capacity = capacity
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, value):
+        """
+        Get the positions of the bits that represent a number, deriving every hash function from a single digest.
+
+        :param value: The number
+        :type value: int
+        :return: The positions of its bits
+        :rtype: collections.Iterable[int]
+        """
+        digest = hashlib.blake2b(value.to_bytes(16, 'little'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value):
+        """
+        Add a number to the filter.
+
+        :param value: The number
+        :type value: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        for position in self.positions(value=value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        """
+        Check whether a number was added to the filter (or, rarely, mistake it for one that was).
+
+        :param value: The number
+        :type value: int
+        :return: Whether the number was added to the filter
+        :rtype: bool
+        """
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value=value))
+
+    def is_full(self):
+        """
+        Check whether the filter holds as many numbers as it should, as its chance of mistakes grows after that.
+
+        :return: Whether the filter is full
+        :rtype: bool
+        """
+        return self.count >= self.capacity
+
+    def load(self, bits, count):
+        """
+        Load the bits and the count of numbers stored in the database, unless they were stored by a filter of another
+        size (e.g. because its settings were changed meanwhile), in which case the filter is left empty.
+
+        :param bits: The bits of the filter
+        :type bits: bytes
+        :param count: The number of numbers added to the filter
+        :type count: int
+        :return: Whether the data was loaded
+        :rtype: bool
+        """
+        if len(bits) != len(self.bits):
+            return False
+
+        self.bits = bytearray(bits)
+        self.count = count
+
+        return True
+
+
+# Define a model class to store the actions taken on every mention in the cursor storage backend
+class TwitterActionLedger(object):
+    """
+    This class creates a ledger of the actions (reply, like, follow back) already taken on every mention, so that
+    they're never taken twice even if a run fails halfway and its mentions are processed again, which the cursor alone
+    can't prevent as it's only advanced after a whole batch of mentions. The latest mentions are kept exactly, in a
+    buffer of fixed size that evicts the oldest ones first. Older mentions are kept in two Bloom filters (the current
+    one and the previous one, which is dropped when the current one is full), so that the ledger never grows. As
+    tweet ID numbers grow with time, a mention newer than every one evicted from the buffer is only looked up in the
+    buffer, so it's never mistaken for one already processed. It also keeps how far the thread of replies to a
+    mention got when the rest of it was deferred, so that the next run resumes it rather than sending it again. The
+    ledger is written to the database in batches of actions (and when it's flushed, e.g. at the end of every run or
+    when the app shuts down).
+    """
+
+    # The actions recorded for every mention, as bit flags
+    reply = 1
+    like = 2
+    follow = 4
+
+    def __init__(self, size=None, capacity=None, error_rate=None, store=None):
+        """
+        This method initialises an instance that will read the ledger from the database the first time it's used.
+
+        :param size: The number of the latest mentions kept exactly. If omitted, the value of the twitter_ledger_size
+        variable in the config.py module will be used
+        :type size: int
+        :param capacity: The number of actions held by every Bloom filter. If omitted, the value of the
+        twitter_ledger_capacity variable in the config.py module will be used
+        :type capacity: int
+        :param error_rate: The chance of mistaking an older mention for one already processed. If omitted, the value of
+        the twitter_ledger_error_rate variable in the config.py module will be used
+        :type error_rate: float
+        :param store: The storage backend where the ledger is kept. If omitted, the one set in the config.py module
+        will be used
+        :type store: bot.app.models.cursor_store.CursorStore
+        """
+
+        # Use the default settings if none were requested
+        self.size = config.twitter_ledger_size if size is None else size
+        self.capacity = config.twitter_ledger_capacity if capacity is None else capacity
+        self.error_rate = config.twitter_ledger_error_rate if error_rate is None else error_rate
+
+        # Get the storage backend when it's used for the first time, and set a single default name for the ledger
+        self.backend = store
+        self.name = 'tw_action_ledger'
+
+        # Keep track of the actions that haven't been written to the database yet. Mentions are processed
+        # concurrently, so the ledger is locked while it's read or changed
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.dirty = False
+        self.pending = 0
+        self.clear()
+
+    @property
+    def store(self):
+        """
+        The storage backend where the ledger is kept.
+
+        :return: The storage backend
+        :rtype: bot.app.models.cursor_store.CursorStore
+        """
+        if self.backend is None:
+            self.backend = cursor_store.get_store()
+
+        return self.backend
+
+    def clear(self):
+        """
+        Empty the ledger held in memory.
+
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+
+        # The latest mentions (oldest first) and their actions, the highest ID number evicted from them, the current
+        # and previous Bloom filters, and the threads of replies that were deferred halfway through
+        self.threads = {}
+        self.recent = OrderedDict()
+        self.floor_id = 0
+        self.filters = [BloomFilter(capacity=self.capacity, error_rate=self.error_rate),
+                        BloomFilter(capacity=self.capacity, error_rate=self.error_rate)]
+
+    def __len__(self):
+        """
+        Get the number of mentions kept exactly.
+
+        :return: The number of mentions in the buffer
+        :rtype: int
+        """
+        with self.lock:
+            self.load()
+
+            return len(self.recent)
+
+    def is_done(self, action, tweet_id):
+        """
+        Check whether an action was already taken on a mention.
+
+        :param action: The action (i.e. TwitterActionLedger.reply, like or follow)
+        :type action: int
+        :param tweet_id: The ID number of the mention
+        :type tweet_id: int
+        :return: Whether the action was already taken
+        :rtype: bool
+        """
+        with self.lock:
+            self.load()
+
+            # Every action taken on a mention newer than those evicted from the buffer is still in the buffer
+            if self.recent.get(tweet_id, 0) & action:
+                return True
+            if tweet_id > self.floor_id:
+                return False
+
+            # Otherwise look the action up in the Bloom filters
+            key = tweet_id * 8 + action
+
+            return any(key in bloom_filter for bloom_filter in self.filters)
+
+    def thread_progress(self, tweet_id):
+        """
+        Get how far the thread of replies to a mention got, in case the rest of it was deferred (e.g. because the rate
+        limit was hit halfway through it).
+
+        :param tweet_id: The ID number of the mention
+        :type tweet_id: int
+        :return: The number of replies already sent, and the ID number of the last one (None if none was sent)
+        :rtype: tuple[int, int or None]
+        """
+        with self.lock:
+            self.load()
+
+            return self.threads.get(tweet_id, (0, None))
+
+    def record_thread(self, tweet_id, sent, status_id):
+        """
+        Record how far the thread of replies to a mention got, so that the next run resumes it if the rest of it is
+        deferred. It's forgotten once the mention is recorded as replied to.
+
+        :param tweet_id: The ID number of the mention
+        :type tweet_id: int
+        :param sent: The number of replies already sent
+        :type sent: int
+        :param status_id: The ID number of the last reply sent
+        :type status_id: int
+        :return: No usable data is returned by this method
+        :rtype: None
+        """
+        with self.lock:
+            self.load()
+            self.threads[tweet_id] = (sent, status_id)
+            self.dirty = True
+
+    def record(self, action, tweet_id, batch_size=None):
+        """
+        Record that an action was taken on a mention, and write the ledger to the database once enough actions have
+        been recorded since it was last written.
+
+        :param action: The action (i.e. TwitterActionLedger.reply, like or follow)
+        :type action: int
+        :param tweet_id: The ID number of the mention
+        :type tweet_id: int
+        :param batch_size: Number of actions recorded between writes. If omitted, the value of the
+        twitter_ledger_batch_size variable in the config.py module will be used
+        :type batch_size: int
+        :return: Whether the ledger was written to the database
+        :rtype: bool
+        """
+
+        # Use the default batch size if none was requested
+        if batch_size is None:
+            batch_size = config.twitter_ledger_batch_size
+
+        with self.lock:
+            self.load()
+            actions = self.recent.get(tweet_id, 0)
+            if actions & action:
+                return False
+
+            # Add the action to the buffer, evicting the oldest mentions if it's full. Once a mention is replied to,
+            # its thread of replies is complete
+            self.recent[tweet_id] = actions | action
+            if action == self.reply:
+                self.threads.pop(tweet_id, None)
+            while len(self.recent) > self.size:
+                evicted_id, _ = self.recent.popitem(last=False)
+                self.floor_id = max(self.floor_id, evicted_id)
+
+            # Add the action to the current Bloom filter, starting a new one if it's full
+            if self.filters[0].is_full():
+                self.filters = [BloomFilter(capacity=self.capacity, error_rate=self.error_rate), self.filters[0]]
+            self.filters[0].add(value=tweet_id * 8 + action)
+
+            self.dirty = True
+            self.pending += 1
+            overdue = self.pending >= batch_size
+
+        # Write the batch of actions now if it's complete
+        return self.flush() if overdue else False
+
+    def to_dict(self):
+        """
+        Get the ledger data and return it as a dictionary, with the ID numbers packed and compressed as they're stored
+        in the database.
+
+        :return: Ledger data as a dictionary
+        :rtype: dict
+        """
+        with self.lock:
+            # Keep the threads as (mention ID, replies sent, last reply ID) triples, leaving out those of the mentions
+            # evicted from the buffer
+            threads = array('Q', itertools.chain.from_iterable(
+                (tweet_id, sent, status_id or 0) for tweet_id, (sent, status_id) in self.threads.items()
+                if tweet_id > self.floor_id))
+
+            return {'tweet_ids': zlib.compress(array('Q', self.recent.keys()).tobytes()),
+                    'actions': bytes(self.recent.values()), 'floor_id': self.floor_id,
+                    'filter_bits': bytes(self.filters[0].bits), 'filter_count': self.filters[0].count,
+                    'previous_bits': bytes(self.filters[1].bits), 'previous_count': self.filters[1].count,
+                    'threads': zlib.compress(threads.tobytes()), 'updated_time': clock.now(tz=timezone.utc)}
+
+    def from_dict(self, dict_data):
+        """
+        Import the data from a dictionary, as it's stored in the database, and overwrite current values.
+
+        :param dict_data: Dictionary containing ledger data
+        :type dict_data: dict
+        :return: True
+        :rtype: bool
+        """
+        tweet_ids = array('Q')
+        tweet_ids.frombytes(zlib.decompress(dict_data['tweet_ids']))
+
+        # Ledgers stored by former versions of your bot don't keep any thread
+        threads = array('Q')
+        if dict_data.get('threads'):
+            threads.frombytes(zlib.decompress(dict_data['threads']))
+
+        with self.lock:
+            self.clear()
+            self.recent.update(zip(tweet_ids, dict_data['actions']))
+            self.floor_id = dict_data['floor_id']
+            self.filters[0].load(bits=dict_data['filter_bits'], count=dict_data['filter_count'])
+            self.filters[1].load(bits=dict_data['previous_bits'], count=dict_data['previous_count'])
+            self.threads = {threads[index]: (threads[index + 1], threads[index + 2] or None)
+                            for index in range(0, len(threads), 3)}
+
+            # Evict the oldest mentions if the buffer was made smaller meanwhile
+            while len(self.recent) > self.size:
+                evicted_id, _ = self.recent.popitem(last=False)
+                self.floor_id = max(self.floor_id, evicted_id)
+
+        return True
+
+    def load(self):
+        """
+        This method reads the ledger from the database, but only the first time it's called (e.g. when the ledger is
+        used for the first time).
+
+        :return: Whether the ledger was read from the database
+        :rtype: bool
+        """
+        with self.lock:
+            if self.loaded:
+                return False
+
+            self.update_from_db()
+
+            return True
+
+    def update_from_db(self):
+        """
+        This method retrieves the ledger stored in the database and replaces the one held in memory (e.g. because
+        another instance of your app in GAE replied to the mentions meanwhile).
+
+        :return: If database is not empty, the number of mentions kept exactly. Otherwise return None
+        :rtype: int or None
+        """
+        db_data = self.store.get(name=self.name)
+
+        with self.lock:
+            self.loaded = True
+            self.dirty = False
+            self.pending = 0
+
+            if db_data is None:
+                self.clear()
+
+                return None
+
+            self.from_dict(dict_data=db_data)
+
+            return len(self.recent)
+
+    def flush(self):
+        """
+        This method writes the ledger to the database if there are actions that haven't been written yet.
+
+        :return: Whether the ledger was written to the database
+        :rtype: bool
+        """
+        with self.lock:
+            if not self.dirty:
+                return False
+
+            self.store.put(name=self.name, data=self.to_dict())
+            self.dirty = False
+            self.pending = 0
+
+            return True
@@ -31,6 +31,7 @@ any changes you make in that file will not be affected by upgrading your app.
 
 
 import unicodedata
+from functools import lru_cache
 
 locales = {
     'en-AU': {
@@ -101,13 +102,27 @@ locales = {
             'mentions_list': 'This is the list of mentions: \n{0}',
             'followed_user': 'Just followed this user: {0}',
             'followed_everyone': 'Just followed back everyone who follows bot {0}',
+            'follow_back_progress': 'Followed back {0} users in this slice. So far {1} users were followed back out of '
+                                    '{2} followers checked',
             'liked_tweet': 'Just liked the tweet. id:{0}',
             'replying_tweet': 'Replying to tweet id:{0}',
             'replied_with': 'Replied with this:\n{0}',
             'like_failed': 'Just failed when trying to like the tweet id:{0} because of this reason:'
                            '\n{1}',
+            'follow_failed': 'Just failed when trying to follow the user id:{0} because of this reason:'
+                             '\n{1}',
             'tweet_failed': 'Just failed when trying to send tweet id:{0} because of this reason:'
-                           '\n{1}'
+                           '\n{1}',
+            'mention_failed': 'Just failed when trying to process the mention id:{0} because of this reason:'
+                              '\n{1}',
+            'mentions_skipped': 'Catching up with {0} mentions waiting. Skipped every mention up to id:{1}',
+            'action_deferred': 'Deferred an action because of the rate limit: {0}',
+            'action_dropped': 'Dropped a low priority action on {0} for the tweet id:{1} because of the rate limit',
+            'ticker_report': 'Final seconds reminders finished. Sent: {0}, deferred: {1}, missed: {2}, mean jitter: '
+                             '{3:.1f} ms, max jitter: {4:.1f} ms',
+            'reminder_skipped': 'Skipped the {0} reminder because it was {1:.0f} ms late',
+            'mentions_leased': 'Another instance is replying to the mentions newer than id:{0}. Left them to it',
+            'action_repeated': 'Skipped an action on {0} for the tweet id:{1} because it was already taken'
         },
         'site_msgs': {
             'main_page': 'Hello World!',
@@ -120,7 +135,14 @@ locales = {
             'mentions_ids': 'Got the mentions list (check log for details). These are the tweets ids:'
                             '\n{0}',
             'mentions_list': 'This is the list of mentions just retrieved from the server:'
-                            '\n{0}'
+                            '\n{0}',
+            'rate_limited': '{0}\nActions deferred because of rate limits: {1}'
+                            '\nActions dropped because of rate limits: {2}',
+            'follow_back_running': 'Followed back {0} users. The job is still running: {1} users were followed back '
+                                   'out of {2} followers checked so far. Visit this page again to resume it',
+            'follow_back_done': 'Work done. Followed back {0} users out of {1} followers checked',
+            'ticker_started': 'The final seconds reminders are being sent in the background. Check their progress at '
+                              'the status page'
         },
         'Telegram': {  # NOTE: Command names only allow characters from the English alphabet! (e.g. no accent marks)
             'commands': {
@@ -239,13 +261,29 @@ locales = {
             'mentions_list': 'Esta es la lista de menciones: \n{0}',
             'followed_user': 'Acabo de seguir a este usuario: {0}',
             'followed_everyone': 'Acabo de seguir a todos los que siguen al bot {0}',
+            'follow_back_progress': 'Seguí a {0} usuarios en esta parte. Hasta ahora seguí a {1} usuarios de {2} '
+                                    'seguidores revisados',
             'liked_tweet': 'Puse "Me gusta" al tweet. id:{0}',
             'replying_tweet': 'Respondiendo el tweet id:{0}',
             'replied_with': 'Respondí esto:\n{0}',
             'like_failed': 'Fallé al intentar poner "Me gusta" al tweet id:{0} debido a esta razón:'
                            '\n{1}',
+            'follow_failed': 'Fallé al intentar seguir al usuario id:{0} debido a esta razón:'
+                             '\n{1}',
             'tweet_failed': 'Fallé al intentar enviar el tweet id:{0} debido a esta razón:'
-                           '\n{1}'
+                           '\n{1}',
+            'mention_failed': 'Fallé al intentar procesar la mención id:{0} debido a esta razón:'
+                              '\n{1}',
+            'mentions_skipped': 'Poniéndome al día con {0} menciones pendientes. Omití todas las menciones hasta la '
+                                'id:{1}',
+            'action_deferred': 'Postergué una acción debido al límite de llamadas: {0}',
+            'action_dropped': 'Descarté una acción de baja prioridad en {0} para el tweet id:{1} debido al límite de '
+                              'llamadas',
+            'ticker_report': 'Terminaron los recordatorios de los últimos segundos. Enviados: {0}, postergados: {1}, '
+                             'perdidos: {2}, desfase promedio: {3:.1f} ms, desfase máximo: {4:.1f} ms',
+            'reminder_skipped': 'Omití el recordatorio de {0} porque estaba atrasado en {1:.0f} ms',
+            'mentions_leased': 'Otra instancia está respondiendo las menciones posteriores a la id:{0}. Se las dejé',
+            'action_repeated': 'Omití una acción en {0} para el tweet id:{1} porque ya había sido realizada'
         },
         'site_msgs': {
             'main_page': '¡Hola Mundo!',
@@ -258,7 +296,14 @@ locales = {
             'mentions_ids': 'Obtuve la lista de menciones (ver detalles en el log). Estas son las ids de los tweets:'
                             '\n{0}',
             'mentions_list': 'Esta es la lista de menciones que acabo de recibir desde el servidor:'
-                            '\n{0}'
+                            '\n{0}',
+            'rate_limited': '{0}\nAcciones postergadas debido a límites de llamadas: {1}'
+                            '\nAcciones descartadas debido a límites de llamadas: {2}',
+            'follow_back_running': 'Seguí a {0} usuarios. El trabajo sigue en curso: hasta ahora seguí a {1} usuarios '
+                                   'de {2} seguidores revisados. Visita esta página otra vez para reanudarlo',
+            'follow_back_done': 'Trabajo realizado. Seguí a {0} usuarios de {1} seguidores revisados',
+            'ticker_started': 'Los recordatorios de los últimos segundos se están enviando en segundo plano. Revisa su '
+                              'progreso en la página de estado'
         },
         'Telegram': {  # OJO: Los nombres de comandos solo aceptan caracteres del alfabeto Inglés! (Sin 'ñ' ni acentos)
             'commands': {
@@ -323,6 +368,59 @@ def remove_tildes(word):
     return str(unicodedata.normalize('NFKD', word).encode('ASCII', 'ignore'), 'utf-8')
 
 
+# Normalising every word with unicodedata is slow when it runs for every tweet and every Telegram command, so the
+# accented Latin letters (i.e. the Latin-1 range, which covers every letter used by the available locales) are
+# translated byte by byte with a table precomputed with the function above. Any other character (and the three Latin-1
+# fractions, which are normalised to two digits) is normalised by the function above instead, remembering the most
+# recent words so that repeated ones are only normalised once
+latin_normalised = [remove_tildes(word=chr(code)) for code in range(256)]
+latin_table = bytes(ord(normalised) if len(normalised) == 1 else code
+                    for code, normalised in enumerate(latin_normalised))
+latin_deleted = bytes(code for code, normalised in enumerate(latin_normalised) if normalised == '')
+tildes_cache_size = 4096
+
+
+@lru_cache(maxsize=tildes_cache_size)
+def cached_remove_tildes(word):
+    """
+    Normalise a word using remove_tildes(), remembering the most recently normalised words so that the slow
+    normalisation only runs once for each of them.
+
+    :param word: The word to be normalised
+    :type word: str
+    :return: The word written with characters from the English alphabet only
+    :rtype: str
+    """
+
+    return remove_tildes(word=word)
+
+
+def fast_remove_tildes(word):
+    """
+    Normalise a word to ensure that both accented and non-accented words trigger the right commands. It must always
+    return the same result as remove_tildes(), but it's meant to be used on the hot paths of the bot (i.e. for every
+    tweet and every Telegram command), as most words are normalised without calling unicodedata.
+
+    :param word: The word to be normalised
+    :type word: str
+    :return: The word written with characters from the English alphabet only
+    :rtype: str
+    """
+
+    # Words written with the English alphabet only don't need to be normalised at all
+    if word.isascii():
+        return word
+
+    # Translate the accented letters and delete the characters that have no equivalent in the English alphabet. Words
+    # with characters outside the Latin-1 range, or with characters that the table leaves untouched because they're
+    # normalised to several letters, are normalised using the slower function instead
+    try:
+        return word.encode('latin-1').translate(latin_table, latin_deleted).decode('ascii')
+    except UnicodeError:
+        # The memo is called with a positional argument, which makes its lookups faster
+        return cached_remove_tildes(word)
+
+
 # Import the localisation strings from a file that contains the text to be used in production.
 # Please note: This will overwrite the default contents from the locale variable above!
 try: